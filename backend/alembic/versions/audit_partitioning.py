@@ -0,0 +1,135 @@
+"""Partition audit tables by month
+
+Revision ID: audit_partitions_001
+Revises: eps_table_001
+Create Date: 2025-10-01 00:00:00.000000
+
+qr_access_logs and admin_actions become range-partitioned on created_at
+(one partition per month plus a DEFAULT catch-all). Existing rows are copied
+into their monthly partitions. The primary key becomes (id, created_at)
+because a partitioned table's unique constraints must include the key.
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+from slices.medical_management.infrastructure.partitions import (
+    add_months,
+    create_default_partition_sql,
+    create_partition_sql,
+    month_floor,
+)
+
+# revision identifiers, used by Alembic.
+revision = 'audit_partitions_001'
+down_revision = 'eps_table_001'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+QR_ACCESS_LOGS_COLUMNS = """
+    id VARCHAR(36) NOT NULL,
+    qr_code_id VARCHAR(36) NOT NULL REFERENCES patient_qr_codes(id) ON DELETE CASCADE,
+    accessed_by_user_id VARCHAR(36) REFERENCES users(id) ON DELETE SET NULL,
+    access_type VARCHAR(20) NOT NULL CONSTRAINT ck_qr_access_type
+        CHECK (access_type IN ('patient', 'paramedic', 'anonymous')),
+    ip_address VARCHAR(45),
+    user_agent TEXT,
+    success BOOLEAN NOT NULL DEFAULT true,
+    error_message TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT now(),
+    PRIMARY KEY (id, created_at)
+"""
+
+ADMIN_ACTIONS_COLUMNS = """
+    id VARCHAR(36) NOT NULL DEFAULT gen_random_uuid()::VARCHAR,
+    admin_id VARCHAR(36) NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    target_user_id VARCHAR(36),
+    action_type VARCHAR(50) NOT NULL,
+    action_details JSONB,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at)
+"""
+
+INDEXES = {
+    'qr_access_logs': [
+        # Scan history: a paramedic's successful scans, newest first
+        'CREATE INDEX ix_qr_access_logs_user_created ON qr_access_logs '
+        '(accessed_by_user_id, created_at DESC) WHERE success',
+        'CREATE INDEX ix_qr_access_logs_created ON qr_access_logs (created_at DESC)',
+        'CREATE INDEX ix_qr_access_logs_qr_code_id ON qr_access_logs (qr_code_id)',
+    ],
+    'admin_actions': [
+        'CREATE INDEX ix_admin_actions_created ON admin_actions (created_at DESC)',
+        'CREATE INDEX ix_admin_actions_admin_created ON admin_actions (admin_id, created_at DESC)',
+    ],
+}
+
+
+def _partition(table: str, columns: str) -> None:
+    bind = op.get_bind()
+    legacy = f'{table}_unpartitioned'
+    exists = sa.inspect(bind).has_table(table)
+    if exists:
+        op.execute(f'ALTER TABLE {table} RENAME TO {legacy}')
+        # Free the constraint / index names for the new parent table
+        for index in sa.inspect(bind).get_indexes(legacy):
+            if index.get('duplicates_constraint'):
+                continue
+            op.execute(f'DROP INDEX IF EXISTS {index["name"]}')
+        op.execute(f'ALTER INDEX IF EXISTS {table}_pkey RENAME TO {legacy}_pkey')
+        op.execute(f'ALTER TABLE {legacy} DROP CONSTRAINT IF EXISTS ck_qr_access_type')
+
+    op.execute(f'CREATE TABLE {table} ({columns}) PARTITION BY RANGE (created_at)')
+
+    this_month = month_floor(date.today())
+    first = this_month
+    if exists:
+        oldest = bind.execute(sa.text(f'SELECT min(created_at) FROM {legacy}')).scalar()
+        if oldest is not None:
+            first = min(first, month_floor(oldest))
+    month = first
+    while month <= add_months(this_month, MONTHS_AHEAD):
+        op.execute(create_partition_sql(table, month))
+        month = add_months(month, 1)
+    op.execute(create_default_partition_sql(table))
+
+    if exists:
+        legacy_columns = {column['name'] for column in sa.inspect(bind).get_columns(legacy)}
+        shared = [
+            column['name'] for column in sa.inspect(bind).get_columns(table)
+            if column['name'] in legacy_columns
+        ]
+        # The partition key cannot be NULL
+        selected = [
+            'COALESCE(created_at, now())' if name == 'created_at' else name for name in shared
+        ]
+        op.execute(
+            f'INSERT INTO {table} ({", ".join(shared)}) SELECT {", ".join(selected)} FROM {legacy}'
+        )
+        op.execute(f'DROP TABLE {legacy}')
+
+    for statement in INDEXES[table]:
+        op.execute(statement)
+
+
+def upgrade() -> None:
+    _partition('qr_access_logs', QR_ACCESS_LOGS_COLUMNS)
+    _partition('admin_actions', ADMIN_ACTIONS_COLUMNS)
+
+
+def _unpartition(table: str) -> None:
+    legacy = f'{table}_partitioned'
+    op.execute(f'ALTER TABLE {table} RENAME TO {legacy}')
+    op.execute(f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    op.execute(f'INSERT INTO {table} SELECT * FROM {legacy}')
+    op.execute(f'DROP TABLE {legacy} CASCADE')
+    op.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id)')
+    op.create_index(f'ix_{table}_created_at', table, ['created_at'])
+
+
+def downgrade() -> None:
+    _unpartition('admin_actions')
+    _unpartition('qr_access_logs')
@@ -0,0 +1,80 @@
+"""Store QR tokens hashed, one active code per patient
+
+Revision ID: qr_token_hash_001
+Revises: record_archive_001
+Create Date: 2025-10-16 00:00:00.000000
+
+- patient_qr_codes.qr_token (raw, unique index over every code ever issued)
+  is replaced by token_hash, the 32-byte SHA-256 of the token. The lookup
+  index is partial on active codes and covers patient_id/expires_at.
+- Codes already expired are deactivated. When a patient has several active
+  codes, only the newest stays active. deactivated_at records when a code
+  was retired.
+- Partial indexes enforce one active code per patient and let the expiry
+  sweep find expired active codes.
+
+Downgrade cannot recover raw tokens: qr_token is refilled with the hex hash,
+so codes issued before the downgrade stop resolving.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'qr_token_hash_001'
+down_revision = 'record_archive_001'
+branch_labels = None
+depends_on = None
+
+CREATED = [
+    ('ux_patient_qr_codes_active_token',
+     'CREATE UNIQUE INDEX IF NOT EXISTS ux_patient_qr_codes_active_token ON patient_qr_codes (token_hash) '
+     'INCLUDE (patient_id, expires_at) WHERE is_active'),
+    ('ux_patient_qr_codes_active_patient',
+     'CREATE UNIQUE INDEX IF NOT EXISTS ux_patient_qr_codes_active_patient ON patient_qr_codes (patient_id) '
+     'WHERE is_active'),
+    ('ix_patient_qr_codes_active_expiry',
+     'CREATE INDEX IF NOT EXISTS ix_patient_qr_codes_active_expiry ON patient_qr_codes (expires_at) '
+     'WHERE is_active AND expires_at IS NOT NULL'),
+]
+
+
+def upgrade() -> None:
+    op.execute('ALTER TABLE patient_qr_codes ADD COLUMN IF NOT EXISTS token_hash BYTEA')
+    op.execute('ALTER TABLE patient_qr_codes ADD COLUMN IF NOT EXISTS deactivated_at TIMESTAMP')
+    op.execute("UPDATE patient_qr_codes SET token_hash = sha256(convert_to(qr_token, 'UTF8'))")
+    op.execute('ALTER TABLE patient_qr_codes ALTER COLUMN token_hash SET NOT NULL')
+
+    op.execute("""
+        UPDATE patient_qr_codes
+        SET is_active = false, deactivated_at = LOCALTIMESTAMP
+        WHERE is_active AND expires_at < LOCALTIMESTAMP
+    """)
+    op.execute("""
+        UPDATE patient_qr_codes q
+        SET is_active = false, deactivated_at = LOCALTIMESTAMP
+        FROM (
+            SELECT id, row_number() OVER (PARTITION BY patient_id ORDER BY created_at DESC, id) AS n
+            FROM patient_qr_codes
+            WHERE is_active
+        ) ranked
+        WHERE q.id = ranked.id AND ranked.n > 1
+    """)
+
+    for _, statement in CREATED:
+        op.execute(statement)
+    op.execute('DROP INDEX IF EXISTS ux_patient_qr_codes_token')
+    op.execute('ALTER TABLE patient_qr_codes DROP COLUMN qr_token')
+    op.execute('ANALYZE patient_qr_codes')
+
+
+def downgrade() -> None:
+    op.execute('ALTER TABLE patient_qr_codes ADD COLUMN qr_token VARCHAR(100)')
+    op.execute("UPDATE patient_qr_codes SET qr_token = encode(token_hash, 'hex')")
+    op.execute('ALTER TABLE patient_qr_codes ALTER COLUMN qr_token SET NOT NULL')
+    op.execute(
+        'CREATE UNIQUE INDEX IF NOT EXISTS ux_patient_qr_codes_token ON patient_qr_codes (qr_token) '
+        'INCLUDE (patient_id, is_active, expires_at)'
+    )
+    for name, _ in CREATED:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+    op.execute('ALTER TABLE patient_qr_codes DROP COLUMN deactivated_at')
+    op.execute('ALTER TABLE patient_qr_codes DROP COLUMN token_hash')
@@ -0,0 +1,50 @@
+"""Archive tables for compacted clinical records
+
+Revision ID: record_archive_001
+Revises: schema_indexes_001
+Create Date: 2025-10-15 00:00:00.000000
+
+allergies, illnesses and surgeries each get a ``<table>_archive`` table with
+the same columns plus ``archived_at``. Compaction moves long soft-deleted
+rows there. Archive tables have no foreign keys, so archived rows outlive
+the patient row. They are indexed for the per-patient audit lookup only.
+Each live table gets a partial index on ``deleted_at`` covering only
+deleted rows, so a compaction batch does not scan the live rows.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'record_archive_001'
+down_revision = 'schema_indexes_001'
+branch_labels = None
+depends_on = None
+
+TABLES = ('allergies', 'illnesses', 'surgeries')
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        archive = f'{table}_archive'
+        # LIKE copies columns, NOT NULL, defaults and CHECK constraints, not keys
+        op.execute(
+            f'CREATE TABLE IF NOT EXISTS {archive} '
+            f'(LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS, '
+            f'archived_at TIMESTAMP NOT NULL DEFAULT now(), PRIMARY KEY (id))'
+        )
+        op.execute(f'CREATE INDEX IF NOT EXISTS ix_{archive}_patient ON {archive} (patient_id, deleted_at DESC)')
+        op.execute(
+            f'CREATE INDEX IF NOT EXISTS ix_{table}_deleted ON {table} (deleted_at) WHERE deleted_at IS NOT NULL'
+        )
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        archive = f'{table}_archive'
+        # Put archived rows back (still soft-deleted) before dropping their table
+        columns = ', '.join(column['name'] for column in sa.inspect(op.get_bind()).get_columns(table))
+        op.execute(
+            f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {archive} ON CONFLICT DO NOTHING'
+        )
+        op.execute(f'DROP INDEX IF EXISTS ix_{table}_deleted')
+        op.execute(f'DROP TABLE IF EXISTS {archive}')
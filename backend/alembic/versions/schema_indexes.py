@@ -0,0 +1,103 @@
+"""Align schema with the models and index by query predicate
+
+Revision ID: schema_indexes_001
+Revises: audit_partitions_001
+Create Date: 2025-10-08 00:00:00.000000
+
+- illnesses and surgeries get the is_active column the routes filter on.
+- Clinical lists (``patient_id = ? AND is_active AND deleted_at IS NULL``) get
+  one partial index per table instead of separate indexes on each column.
+- The emergency QR lookup gets a unique covering index on qr_token.
+- The admin queue of pending paramedics gets a partial index.
+- Single-column indexes that no query uses (severity, names, dates, flags...)
+  are dropped: each one is maintained on every insert and update.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'schema_indexes_001'
+down_revision = 'audit_partitions_001'
+branch_labels = None
+depends_on = None
+
+LIVE_ROWS = 'WHERE is_active = true AND deleted_at IS NULL'
+
+CREATED = [
+    ('ix_users_pending_paramedics',
+     "CREATE INDEX IF NOT EXISTS ix_users_pending_paramedics ON users (created_at DESC) "
+     "WHERE role = 'paramedic' AND is_active = false"),
+    ('ix_allergies_patient_live',
+     f'CREATE INDEX IF NOT EXISTS ix_allergies_patient_live ON allergies (patient_id) {LIVE_ROWS}'),
+    ('ix_illnesses_patient_live',
+     f'CREATE INDEX IF NOT EXISTS ix_illnesses_patient_live ON illnesses (patient_id) {LIVE_ROWS}'),
+    ('ix_surgeries_patient_live',
+     f'CREATE INDEX IF NOT EXISTS ix_surgeries_patient_live ON surgeries (patient_id) {LIVE_ROWS}'),
+    ('ux_patient_qr_codes_token',
+     'CREATE UNIQUE INDEX IF NOT EXISTS ux_patient_qr_codes_token ON patient_qr_codes (qr_token) '
+     'INCLUDE (patient_id, is_active, expires_at)'),
+]
+
+# (name, table, columns, unique) as created by medical_mgmt_001 / eps_table_001
+DROPPED = [
+    ('ix_users_role', 'users', ['role'], False),
+    ('ix_users_is_active', 'users', ['is_active'], False),
+    ('ix_users_deleted_at', 'users', ['deleted_at'], False),
+    ('ix_users_email_active', 'users', ['email', 'is_active'], False),
+    ('ix_patients_blood_type', 'patients', ['blood_type'], False),
+    ('ix_patients_deleted_at', 'patients', ['deleted_at'], False),
+    ('ix_patients_document', 'patients', ['document_type', 'document_number'], False),
+    ('ix_paramedics_license_expiry_date', 'paramedics', ['license_expiry_date'], False),
+    ('ix_paramedics_status', 'paramedics', ['status'], False),
+    ('ix_paramedics_deleted_at', 'paramedics', ['deleted_at'], False),
+    ('ix_paramedics_status_license', 'paramedics', ['status', 'license_expiry_date'], False),
+    ('ix_allergies_allergen', 'allergies', ['allergen'], False),
+    ('ix_allergies_severity', 'allergies', ['severity'], False),
+    ('ix_allergies_diagnosed_date', 'allergies', ['diagnosed_date'], False),
+    ('ix_allergies_last_reaction_date', 'allergies', ['last_reaction_date'], False),
+    ('ix_allergies_is_active', 'allergies', ['is_active'], False),
+    ('ix_allergies_deleted_at', 'allergies', ['deleted_at'], False),
+    ('ix_allergies_patient_active', 'allergies', ['patient_id', 'is_active'], False),
+    ('ix_illnesses_name', 'illnesses', ['name'], False),
+    ('ix_illnesses_cie10_code', 'illnesses', ['cie10_code'], False),
+    ('ix_illnesses_status', 'illnesses', ['status'], False),
+    ('ix_illnesses_diagnosed_date', 'illnesses', ['diagnosed_date'], False),
+    ('ix_illnesses_resolved_date', 'illnesses', ['resolved_date'], False),
+    ('ix_illnesses_is_chronic', 'illnesses', ['is_chronic'], False),
+    ('ix_illnesses_deleted_at', 'illnesses', ['deleted_at'], False),
+    ('ix_illnesses_patient_status', 'illnesses', ['patient_id', 'status'], False),
+    ('ix_surgeries_name', 'surgeries', ['name'], False),
+    ('ix_surgeries_surgery_date', 'surgeries', ['surgery_date'], False),
+    ('ix_surgeries_follow_up_required', 'surgeries', ['follow_up_required'], False),
+    ('ix_surgeries_follow_up_date', 'surgeries', ['follow_up_date'], False),
+    ('ix_surgeries_deleted_at', 'surgeries', ['deleted_at'], False),
+    ('ix_surgeries_patient_date', 'surgeries', ['patient_id', 'surgery_date'], False),
+    ('ix_patient_qr_codes_qr_token', 'patient_qr_codes', ['qr_token'], True),
+    ('ix_patient_qr_codes_is_active', 'patient_qr_codes', ['is_active'], False),
+    ('ix_patient_qr_codes_expires_at', 'patient_qr_codes', ['expires_at'], False),
+    ('ix_eps_regime_type', 'eps', ['regime_type'], False),
+    ('ix_eps_status', 'eps', ['status'], False),
+]
+
+
+def upgrade() -> None:
+    for table in ('illnesses', 'surgeries'):
+        op.execute(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS is_active BOOLEAN NOT NULL DEFAULT true')
+
+    # Build the replacements before dropping what they replace
+    for _, statement in CREATED:
+        op.execute(statement)
+    for name, _, _, _ in DROPPED:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+
+    op.execute('ANALYZE users, patients, paramedics, allergies, illnesses, surgeries, patient_qr_codes')
+
+
+def downgrade() -> None:
+    for name, table, columns, unique in DROPPED:
+        op.execute(
+            f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS {name} ON {table} ({", ".join(columns)})'
+        )
+    for name, _ in CREATED:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+    for table in ('illnesses', 'surgeries'):
+        op.execute(f'ALTER TABLE {table} DROP COLUMN IF EXISTS is_active')
@@ -0,0 +1,37 @@
+"""Seed the VitalGo admin user
+
+Revision ID: admin_seed_001
+Revises: qr_token_hash_001
+Create Date: 2025-10-19 00:00:00.000000
+
+Carries the account create_admin_user.sql used to insert by hand, so a fresh
+database gets it from `alembic upgrade head` alongside the EPS seed
+(eps_table_001). An existing admin@vitalgo.com is left untouched.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'admin_seed_001'
+down_revision = 'qr_token_hash_001'
+branch_labels = None
+depends_on = None
+
+ADMIN_EMAIL = 'admin@vitalgo.com'
+
+
+def upgrade() -> None:
+    op.execute(
+        "INSERT INTO users (id, email, password_hash, first_name, last_name, phone, role, is_active, "
+        "created_at, updated_at) VALUES ("
+        "gen_random_uuid()::VARCHAR, "
+        f"'{ADMIN_EMAIL}', "
+        # SHA-256 of "VTG2025"
+        "'9c3efcd9f2c0bba8b78d4b87c0a2d6bc5b6e845e4ba4e68f9b1d4ec4b8e9a4c7', "
+        "'Administrador', 'VitalGo', '3001234567', 'admin', true, "
+        "CURRENT_TIMESTAMP, CURRENT_TIMESTAMP"
+        ") ON CONFLICT (email) DO NOTHING"
+    )
+
+
+def downgrade() -> None:
+    op.execute(f"DELETE FROM users WHERE email = '{ADMIN_EMAIL}' AND role = 'admin'")
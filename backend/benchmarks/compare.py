@@ -0,0 +1,63 @@
+"""
+Compare two load benchmark reports produced by ``benchmarks/load.py``.
+
+Usage:
+    poetry run python -m benchmarks.compare bench-results/base.json bench-results/head.json
+
+Exits with status 1 when any scenario's p95 or p99 regresses by more than
+``--threshold`` percent, so the comparison can gate a CI job.
+"""
+
+import argparse
+import json
+import sys
+from typing import Optional
+
+METRICS = ("throughput_rps", "p50", "p95", "p99", "error_rate")
+
+
+def _value(summary: dict, metric: str) -> float:
+    if metric in ("throughput_rps", "error_rate"):
+        return float(summary.get(metric, 0.0))
+    return float(summary["latency_ms"].get(metric, 0.0))
+
+
+def _change(base: float, head: float) -> Optional[float]:
+    if base == 0:
+        return None
+    return (head - base) / base * 100.0
+
+
+def compare(base: dict, head: dict, threshold: float) -> bool:
+    """Print a comparison table; return True when a latency regression was found"""
+    regressed = False
+    names = ["total"] + sorted(set(base["scenarios"]) | set(head["scenarios"]))
+    print(f"base: {base['meta'].get('git_commit')}  head: {head['meta'].get('git_commit')}")
+    print(f"{'scenario':<14}{'metric':<16}{'base':>12}{'head':>12}{'change':>10}")
+    for name in names:
+        base_summary = base["total"] if name == "total" else base["scenarios"].get(name)
+        head_summary = head["total"] if name == "total" else head["scenarios"].get(name)
+        if base_summary is None or head_summary is None:
+            print(f"{name:<14}{'(only in one report)':<16}")
+            continue
+        for metric in METRICS:
+            before, after = _value(base_summary, metric), _value(head_summary, metric)
+            change = _change(before, after)
+            flag = ""
+            if metric in ("p95", "p99") and change is not None and change > threshold:
+                flag, regressed = " !", True
+            shown = f"{change:+.1f}%" if change is not None else "n/a"
+            print(f"{name:<14}{metric:<16}{before:>12.2f}{after:>12.2f}{shown:>10}{flag}")
+    return regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Allowed p95/p99 regression in percent")
+    arguments = parser.parse_args()
+    with open(arguments.base, encoding="utf-8") as base_file, open(arguments.head, encoding="utf-8") as head_file:
+        found = compare(json.load(base_file), json.load(head_file), arguments.threshold)
+    sys.exit(1 if found else 0)
@@ -1,6 +1,7 @@
 -- Create admin user for VitalGo
 -- User: admin
 -- Pass: VTG2025
+-- Seeded by the admin_seed_001 migration; kept for databases managed by hand
 
 -- Insert admin user
 INSERT INTO users (
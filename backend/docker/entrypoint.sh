@@ -0,0 +1,7 @@
+#!/bin/sh
+# Bring the schema (and its seeds) to head before serving. upgrade is a no-op
+# when the database is already current, so every container start runs it.
+set -e
+
+alembic upgrade head
+exec "$@"
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, Optional
 import os
 
 from pydantic_settings import BaseSettings
@@ -13,6 +13,41 @@ class Settings(BaseSettings):
     database_pool_size: int = 10
     database_max_overflow: int = 20
 
+    # Streaming read replica (optional); read-only routes use it when caught up
+    database_replica_url: Optional[str] = None
+    replica_max_lag_seconds: float = 5.0  # above this every read goes to the primary
+    replica_pin_seconds: int = 30  # upper bound on read-your-writes pinning
+    replica_check_interval_seconds: float = 1.0
+
+    # Adaptive DB concurrency limit (per worker, capped at pool_size + max_overflow)
+    db_concurrency_initial_limit: int = 10
+    db_concurrency_min_limit: int = 2
+    db_concurrency_latency_tolerance: float = 2.0  # back off above baseline latency * this
+    db_concurrency_queue_timeout_ms: int = 200
+
+    # Request deadlines per admission tier (seconds), enforced as statement_timeout
+    request_deadlines: Dict[str, float] = {"critical": 3.0, "high": 5.0, "normal": 10.0, "low": 20.0}
+    db_statement_timeout_ms: int = 30000  # cap, and the timeout outside requests (jobs)
+
+    # Circuit breaker on the primary (per worker)
+    db_breaker_failure_ratio: float = 0.5  # of calls in the window
+    db_breaker_slow_call_ms: float = 2000
+    db_breaker_slow_call_ratio: float = 0.8
+    db_breaker_min_calls: int = 20  # calls in the window before it can open
+    db_breaker_window_seconds: float = 10.0
+    db_breaker_open_seconds: float = 5.0  # fail fast this long, then try again
+    emergency_fallback_seconds: float = 3600.0  # last good emergency records served while open
+    emergency_fallback_max_entries: int = 10000
+
+    # Node-local encrypted snapshot of emergency records, served while PostgreSQL is down
+    emergency_snapshot_path: str = "var/emergency.snapshot"  # "" disables it
+    emergency_snapshot_sync_seconds: float = 15.0  # poll of the record change stream
+    emergency_snapshot_rebuild_hours: float = 24.0  # full rebuild even without missed changes
+    emergency_snapshot_max_age_hours: float = 72.0  # older snapshots are not served
+
+    # Response compression (brotli, or gzip for clients without it)
+    compression_minimum_size: int = 1024  # bytes
+
     # Redis 7.4
     redis_url: str = "redis://localhost:6379/0"
 
@@ -20,7 +55,85 @@ class Settings(BaseSettings):
     # NEVER hardcode secrets - always use environment variables
     secret_key: str
     algorithm: str = "HS256"
-    access_token_expire_minutes: int = 30
+    access_token_expire_minutes: int = 1440  # 24 hours
+    refresh_token_expire_days: int = 30  # rotating refresh tokens: idle lifetime
+    refresh_token_max_age_days: int = 90  # ...and absolute lifetime of a login
+
+    # Admission control: concurrent requests per worker, shared by priority tiers
+    admission_control_enabled: bool = True
+    admission_max_in_flight: int = 64
+
+    # Rate limiting (token buckets; burst = per-minute allowance)
+    rate_limit_enabled: bool = True
+    rate_limit_login_per_minute: int = 10  # per client IP
+    rate_limit_lookup_per_minute: int = 30  # check-email / check-document per client IP
+    rate_limit_registration_per_minute: int = 5  # per client IP
+    rate_limit_emergency_per_minute: int = 60  # per paramedic (or IP when anonymous)
+    rate_limit_emergency_token_per_minute: int = 30  # per QR token
+    max_login_attempts: int = 5  # failed logins per account before lockout
+    login_lockout_minutes: int = 15
+
+    # Registration pre-check: Bloom filters answer "free" without a query
+    availability_filter_enabled: bool = True
+    availability_filter_capacity: int = 1_000_000  # per filter (~1.2 MB at 1% error)
+    availability_filter_error_rate: float = 0.01
+    availability_filter_refresh_seconds: float = 5.0  # pull of the shared bitmap
+
+    # Live QR access events (SSE), fanned out per worker from Redis pub/sub
+    qr_events_enabled: bool = True
+    qr_events_max_streams: int = 5000  # open streams per worker; more get 503
+    qr_events_heartbeat_seconds: float = 15.0  # keeps idle streams open through proxies
+
+    # Single-flight: concurrent identical misses share one load (across workers via Redis)
+    single_flight_cross_worker: bool = True
+    eps_cache_seconds: float = 300.0
+
+    # Background jobs ("redis": shared streams, "memory": this worker only)
+    job_broker: str = "redis"
+    job_queue_concurrency: Dict[str, int] = {"audit": 4}  # consumers per queue per worker
+    job_reclaim_idle_seconds: float = 60.0  # jobs of a dead worker run elsewhere after this
+    job_maintenance_interval_seconds: float = 1.0  # due retries and reclaim
+
+    # Slow query log
+    slow_query_threshold_ms: int = 250
+    slow_query_log_path: str = "logs/slow_queries.jsonl"
+    slow_query_explain_sample_rate: float = 0.2
+    slow_query_explain_interval_seconds: int = 300
+
+    # Audit tables (qr_access_logs, admin_actions): monthly partitions
+    audit_partition_months_ahead: int = 3
+    audit_retention_months: int = 24  # older partitions are detached, archived, dropped
+    audit_archive_dir: str = "archive/audit"
+    audit_maintenance_interval_hours: float = 24.0
+    audit_query_window_days: int = 90  # default look-back of history endpoints
+
+    # Clinical records (allergies, illnesses, surgeries): soft-deleted rows
+    # older than the retention window move to *_archive tables in batches
+    record_retention_days: int = 90
+    record_compaction_batch_size: int = 500
+    record_compaction_pause_seconds: float = 0.2  # between batches
+    record_compaction_interval_hours: float = 6.0  # 0 disables the scheduled run
+
+    # QR codes: expired codes are deactivated in batches (the lookup also checks expiry)
+    qr_sweep_interval_minutes: float = 15.0  # 0 disables the scheduled sweep
+    qr_sweep_batch_size: int = 1000
+
+    # Health probes (readiness fails above these thresholds)
+    health_probe_interval_seconds: float = 5.0
+    readiness_max_pool_wait_ms: float = 500.0
+    readiness_max_loop_lag_ms: float = 250.0
+
+    # Startup: open pools and import deferred modules before taking traffic
+    prewarm_on_startup: bool = True
+
+    # Server (python -m slices.serve)
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    web_concurrency: int = 0  # worker processes; 0 = one per available CPU
+    server_backlog: int = 2048
+    server_keepalive_seconds: int = 5
+    server_limit_concurrency: Optional[int] = None  # per worker; 503 above it
+    server_graceful_timeout_seconds: int = 30
 
     # API
     api_v1_str: str = "/api/v1"
@@ -29,5 +142,26 @@ class Settings(BaseSettings):
 
     model_config = {"env_file": ".env", "case_sensitive": False}
 
+    @staticmethod
+    def _psycopg2_url(url: str) -> str:
+        return url.replace("postgresql+asyncpg://", "postgresql://").replace(
+            "postgresql+psycopg2://", "postgresql://"
+        )
+
+    @property
+    def sync_database_url(self) -> str:
+        """``database_url`` in the form psycopg2 accepts (no SQLAlchemy driver suffix)"""
+        return self._psycopg2_url(self.database_url)
+
+    @property
+    def sync_replica_url(self) -> Optional[str]:
+        """``database_replica_url`` in psycopg2 form, if a replica is configured"""
+        return self._psycopg2_url(self.database_replica_url) if self.database_replica_url else None
+
+    @property
+    def async_database_url(self) -> str:
+        """``database_url`` with the asyncpg driver SQLAlchemy's async engine needs"""
+        return self.sync_database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+
 
 settings = Settings()
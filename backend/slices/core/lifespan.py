@@ -0,0 +1,143 @@
+"""
+Application lifespan: warm-up before serving, draining on shutdown.
+
+Heavy client libraries are imported lazily so a new worker can bind its
+socket quickly; the warm-up then pays those costs (and opens the first
+database connections) once, before the first request instead of during it.
+Warm-up failures are logged and never prevent startup, since the database
+may come up after the API does.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+
+from slices.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Modules deferred at import time that the first real request would otherwise load
+DEFERRED_MODULES = (
+    "jwt",
+    "qrcode",
+    "PIL.Image",
+    "PIL.PngImagePlugin",
+    "redis.asyncio",
+    "sqlalchemy.ext.asyncio",
+)
+
+
+def _import_deferred_modules() -> None:
+    import importlib
+
+    for name in DEFERRED_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            logger.warning("Warm-up could not import %s: %s", name, e)
+
+
+def _build_static_pages() -> None:
+    """Fingerprint and precompress the emergency page shell and its assets"""
+    from slices.medical_management.api.routes.qr import emergency_page
+
+    emergency_page.load()
+
+
+def _warm_sync_connection() -> None:
+    """Resolve, authenticate and run a trivial statement on the psycopg2 path"""
+    from slices.observability.infrastructure.db import instrumented_connect
+
+    conn = instrumented_connect(settings.sync_database_url, connect_timeout=3)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    finally:
+        conn.close()
+
+
+async def _warm_async_pool() -> None:
+    """Open the first pooled connection of the SQLAlchemy engine"""
+    from sqlalchemy import text
+
+    from slices.shared.infrastructure.database import get_engine
+
+    async with get_engine().connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def prewarm() -> None:
+    started = time.perf_counter()
+    await asyncio.to_thread(_import_deferred_modules)
+    try:
+        await asyncio.to_thread(_build_static_pages)
+    except Exception as e:
+        logger.warning("Warm-up could not build static pages: %s", e)
+    for name, warm in (
+        ("psycopg2 connection", lambda: asyncio.to_thread(_warm_sync_connection)),
+        ("async engine pool", _warm_async_pool),
+    ):
+        try:
+            await asyncio.wait_for(warm(), timeout=5)
+        except Exception as e:
+            logger.warning("Warm-up of %s failed: %s", name, e)
+    logger.info("Warm-up finished in %.0f ms", (time.perf_counter() - started) * 1000)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from slices.health_check.infrastructure.prober import health_prober
+    from slices.medical_management.infrastructure.availability import availability_filter_sync
+    from slices.medical_management.infrastructure import audit_jobs  # noqa: F401  registers the jobs
+    from slices.medical_management.infrastructure.compaction import record_compactor
+    from slices.medical_management.infrastructure.emergency_snapshot import emergency_snapshot_sync
+    from slices.medical_management.infrastructure.partitions import audit_partition_maintainer
+    from slices.medical_management.infrastructure.qr_events import qr_access_events
+    from slices.medical_management.infrastructure.qr_tokens import qr_token_sweeper
+    from slices.shared.infrastructure.jobs import jobs
+    from slices.shared.infrastructure.replica import replica_monitor
+
+    if settings.prewarm_on_startup:
+        await prewarm()
+    health_prober.start()
+    if settings.database_replica_url:
+        replica_monitor.start()
+    if settings.audit_maintenance_interval_hours > 0:
+        audit_partition_maintainer.start()
+    if settings.record_compaction_interval_hours > 0:
+        record_compactor.start()
+    if settings.qr_sweep_interval_minutes > 0:
+        qr_token_sweeper.start()
+    if settings.availability_filter_enabled:
+        availability_filter_sync.start()
+    if settings.qr_events_enabled:
+        qr_access_events.start()
+    if settings.emergency_snapshot_path:
+        emergency_snapshot_sync.start()
+    jobs.start()
+    yield
+    await jobs.stop()
+    await emergency_snapshot_sync.stop()
+    await qr_access_events.stop()
+    await availability_filter_sync.stop()
+    await qr_token_sweeper.stop()
+    await record_compactor.stop()
+    await audit_partition_maintainer.stop()
+    await replica_monitor.stop()
+    await health_prober.stop()
+    await shutdown()
+
+
+async def shutdown() -> None:
+    """Flush background work, then close pools (runs after in-flight requests finish)"""
+    from slices.observability.infrastructure.slow_query import slow_query_log
+    from slices.shared.infrastructure.database import dispose_engine
+    from slices.shared.infrastructure.redis import close_redis
+
+    if not await asyncio.to_thread(slow_query_log.drain, 5.0):
+        logger.warning("Shutdown with EXPLAIN samples still queued")
+    await dispose_engine()
+    await close_redis()
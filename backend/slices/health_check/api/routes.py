@@ -1,10 +1,7 @@
-import redis.asyncio as redis
-from fastapi import APIRouter, Depends
-from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 
-from slices.core.config import settings
-from slices.shared.infrastructure.database import get_db
+from slices.health_check.infrastructure.prober import health_prober
 
 router = APIRouter()
 
@@ -15,32 +12,27 @@ async def health_check():
     return {"status": "healthy", "service": "backend-api"}
 
 
-@router.get("/health/detailed")
-async def detailed_health_check(db: AsyncSession = Depends(get_db)):
-    """Detailed health check including database and Redis connectivity."""
+@router.get("/health/live")
+async def liveness_check():
+    """Liveness: the worker is up and its event loop is answering."""
+    return {"status": "alive"}
+
 
-    health_status = {
-        "status": "healthy",
-        "services": {"api": "healthy", "database": "unknown", "redis": "unknown"},
+@router.get("/health/ready")
+async def readiness_check():
+    """Readiness from the cached snapshot: 503 while dependencies are down or saturated."""
+    snapshot = await health_prober.snapshot()
+    body = {
+        "status": "ready" if snapshot["ready"] else "not_ready",
+        "reasons": snapshot["reasons"],
+        "checked_at": snapshot["checked_at"],
+        "age_seconds": snapshot["age_seconds"],
+        "saturation": snapshot["saturation"],
     }
+    return JSONResponse(body, status_code=200 if snapshot["ready"] else 503)
 
-    # Check database
-    try:
-        result = await db.execute(text("SELECT 1"))
-        if result.scalar() == 1:
-            health_status["services"]["database"] = "healthy"
-    except Exception as e:
-        health_status["services"]["database"] = f"unhealthy: {str(e)}"
-        health_status["status"] = "unhealthy"
-
-    # Check Redis
-    try:
-        redis_client = redis.from_url(settings.redis_url)
-        await redis_client.ping()
-        health_status["services"]["redis"] = "healthy"
-        await redis_client.aclose()
-    except Exception as e:
-        health_status["services"]["redis"] = f"unhealthy: {str(e)}"
-        health_status["status"] = "unhealthy"
-
-    return health_status
+
+@router.get("/health/detailed")
+async def detailed_health_check():
+    """Detailed health check including database and Redis connectivity (cached snapshot)."""
+    return await health_prober.snapshot()
@@ -0,0 +1,238 @@
+"""
+Background health prober.
+
+Probes run on a fixed interval against the shared clients (the async
+engine's pool and the process-wide Redis client) and publish a snapshot;
+the health endpoints only read it, so orchestrator probes cost nothing and
+cannot pile up on a struggling database.
+
+Besides dependency reachability the snapshot carries two saturation
+signals that make readiness fail before the worker collapses:
+
+- event-loop lag: how late a periodic ``asyncio.sleep`` wakes up, i.e. how
+  long handlers are blocking the loop;
+- connection wait: mean time to obtain a database connection over the
+  last probe interval (``db_pool_checkout_wait_seconds``), plus how full
+  the async pool is.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from slices.core.config import settings
+from slices.observability.infrastructure.metrics import db_pool_checkout_wait_seconds, registry
+
+logger = logging.getLogger(__name__)
+
+event_loop_lag_seconds = registry.gauge(
+    "event_loop_lag_seconds",
+    "Worst event-loop wake-up delay over the last probe interval",
+)
+health_ready = registry.gauge(
+    "health_ready",
+    "1 when the readiness probe passes, 0 otherwise",
+)
+
+PROBE_TIMEOUT_SECONDS = 2.0
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop runs a periodic timer"""
+
+    def __init__(self, tick_seconds: float = 0.25, window: int = 20):
+        self.tick_seconds = tick_seconds
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def lag_seconds(self) -> float:
+        return max(self._samples, default=0.0)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="loop-lag-monitor")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.tick_seconds)
+            lag = max(time.perf_counter() - started - self.tick_seconds, 0.0)
+            self._samples.append(lag)
+            event_loop_lag_seconds.set(self.lag_seconds)
+
+
+async def _probe_database() -> Dict[str, Any]:
+    from sqlalchemy import text
+
+    from slices.shared.infrastructure.database import get_engine
+
+    async with get_engine().connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    return {}
+
+
+async def _probe_redis() -> Dict[str, Any]:
+    from slices.shared.infrastructure.redis import get_redis
+
+    await get_redis().ping()
+    return {}
+
+
+async def _timed(probe) -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        details = await asyncio.wait_for(probe(), timeout=PROBE_TIMEOUT_SECONDS)
+        result = {"status": "healthy", **details}
+    except asyncio.TimeoutError:
+        result = {"status": f"unhealthy: timed out after {PROBE_TIMEOUT_SECONDS:.0f}s"}
+    except Exception as e:
+        result = {"status": f"unhealthy: {e}"}
+    result["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+def _async_pool_usage() -> Tuple[Optional[int], Optional[int]]:
+    """(connections checked out, capacity) of the async engine, if it exists"""
+    from slices.shared.infrastructure.database import get_engine
+
+    if not get_engine.cache_info().currsize:
+        return None, None
+    pool = get_engine().pool
+    try:
+        return pool.checkedout(), pool.size() + settings.database_max_overflow
+    except AttributeError:
+        return None, None
+
+
+class HealthProber:
+    """Refreshes a health snapshot in the background and decides readiness"""
+
+    def __init__(
+        self,
+        interval_seconds: float,
+        max_pool_wait_ms: float,
+        max_loop_lag_ms: float,
+    ):
+        self.interval_seconds = interval_seconds
+        self.max_pool_wait_ms = max_pool_wait_ms
+        self.max_loop_lag_ms = max_loop_lag_ms
+        self.loop_monitor = LoopLagMonitor()
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._refreshed_at = 0.0
+        self._last_wait: Tuple[int, float] = (0, 0.0)
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        self.loop_monitor.start()
+        if not self.running:
+            self._task = asyncio.create_task(self._run(), name="health-prober")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.loop_monitor.stop()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning("Health probe cycle failed: %s", e)
+            await asyncio.sleep(self.interval_seconds)
+
+    def _pool_wait_ms(self) -> Optional[float]:
+        """Mean connection wait since the previous cycle (None without new checkouts)"""
+        count = db_pool_checkout_wait_seconds.count(pool="medical")
+        total = db_pool_checkout_wait_seconds.sum(pool="medical")
+        last_count, last_total = self._last_wait
+        self._last_wait = (count, total)
+        if count <= last_count:
+            return None
+        return (total - last_total) / (count - last_count) * 1000
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Run all probes once and publish the resulting snapshot"""
+        database, redis = await asyncio.gather(_timed(_probe_database), _timed(_probe_redis))
+        pool_in_use, pool_capacity = _async_pool_usage()
+        pool_wait_ms = self._pool_wait_ms()
+        loop_lag_ms = self.loop_monitor.lag_seconds * 1000 if self.loop_monitor.running else None
+
+        reasons = []
+        if database["status"] != "healthy":
+            reasons.append("database unreachable")
+        if pool_wait_ms is not None and pool_wait_ms > self.max_pool_wait_ms:
+            reasons.append(f"connection wait {pool_wait_ms:.0f}ms > {self.max_pool_wait_ms:.0f}ms")
+        if pool_in_use is not None and pool_capacity and pool_in_use >= pool_capacity:
+            reasons.append("async connection pool exhausted")
+        if loop_lag_ms is not None and loop_lag_ms > self.max_loop_lag_ms:
+            reasons.append(f"event loop lag {loop_lag_ms:.0f}ms > {self.max_loop_lag_ms:.0f}ms")
+
+        ready = not reasons
+        # Redis only backs caches and limits with local fallbacks: degraded, still ready
+        status = "unhealthy" if not ready else ("healthy" if redis["status"] == "healthy" else "degraded")
+        self._snapshot = {
+            "status": status,
+            "ready": ready,
+            "reasons": reasons,
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+            "services": {"api": "healthy", "database": database, "redis": redis},
+            "saturation": {
+                "event_loop_lag_ms": round(loop_lag_ms, 2) if loop_lag_ms is not None else None,
+                "connection_wait_ms": round(pool_wait_ms, 2) if pool_wait_ms is not None else None,
+                "async_pool_in_use": pool_in_use,
+                "async_pool_capacity": pool_capacity,
+            },
+        }
+        self._refreshed_at = time.monotonic()
+        health_ready.set(1 if ready else 0)
+        return self._snapshot
+
+    async def snapshot(self) -> Dict[str, Any]:
+        """Latest snapshot with its age; probes on demand when the background task is not running"""
+        stale = time.monotonic() - self._refreshed_at > self.interval_seconds
+        if self._snapshot is None or (stale and not self.running):
+            async with self._lock:
+                if self._snapshot is None or time.monotonic() - self._refreshed_at > self.interval_seconds:
+                    await self.refresh()
+        snapshot = dict(self._snapshot)
+        age = time.monotonic() - self._refreshed_at
+        snapshot["age_seconds"] = round(age, 3)
+        # A prober that stopped refreshing cannot vouch for readiness
+        if self.running and age > self.interval_seconds * 3:
+            snapshot["ready"] = False
+            snapshot["reasons"] = snapshot["reasons"] + ["health snapshot is stale"]
+        return snapshot
+
+
+health_prober = HealthProber(
+    interval_seconds=settings.health_probe_interval_seconds,
+    max_pool_wait_ms=settings.readiness_max_pool_wait_ms,
+    max_loop_lag_ms=settings.readiness_max_loop_lag_ms,
+)
@@ -2,8 +2,15 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from slices.core.config import settings
+from slices.core.lifespan import lifespan
 from slices.health_check.api.routes import router as health_router
 from slices.medical_management.api.routes import api_router as medical_router
+from slices.observability.api.routes import router as metrics_router
+from slices.observability.infrastructure.middleware import MetricsMiddleware
+from slices.shared.infrastructure.admission import AdmissionControlMiddleware
+from slices.shared.infrastructure.compression import CompressionMiddleware
+from slices.shared.infrastructure.deadlines import DeadlineMiddleware
+from slices.shared.infrastructure.replica import ReadYourWritesMiddleware
 
 
 def create_app() -> FastAPI:
@@ -13,8 +20,21 @@ def create_app() -> FastAPI:
         title=settings.project_name,
         version="1.0.0",
         openapi_url=f"{settings.api_v1_str}/openapi.json",
+        lifespan=lifespan,
     )
 
+    # Pins callers that wrote to the primary until the replica catches up
+    app.add_middleware(ReadYourWritesMiddleware)
+
+    # gzip / brotli for complete responses (streams and 304s pass through)
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_minimum_size)
+
+    # Priority admission control (inside CORS so 503s stay readable by browsers)
+    app.add_middleware(AdmissionControlMiddleware)
+
+    # Per-tier request deadlines (outside admission, so queueing counts against them)
+    app.add_middleware(DeadlineMiddleware)
+
     # CORS middleware
     app.add_middleware(
         CORSMiddleware,
@@ -24,8 +44,12 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # Request latency / in-flight metrics (outermost, so CORS time is included)
+    app.add_middleware(MetricsMiddleware)
+
     # Include routers
     app.include_router(health_router, tags=["health"])
+    app.include_router(metrics_router, tags=["observability"])
     app.include_router(medical_router, tags=["medical"])
 
     return app
@@ -0,0 +1,93 @@
+// The page URL is <api>/qr/emergency/<token>/page: the record is a GET on the
+// same path without /page, and the bearer token comes from <api>/auth/login
+const recordUrl = window.location.pathname.replace(/\/page\/?$/, '');
+const loginUrl = recordUrl.replace(/\/qr\/emergency\/[^/]+$/, '/auth/login');
+
+function escapeHtml(value) {
+    return String(value ?? '').replace(/[&<>"']/g, c => ({
+        '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+    })[c]);
+}
+
+async function detailOf(response, fallback) {
+    const body = await response.json().catch(() => ({}));
+    return typeof body.detail === 'string' ? body.detail : fallback;
+}
+
+document.getElementById('accessForm').addEventListener('submit', async function(e) {
+    e.preventDefault();
+
+    try {
+        const login = await fetch(loginUrl, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                email: document.getElementById('email').value,
+                password: document.getElementById('password').value
+            })
+        });
+        if (!login.ok) {
+            alert('Acceso denegado: ' + await detailOf(login, 'Credenciales inválidas'));
+            return;
+        }
+        const { access_token } = await login.json();
+
+        const response = await fetch(recordUrl, {
+            headers: { 'Authorization': `Bearer ${access_token}` }
+        });
+        if (!response.ok) {
+            alert('Acceso denegado: ' + await detailOf(response, 'Sin permiso para ver este registro'));
+            return;
+        }
+        const result = await response.json();
+        displayMedicalInfo(result.patient, result.staleness);
+    } catch (error) {
+        alert('Error al acceder a la información médica');
+    }
+});
+
+function entries(items, kind, render) {
+    return (items || []).map(item => `<div class="entry ${kind}">${render(item)}</div>`).join('');
+}
+
+function displayMedicalInfo(patient, staleness) {
+    const e = escapeHtml;
+    const medicalInfoDiv = document.getElementById('medicalInfo');
+    const contact = [patient.emergency_contact_name, patient.emergency_contact_phone].filter(Boolean).join(' - ');
+    medicalInfoDiv.innerHTML = `
+        ${staleness ? `<div class="stale">Datos guardados el ${e(new Date(staleness.as_of).toLocaleString())}: pueden no estar actualizados</div>` : ''}
+        <h3>Información Médica de Emergencia</h3>
+        <div class="medical-grid">
+            <div>
+                <h4>Información Personal</h4>
+                <p><strong>Nombre:</strong> ${e(patient.first_name)} ${e(patient.last_name)}</p>
+                <p><strong>Documento:</strong> ${e(patient.document_type)} ${e(patient.document_number)}</p>
+                <p><strong>Fecha de Nacimiento:</strong> ${e(patient.birth_date)}</p>
+                <p><strong>Tipo de Sangre:</strong> ${e(patient.blood_type)}</p>
+                <p><strong>EPS:</strong> ${e(patient.eps)}</p>
+                <p><strong>Contacto de Emergencia:</strong> ${e(contact)}</p>
+            </div>
+
+            <div>
+                <h4>Alergias</h4>
+                ${entries(patient.allergies, 'allergy', allergy =>
+                    `<strong>${e(allergy.allergen)}</strong> (${e(allergy.severity)})<br><small>${e(allergy.symptoms)}</small>`)}
+            </div>
+
+            <div>
+                <h4>Enfermedades</h4>
+                ${entries(patient.illnesses, 'illness', illness =>
+                    `<strong>${e(illness.illness_name)}</strong> (${e(illness.status)})<br><small>${e(illness.notes || 'Sin notas')}</small>`)}
+            </div>
+
+            <div>
+                <h4>Cirugías</h4>
+                ${entries(patient.surgeries, 'surgery', surgery =>
+                    `<strong>${e(surgery.surgery_name)}</strong> (${e(surgery.surgery_date)})<br><small>Hospital: ${e(surgery.hospital)}</small>`)}
+            </div>
+        </div>
+    `;
+    medicalInfoDiv.style.display = 'block';
+}
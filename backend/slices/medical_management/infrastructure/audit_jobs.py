@@ -0,0 +1,96 @@
+"""
+Audit writes taken off the request path.
+
+The emergency lookup and the admin routes (approval, rejection, restoring
+an archived record) enqueue these jobs instead of writing the audit rows
+inline; the auth routes have none to move. Each row's id and timestamp are
+fixed when the job is enqueued, and inserts use ``ON CONFLICT DO NOTHING``,
+so a redelivered job cannot write a row, count an access or publish a scan
+event twice.
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, Optional
+
+from slices.core.config import settings
+from slices.medical_management.infrastructure.qr_events import qr_access_events
+from slices.shared.infrastructure.jobs import jobs
+
+
+def _connect():
+    from slices.observability.infrastructure.db import instrumented_connect
+
+    return instrumented_connect(settings.sync_database_url)
+
+
+def _insert_qr_access(log_id: str, qr_code_id: str, accessed_by_user_id: str, access_type: str,
+                      scanned_at: str) -> bool:
+    conn = _connect()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO qr_access_logs
+                (id, qr_code_id, accessed_by_user_id, access_type, ip_address, success, created_at)
+                SELECT %s, pqr.id, %s, %s, %s, true, %s
+                FROM patient_qr_codes pqr
+                WHERE pqr.id = %s
+                ON CONFLICT DO NOTHING
+            """, (log_id, accessed_by_user_id, access_type, "unknown", scanned_at, qr_code_id))
+            if cursor.rowcount == 0:
+                conn.rollback()
+                return False
+            cursor.execute("""
+                UPDATE patient_qr_codes
+                SET access_count = access_count + 1,
+                    last_accessed_at = %s,
+                    updated_at = NOW()
+                WHERE id = %s
+            """, (scanned_at, qr_code_id))
+        conn.commit()
+        return True
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+@jobs.task("record_qr_access", queue="audit", max_attempts=8)
+async def record_qr_access(log_id: str, qr_code_id: str, accessed_by_user_id: str, access_type: str,
+                           scanned_at: str, patient_id: str, patient_user_id: str) -> None:
+    """Log an emergency lookup, count it on the QR code and announce the scan
+
+    Takes the code's id, not its token, so no token is kept in the job queue.
+    """
+    inserted = await asyncio.to_thread(
+        _insert_qr_access, log_id, qr_code_id, accessed_by_user_id, access_type, scanned_at
+    )
+    if not inserted:
+        return  # already recorded by an earlier delivery (or the QR code is gone)
+    await qr_access_events.publish(
+        {"log_id": log_id, "scanned_at": scanned_at, "patient_id": patient_id, "access_type": access_type},
+        patient_user_id=patient_user_id,
+        accessed_by_user_id=accessed_by_user_id,
+    )
+
+
+@jobs.task("record_admin_action", queue="audit", max_attempts=8)
+def record_admin_action(action_id: str, admin_id: str, target_user_id: Optional[str], action_type: str,
+                        details: Dict[str, Any], created_at: str) -> None:
+    """Append one row to ``admin_actions``"""
+    conn = _connect()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO admin_actions (
+                    id, admin_id, target_user_id, action_type, action_details, created_at
+                ) VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT DO NOTHING
+            """, (action_id, admin_id, target_user_id, action_type, json.dumps(details), created_at))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
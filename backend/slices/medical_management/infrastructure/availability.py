@@ -0,0 +1,157 @@
+"""
+Registration pre-check: Bloom filters of registered emails and documents.
+
+``/auth/check-email`` and ``/auth/check-document`` run on every blur of the
+signup form. When the filter says a value is definitely not registered, the
+endpoint answers without touching PostgreSQL. A possible hit falls through
+to the usual indexed query. The registration and profile paths publish new
+values as they commit.
+
+Each worker pulls the shared bitmap every ``availability_filter_refresh_seconds``,
+so a value registered through another worker can read as free for that long.
+This is acceptable for a form hint, and the unique indexes still reject the
+actual registration. When Redis has no complete bitmap, the first worker to
+notice rebuilds it from the tables.
+"""
+
+import asyncio
+import logging
+from typing import Iterator, Optional, Tuple
+
+from slices.core.config import settings
+from slices.observability.infrastructure.metrics import registry
+from slices.shared.infrastructure.bloom import BloomFilter, SharedBloomFilter, build
+
+logger = logging.getLogger(__name__)
+
+availability_precheck_total = registry.counter(
+    "availability_precheck_total",
+    "Registration availability checks by filter and outcome",
+    ("filter", "outcome"),
+)
+
+EMAILS_SQL = "SELECT lower(email) FROM users"
+DOCUMENTS_SQL = "SELECT document_type || ':' || document_number FROM patients"
+
+
+def email_key(email: str) -> str:
+    # Same normalisation as the check-email query
+    return email.lower()
+
+
+def document_key(document_type: str, document_number: str) -> str:
+    return f"{document_type}:{document_number}"
+
+
+def _shared_redis():
+    from slices.shared.infrastructure.redis import get_redis
+
+    return get_redis()
+
+
+def _filter(name: str) -> SharedBloomFilter:
+    return SharedBloomFilter(
+        name,
+        settings.availability_filter_capacity,
+        settings.availability_filter_error_rate,
+        _shared_redis,
+        max_staleness_seconds=3 * settings.availability_filter_refresh_seconds,
+    )
+
+
+email_filter = _filter("registered_emails")
+document_filter = _filter("registered_documents")
+
+
+def definitely_free(bloom: SharedBloomFilter, key: str) -> bool:
+    """True when ``key`` is certainly not registered (no query needed)"""
+    if not settings.availability_filter_enabled:
+        return False
+    answer = bloom.might_contain(key)
+    if answer is None:
+        availability_precheck_total.inc(filter=bloom.name, outcome="unavailable")
+        return False
+    if not answer:
+        availability_precheck_total.inc(filter=bloom.name, outcome="free")
+        return True
+    return False
+
+
+def record_lookup(bloom: SharedBloomFilter, exists: bool) -> None:
+    """Outcome of the database query behind a possible hit"""
+    if settings.availability_filter_enabled and bloom.ready:
+        availability_precheck_total.inc(filter=bloom.name, outcome="taken" if exists else "false_positive")
+
+
+async def note_registered_email(email: str) -> None:
+    await email_filter.publish(email_key(email))
+
+
+async def note_registered_document(document_type: str, document_number: str) -> None:
+    await document_filter.publish(document_key(document_type, document_number))
+
+
+def _stream(sql: str) -> Iterator[str]:
+    # Own connection: a full scan stays out of the request concurrency limit
+    import psycopg2
+
+    conn = psycopg2.connect(settings.sync_database_url, connect_timeout=10)
+    try:
+        with conn.cursor(name="availability_filter") as cursor:
+            cursor.itersize = 10_000
+            cursor.execute(sql)
+            for (value,) in cursor:
+                yield value
+    finally:
+        conn.close()
+
+
+def load(sql: str) -> Tuple[BloomFilter, int]:
+    return build(
+        _stream(sql), settings.availability_filter_capacity, settings.availability_filter_error_rate
+    )
+
+
+class AvailabilityFilterSync:
+    """Keeps both filters loaded: pull from Redis, rebuild from the tables when missing"""
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self.filters = ((email_filter, EMAILS_SQL), (document_filter, DOCUMENTS_SQL))
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="availability-filters")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def refresh(self) -> None:
+        for bloom, sql in self.filters:
+            found = await bloom.pull()
+            if found or (found is None and bloom.loaded):
+                continue  # unreachable Redis: the filter goes stale, checks use the database
+            if found is False and not await bloom.claim_rebuild():
+                continue  # another worker is rebuilding it
+            try:
+                source, count = await asyncio.to_thread(load, sql)
+            except Exception as e:
+                logger.warning("Could not build the %s filter: %s", bloom.name, e)
+                continue
+            await bloom.seed(source, count)
+            logger.info("Built the %s filter from %d rows", bloom.name, count)
+
+    async def _run(self) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval_seconds)
+
+
+availability_filter_sync = AvailabilityFilterSync(settings.availability_filter_refresh_seconds)
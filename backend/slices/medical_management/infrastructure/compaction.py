@@ -0,0 +1,182 @@
+"""
+Compaction of soft-deleted clinical records (``allergies``, ``illnesses``,
+``surgeries``).
+
+Deleting an entry only sets ``deleted_at``, and every read filters those rows
+out, so without compaction the live tables and their indexes keep growing
+with rows no query returns. Compaction moves rows soft-deleted more than
+``record_retention_days`` ago into ``<table>_archive`` (migration
+``record_archive_001``):
+
+- rows move in batches of ``record_compaction_batch_size``, one short
+  transaction each (``DELETE ... RETURNING`` into the archive), picking rows
+  with ``FOR UPDATE SKIP LOCKED`` so a batch never waits on a request;
+- the session runs with a ``lock_timeout``, and the job pauses
+  ``record_compaction_pause_seconds`` between batches;
+- an advisory lock keeps it to one worker at a time.
+
+``restore_record`` moves an archived row back into its live table, undeleted,
+and ``archived_records`` lists a patient's archived entries for audits. A
+column added to a clinical table must be added to its archive table too.
+
+Run once by hand with ``python -m slices.medical_management.infrastructure.compaction``.
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+from slices.core.config import settings
+from slices.shared.infrastructure.periodic import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+COMPACTED_TABLES = ("allergies", "illnesses", "surgeries")
+
+# pg_try_advisory_lock key shared by all workers ("cmpt" in ASCII)
+COMPACTION_LOCK_KEY = 0x636D7074
+
+LOCK_TIMEOUT = "2s"
+
+# Column values of a restored row; everything else comes back as archived
+RESTORED_VALUES = {"deleted_at": "NULL", "is_active": "true", "updated_at": "NOW()"}
+
+
+def archive_table(table: str) -> str:
+    return f"{table}_archive"
+
+
+def retention_cutoff(retention_days: int, now: Optional[datetime] = None) -> datetime:
+    # deleted_at is a plain timestamp written with NOW() in the server time zone
+    return (now or datetime.now()) - timedelta(days=retention_days)
+
+
+def compact_batch_sql(table: str, columns: Sequence[str]) -> str:
+    """Move up to ``%(limit)s`` rows deleted before ``%(cutoff)s`` into the archive"""
+    names = ", ".join(columns)
+    return (
+        f"WITH batch AS ("
+        f"SELECT id FROM {table} WHERE deleted_at < %(cutoff)s "
+        f"ORDER BY deleted_at LIMIT %(limit)s FOR UPDATE SKIP LOCKED"
+        f"), moved AS ("
+        f"DELETE FROM {table} t USING batch WHERE t.id = batch.id RETURNING t.*"
+        f") INSERT INTO {archive_table(table)} ({names}) SELECT {names} FROM moved"
+    )
+
+
+def restore_sql(table: str, columns: Sequence[str]) -> str:
+    """Move the archived row ``%(id)s`` back into ``table``, undeleted"""
+    values = ", ".join(f"{RESTORED_VALUES[c]} AS {c}" if c in RESTORED_VALUES else c for c in columns)
+    return (
+        f"WITH moved AS (DELETE FROM {archive_table(table)} WHERE id = %(id)s RETURNING *) "
+        f"INSERT INTO {table} ({', '.join(columns)}) SELECT {values} FROM moved "
+        f"RETURNING id, patient_id"
+    )
+
+
+def _columns(cursor, table: str) -> List[str]:
+    cursor.execute(
+        """
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s
+        ORDER BY ordinal_position
+        """,
+        (table,),
+    )
+    return [row["column_name"] if isinstance(row, dict) else row[0] for row in cursor.fetchall()]
+
+
+def compact_table(conn, table: str, cutoff: datetime, batch_size: int, pause_seconds: float = 0.0) -> int:
+    """Archive every row of ``table`` deleted before ``cutoff``; returns how many moved"""
+    with conn.cursor() as cursor:
+        statement = compact_batch_sql(table, _columns(cursor, table))
+    conn.commit()
+    moved = 0
+    while True:
+        with conn.cursor() as cursor:
+            cursor.execute(statement, {"cutoff": cutoff, "limit": batch_size})
+            count = cursor.rowcount
+        conn.commit()
+        moved += count
+        if count < batch_size:
+            return moved
+        time.sleep(pause_seconds)
+
+
+def compact_records(conn, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Archive expired soft-deleted rows of every clinical table"""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", (COMPACTION_LOCK_KEY,))
+        if not cursor.fetchone()[0]:
+            conn.commit()
+            return {"skipped": "compaction running elsewhere"}
+        cursor.execute(f"SET lock_timeout = '{LOCK_TIMEOUT}'")
+    conn.commit()
+    cutoff = retention_cutoff(settings.record_retention_days, now)
+    summary: Dict[str, Any] = {"cutoff": cutoff.isoformat()}
+    try:
+        for table in COMPACTED_TABLES:
+            try:
+                summary[table] = compact_table(
+                    conn, table, cutoff,
+                    settings.record_compaction_batch_size,
+                    settings.record_compaction_pause_seconds,
+                )
+            except Exception as e:
+                # Batches already moved are committed; the rest waits for the next run
+                conn.rollback()
+                logger.error("Could not compact %s: %s", table, e)
+                summary[table] = {"error": str(e)}
+            else:
+                if summary[table]:
+                    logger.info("Archived %d soft-deleted rows of %s", summary[table], table)
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (COMPACTION_LOCK_KEY,))
+        conn.commit()
+    return summary
+
+
+def restore_record(cursor, table: str, record_id: str) -> Optional[Dict[str, Any]]:
+    """Move one archived row back into ``table`` (caller commits); None if not archived"""
+    if table not in COMPACTED_TABLES:
+        raise ValueError(f"{table} is not archived")
+    cursor.execute(restore_sql(table, _columns(cursor, table)), {"id": record_id})
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return dict(row) if isinstance(row, dict) else {"id": row[0], "patient_id": row[1]}
+
+
+def archived_records(cursor, patient_id: str) -> Dict[str, List[Dict[str, Any]]]:
+    """A patient's archived entries per table, most recently deleted first (dict cursor)"""
+    records = {}
+    for table in COMPACTED_TABLES:
+        cursor.execute(
+            f"SELECT * FROM {archive_table(table)} WHERE patient_id = %s ORDER BY deleted_at DESC",
+            (patient_id,),
+        )
+        records[table] = [dict(row) for row in cursor.fetchall()]
+    return records
+
+
+def run_compaction() -> Dict[str, Any]:
+    # Own connection: long runs stay out of the request concurrency limit
+    import psycopg2
+
+    conn = psycopg2.connect(settings.sync_database_url, connect_timeout=10)
+    try:
+        return compact_records(conn)
+    finally:
+        conn.close()
+
+
+record_compactor = PeriodicTask("record-compaction", run_compaction, settings.record_compaction_interval_hours * 3600)
+
+
+if __name__ == "__main__":
+    import json
+
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(run_compaction(), indent=2))
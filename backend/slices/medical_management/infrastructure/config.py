@@ -7,7 +7,6 @@ and other infrastructure-related settings.
 
 from pydantic_settings import BaseSettings
 from typing import Optional
-import os
 
 
 class MedicalConfig(BaseSettings):
@@ -44,11 +43,9 @@ class MedicalConfig(BaseSettings):
         env_prefix = "MEDICAL_"
 
 
-# Global configuration instance
-medical_config = MedicalConfig()
-
-
 # Database URL for Alembic
 def get_database_url() -> str:
     """Get database URL for Alembic migrations"""
-    return medical_config.database_url
\ No newline at end of file
+    from slices.core.config import settings
+
+    return settings.database_url
\ No newline at end of file
@@ -0,0 +1,68 @@
+"""
+Stand-ins for emergency records the database cannot serve right now.
+
+Every successful emergency lookup is remembered by the worker, keyed by the
+token's hash. Records stay in memory only, and the least recently used ones
+are dropped beyond ``emergency_fallback_max_entries``. When the database
+cannot answer, because the circuit is open, the deadline passed or the
+connection failed, ``recall`` returns the fresher of:
+
+- the worker's last good record, if at most ``emergency_fallback_seconds``
+  old;
+- the node's encrypted snapshot (``emergency_snapshot``), which also covers
+  codes this worker has never looked up.
+
+The route marks such responses as stale (``Age``, ``Warning: 110`` and a
+``staleness`` field). A paramedic gets the recent record rather than an
+error.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from slices.core.config import settings
+from slices.medical_management.infrastructure.emergency_snapshot import emergency_snapshot
+from slices.medical_management.infrastructure.qr_tokens import hash_token
+from slices.observability.infrastructure.metrics import registry
+
+emergency_fallback_total = registry.counter(
+    "emergency_fallback_total",
+    "Emergency lookups the database could not answer, by fallback source (or miss)",
+    ("outcome",),
+)
+
+
+class EmergencyFallback:
+    def __init__(self, max_entries: int, max_age_seconds: float):
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self._records: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = OrderedDict()
+
+    def remember(self, token: str, record: Dict[str, Any]) -> None:
+        key = hash_token(token)
+        self._records[key] = (record, time.monotonic())
+        self._records.move_to_end(key)
+        while len(self._records) > self.max_entries:
+            self._records.popitem(last=False)
+
+    def recall(self, token: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """(record, age in seconds) of the last good lookup, if recent enough"""
+        entry = self._records.get(hash_token(token))
+        if entry is not None and time.monotonic() - entry[1] <= self.max_age_seconds:
+            return entry[0], time.monotonic() - entry[1]
+        return None
+
+
+emergency_fallback = EmergencyFallback(settings.emergency_fallback_max_entries, settings.emergency_fallback_seconds)
+
+
+def recall(token: str) -> Optional[Tuple[Dict[str, Any], float, str]]:
+    """(record, age in seconds, source) of the freshest stand-in, if any"""
+    best = None
+    for source, store in (("worker", emergency_fallback), ("snapshot", emergency_snapshot)):
+        found = store.recall(token)
+        if found is not None and (best is None or found[1] < best[1]):
+            best = (found[0], found[1], source)
+    emergency_fallback_total.inc(outcome=best[2] if best else "miss")
+    return best
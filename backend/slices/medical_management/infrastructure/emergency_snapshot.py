@@ -0,0 +1,528 @@
+"""
+Node-local snapshot of emergency records, served while PostgreSQL is down.
+
+Each API node keeps one file (``emergency_snapshot_path``) with the emergency
+record behind every active QR code. Its workers map it read-only. The
+emergency route only reads it when the database cannot answer (see
+``emergency_fallback``), and then says how old the record is. Layout
+(little-endian)::
+
+    header   magic, key id, synced_at, built_at, epoch, change stream position,
+             index offset, entry count
+    records  nonce + AES-GCM(zlib(JSON record)), the token hash as associated data
+    index    (token hash, owner tag, offset, length), sorted by token hash
+
+A lookup is a binary search of the mapped index plus one decryption. The key
+is derived from ``SECRET_KEY``. The file holds no tokens and no medical data
+in clear, and a file written with another key is rebuilt, never read.
+
+One worker per node holds ``<path>.lock`` and keeps the file current:
+
+- it follows the ``record_version:changes`` stream, which every write to a
+  patient's record or QR code bumps. It reloads the changed patients from
+  the primary, rewrites the file and swaps it in with ``os.replace``.
+  Unchanged records are copied as they are, without decrypting them;
+- it rebuilds from scratch whenever the stream cannot be trusted: on first
+  start, after a new epoch (bumps were missed), when entries were trimmed
+  before it read them, after a key change, every
+  ``emergency_snapshot_rebuild_hours``, and every ten minutes while Redis
+  is unreachable;
+- when nothing changed, it only moves ``synced_at`` forward, in place.
+
+``synced_at`` is when the snapshot last matched the database, and the age
+served with a record counts from it. A snapshot older than
+``emergency_snapshot_max_age_hours`` is not served.
+
+Needs the ``cryptography`` package; without it the snapshot is disabled.
+"""
+
+import asyncio
+import fcntl
+import hashlib
+import hmac
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from slices.core.config import settings
+from slices.medical_management.infrastructure.qr_tokens import hash_token
+from slices.medical_management.infrastructure.record_versions import CHANGES_KEY, EPOCH_KEY
+from slices.observability.infrastructure.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+emergency_snapshot_entries = registry.gauge(
+    "emergency_snapshot_entries",
+    "Emergency records in this node's snapshot",
+)
+emergency_snapshot_age_seconds = registry.gauge(
+    "emergency_snapshot_age_seconds",
+    "Seconds since this node's snapshot last matched the database",
+)
+emergency_snapshot_syncs_total = registry.counter(
+    "emergency_snapshot_syncs_total",
+    "Emergency snapshot syncs by kind",
+    ("kind",),
+)
+
+MAGIC = b"VGSNAP01"
+# magic, key id, synced_at, built_at, epoch, stream ms, stream seq, index offset, count
+HEADER = struct.Struct("<8s8sddqQQQI4x")
+SYNCED_AT = struct.Struct("<d")
+SYNCED_AT_OFFSET = 16
+# token hash, owner tag, offset, length
+ENTRY = struct.Struct("<32s8sQI")
+NONCE_BYTES = 12
+
+UNKNOWN_EPOCH = -1  # built without the change feed
+FEEDLESS_REBUILD_SECONDS = 600
+FETCH_BATCH = 500
+READ_BATCH = 1000
+
+Position = Tuple[int, int]
+
+# Shared with the live lookup in the QR routes, so both build the same record
+EMERGENCY_QR_SQL = """
+    SELECT pqr.token_hash, pqr.id AS qr_code_id, pqr.patient_id, pqr.is_active, pqr.expires_at,
+           p.user_id, p.document_type, p.document_number, p.birth_date,
+           p.gender, p.blood_type, p.eps, p.emergency_contact_name,
+           p.emergency_contact_phone, p.address, p.city,
+           u.first_name, u.last_name, u.phone, u.email
+    FROM patient_qr_codes pqr
+    JOIN patients p ON pqr.patient_id = p.id
+    JOIN users u ON p.user_id = u.id
+    WHERE pqr.is_active = true AND {where}
+"""
+
+CLINICAL_SQL = {
+    "allergies": """
+        SELECT patient_id, allergen, severity, symptoms, treatment, diagnosed_date, notes
+        FROM allergies
+        WHERE patient_id = ANY(%s) AND is_active = true AND deleted_at IS NULL
+        ORDER BY patient_id, severity DESC, diagnosed_date DESC
+    """,
+    "illnesses": """
+        SELECT patient_id, name as illness_name, cie10_code, diagnosed_date, status,
+               symptoms, treatment, prescribed_by, notes, is_chronic
+        FROM illnesses
+        WHERE patient_id = ANY(%s) AND is_active = true AND deleted_at IS NULL
+        ORDER BY patient_id, diagnosed_date DESC
+    """,
+    "surgeries": """
+        SELECT patient_id, name as surgery_name, surgery_date, surgeon, hospital,
+               description, diagnosis, anesthesia_type, surgery_duration_minutes, notes
+        FROM surgeries
+        WHERE patient_id = ANY(%s) AND is_active = true AND deleted_at IS NULL
+        ORDER BY patient_id, surgery_date DESC
+    """,
+}
+
+
+def with_clinical_entries(cursor, qr_rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Emergency records for rows of ``EMERGENCY_QR_SQL``, three queries per batch"""
+    patient_ids = list({row["patient_id"] for row in qr_rows})
+    entries: Dict[str, Dict[str, List]] = {kind: {} for kind in CLINICAL_SQL}
+    for kind, sql in CLINICAL_SQL.items():
+        cursor.execute(sql, (patient_ids,))
+        for row in cursor.fetchall():
+            row = dict(row)
+            entries[kind].setdefault(row.pop("patient_id"), []).append(row)
+    return [
+        {
+            "qr": {k: v for k, v in row.items() if k != "token_hash"},
+            **{kind: entries[kind].get(row["patient_id"], []) for kind in CLINICAL_SQL},
+        }
+        for row in qr_rows
+    ]
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"$d": value.isoformat()}
+    return str(value)
+
+
+def _decode(obj: Dict[str, Any]):
+    if len(obj) == 1:
+        if "$dt" in obj:
+            return datetime.fromisoformat(obj["$dt"])
+        if "$d" in obj:
+            return date.fromisoformat(obj["$d"])
+    return obj
+
+
+class SnapshotCipher:
+    """AES-256-GCM for records, with keys derived from ``secret``"""
+
+    def __init__(self, secret: str):
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+        key = HKDF(
+            algorithm=hashes.SHA256(), length=32, salt=None, info=b"vitalgo emergency snapshot"
+        ).derive(secret.encode())
+        self._aead = AESGCM(key)
+        self._owner_key = hashlib.sha256(b"owner:" + key).digest()
+        self.key_id = hashlib.sha256(b"id:" + key).digest()[:8]
+
+    def seal(self, token_hash: bytes, record: Dict[str, Any]) -> bytes:
+        body = zlib.compress(json.dumps(record, default=_encode, separators=(",", ":")).encode())
+        nonce = os.urandom(NONCE_BYTES)
+        return nonce + self._aead.encrypt(nonce, body, token_hash)
+
+    def open(self, token_hash: bytes, blob: bytes) -> Dict[str, Any]:
+        body = self._aead.decrypt(blob[:NONCE_BYTES], blob[NONCE_BYTES:], token_hash)
+        return json.loads(zlib.decompress(body), object_hook=_decode)
+
+    def owner_tag(self, user_id: str) -> bytes:
+        """Keyed tag of the patient's user id: finds their entry without storing the id"""
+        return hmac.new(self._owner_key, user_id.encode(), hashlib.sha256).digest()[:8]
+
+
+@lru_cache
+def snapshot_cipher() -> Optional[SnapshotCipher]:
+    try:
+        return SnapshotCipher(settings.secret_key)
+    except ImportError:
+        logger.warning("cryptography is not installed, the emergency snapshot is disabled")
+        return None
+
+
+class SnapshotFile:
+    """A snapshot file mapped read-only"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, self.key_id, _, self.built_at, self.epoch, stream_ms, stream_seq,
+             self.index_offset, self.count) = HEADER.unpack_from(self._map)
+        except struct.error:
+            magic = None
+        if magic != MAGIC or self.index_offset + self.count * ENTRY.size > len(self._map):
+            self._map.close()
+            raise ValueError(f"{path} is not an emergency snapshot")
+        self.position: Position = (stream_ms, stream_seq)
+
+    @property
+    def synced_at(self) -> float:
+        # Read from the mapping each time: the writer moves it forward in place
+        return SYNCED_AT.unpack_from(self._map, SYNCED_AT_OFFSET)[0]
+
+    def find(self, token_hash: bytes) -> Optional[bytes]:
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            at = self.index_offset + mid * ENTRY.size
+            key = self._map[at:at + 32]
+            if key < token_hash:
+                lo = mid + 1
+            elif key > token_hash:
+                hi = mid
+            else:
+                _, _, offset, length = ENTRY.unpack_from(self._map, at)
+                return self._map[offset:offset + length]
+        return None
+
+    def entries(self) -> Iterator[Tuple[bytes, bytes, int, int]]:
+        for i in range(self.count):
+            yield ENTRY.unpack_from(self._map, self.index_offset + i * ENTRY.size)
+
+    def blob(self, offset: int, length: int) -> bytes:
+        return self._map[offset:offset + length]
+
+    def close(self) -> None:
+        self._map.close()
+
+
+def write_snapshot(
+    path: str,
+    key_id: bytes,
+    synced_at: float,
+    built_at: float,
+    epoch: int,
+    position: Position,
+    records: Iterable[Tuple[bytes, bytes, bytes]],
+) -> int:
+    """Write (token hash, owner tag, sealed record) entries and swap the file in; returns the count"""
+    tmp = f"{path}.tmp"
+    index = []
+    with open(tmp, "wb") as f:
+        f.write(bytes(HEADER.size))
+        offset = HEADER.size
+        for token_hash, owner, blob in records:
+            f.write(blob)
+            index.append((token_hash, owner, offset, len(blob)))
+            offset += len(blob)
+        index.sort()
+        for entry in index:
+            f.write(ENTRY.pack(*entry))
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, key_id, synced_at, built_at, epoch, *position, offset, len(index)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return len(index)
+
+
+def rewrite(
+    path: str,
+    cipher: SnapshotCipher,
+    current: Optional[SnapshotFile],
+    fresh: Iterable[Tuple[bytes, Dict[str, Any]]],
+    owners: Optional[Set[str]],
+    epoch: int,
+    position: Position,
+    synced_at: float,
+) -> int:
+    """Write the snapshot from ``fresh`` (token hash, record) pairs
+
+    With ``owners`` None, ``fresh`` is every active code. Otherwise it is the
+    active codes of those users, and the entries of everyone else are copied
+    from ``current``.
+    """
+    sealed = ((h, cipher.owner_tag(r["qr"]["user_id"]), cipher.seal(h, r)) for h, r in fresh)
+    if owners is None:
+        return write_snapshot(path, cipher.key_id, synced_at, synced_at, epoch, position, sealed)
+    fresh_entries = list(sealed)
+    replaced = {cipher.owner_tag(owner) for owner in owners} | {owner for _, owner, _ in fresh_entries}
+    kept = (
+        (h, owner, current.blob(offset, length))
+        for h, owner, offset, length in current.entries()
+        if owner not in replaced
+    )
+    return write_snapshot(
+        path, cipher.key_id, synced_at, current.built_at, epoch, position, chain(kept, fresh_entries)
+    )
+
+
+def _open(path: str, cipher: SnapshotCipher, current: Optional[SnapshotFile]) -> Optional[SnapshotFile]:
+    """The file at ``path`` if it is a snapshot under this key, reusing ``current`` when unchanged"""
+    try:
+        inode = os.stat(path).st_ino
+    except FileNotFoundError:
+        inode = None
+    if current is not None and current.inode == inode:
+        return current
+    if current is not None:
+        current.close()
+    if inode is None:
+        return None
+    try:
+        snapshot = SnapshotFile(path)
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring emergency snapshot: %s", e)
+        return None
+    if snapshot.key_id != cipher.key_id:
+        snapshot.close()
+        return None
+    return snapshot
+
+
+class EmergencySnapshot:
+    """This node's snapshot as the emergency route reads it"""
+
+    def __init__(self, path: str, max_age_seconds: float):
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self._file: Optional[SnapshotFile] = None
+
+    def recall(self, token: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """(record, age in seconds) from the snapshot, if it has the code and is recent enough"""
+        cipher = snapshot_cipher() if self.path else None
+        if cipher is None:
+            return None
+        self._file = _open(self.path, cipher, self._file)
+        if self._file is None:
+            return None
+        age = max(0.0, time.time() - self._file.synced_at)
+        if age > self.max_age_seconds:
+            return None
+        token_hash = hash_token(token)
+        blob = self._file.find(token_hash)
+        if blob is None:
+            return None
+        try:
+            return cipher.open(token_hash, blob), age
+        except Exception as e:
+            logger.warning("Unreadable emergency snapshot entry: %s", e)
+            return None
+
+
+def _stream_id(raw) -> Position:
+    ms, _, seq = (raw.decode() if isinstance(raw, bytes) else raw).partition("-")
+    return int(ms), int(seq or 0)
+
+
+def _load(conn, where: str, params: tuple) -> Iterator[Tuple[bytes, Dict[str, Any]]]:
+    """(token hash, record) of every active code matching ``where``, in batches"""
+    from psycopg2.extras import RealDictCursor
+
+    with conn.cursor("emergency_snapshot", cursor_factory=RealDictCursor) as codes, \
+            conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        codes.itersize = FETCH_BATCH
+        codes.execute(EMERGENCY_QR_SQL.format(where=where), params)
+        while True:
+            rows = codes.fetchmany(FETCH_BATCH)
+            if not rows:
+                return
+            for row, record in zip(rows, with_clinical_entries(cursor, rows)):
+                yield bytes(row["token_hash"]), record
+
+
+class EmergencySnapshotSync:
+    """Keeps this node's snapshot current; one worker per node writes it"""
+
+    def __init__(self, path: str, interval_seconds: float, rebuild_seconds: float, redis_factory: Callable):
+        self.path = path
+        self.interval_seconds = interval_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self._redis_factory = redis_factory
+        self._lock_file = None
+        self._current: Optional[SnapshotFile] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="emergency-snapshot")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+        if self._lock_file is not None:
+            self._lock_file.close()  # releases the lock for the next worker
+            self._lock_file = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                emergency_snapshot_syncs_total.inc(kind="failed")
+                logger.warning("Emergency snapshot sync failed: %s", e)
+            if self._current is not None:
+                emergency_snapshot_age_seconds.set(time.time() - self._current.synced_at)
+            await asyncio.sleep(self.interval_seconds)
+
+    async def sync(self) -> Optional[str]:
+        """Bring the snapshot up to date if this worker is the node's writer; returns the kind of sync"""
+        cipher = snapshot_cipher()
+        if cipher is None or not self._is_writer():
+            return None
+        current = self._current = _open(self.path, cipher, self._current)
+        started = time.time()
+        try:
+            epoch, position, owners = await self._changes(current)
+        except Exception as e:
+            if current is not None and started - current.synced_at < FEEDLESS_REBUILD_SECONDS:
+                return None
+            logger.warning("Record change feed unavailable, rebuilding the emergency snapshot: %s", e)
+            epoch, position, owners = UNKNOWN_EPOCH, (0, 0), None
+        if current is not None and started - current.built_at >= self.rebuild_seconds:
+            owners = None
+
+        if owners is not None and not owners:
+            self._touch(started)
+            kind = "unchanged"
+        else:
+            count = await asyncio.to_thread(self._write, cipher, current, owners, epoch, position, started)
+            self._current = _open(self.path, cipher, current)
+            emergency_snapshot_entries.set(count)
+            kind = "full" if owners is None else "incremental"
+        emergency_snapshot_syncs_total.inc(kind=kind)
+        return kind
+
+    async def _changes(self, current: Optional[SnapshotFile]) -> Tuple[int, Position, Optional[Set[str]]]:
+        """(epoch, stream position, users changed since ``current``); None users means rebuild"""
+        redis = self._redis_factory()
+        epoch = int(await redis.get(EPOCH_KEY) or 0)
+        if current is None or current.epoch != epoch or await self._trimmed(redis, current.position):
+            last = await redis.xrevrange(CHANGES_KEY, count=1)
+            return epoch, _stream_id(last[0][0]) if last else (0, 0), None
+        owners: Set[str] = set()
+        position = current.position
+        while True:
+            batch = await redis.xrange(CHANGES_KEY, min=f"({position[0]}-{position[1]}", count=READ_BATCH)
+            for entry_id, fields in batch:
+                owner = fields.get(b"owner") or fields.get("owner")
+                owners.add(owner.decode() if isinstance(owner, bytes) else owner)
+                position = _stream_id(entry_id)
+            if len(batch) < READ_BATCH:
+                return epoch, position, owners
+
+    @staticmethod
+    async def _trimmed(redis, position: Position) -> bool:
+        """Whether changes after ``position`` may have been trimmed (or lost with Redis)"""
+        if position == (0, 0):
+            return False
+        first = await redis.xrange(CHANGES_KEY, count=1)
+        return not first or _stream_id(first[0][0]) > position
+
+    def _write(self, cipher, current, owners, epoch, position, synced_at) -> int:
+        # Own connection to the primary, like the other maintenance tasks
+        import psycopg2
+
+        conn = psycopg2.connect(settings.sync_database_url, connect_timeout=10)
+        try:
+            conn.set_session(readonly=True)
+            if owners is None:
+                fresh = _load(conn, "true", ())
+            else:
+                fresh = _load(conn, "p.user_id = ANY(%s)", (list(owners),))
+            return rewrite(self.path, cipher, current, fresh, owners, epoch, position, synced_at)
+        finally:
+            conn.close()
+
+    def _touch(self, synced_at: float) -> None:
+        with open(self.path, "r+b") as f:
+            os.pwrite(f.fileno(), SYNCED_AT.pack(synced_at), SYNCED_AT_OFFSET)
+
+    def _is_writer(self) -> bool:
+        if self._lock_file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            lock_file = open(f"{self.path}.lock", "ab")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                return False
+            self._lock_file = lock_file
+            logger.info("This worker keeps the emergency snapshot at %s", self.path)
+        return True
+
+
+def _shared_redis():
+    from slices.shared.infrastructure.redis import get_redis
+
+    return get_redis()
+
+
+emergency_snapshot = EmergencySnapshot(
+    settings.emergency_snapshot_path, settings.emergency_snapshot_max_age_hours * 3600
+)
+emergency_snapshot_sync = EmergencySnapshotSync(
+    settings.emergency_snapshot_path,
+    interval_seconds=settings.emergency_snapshot_sync_seconds,
+    rebuild_seconds=settings.emergency_snapshot_rebuild_hours * 3600,
+    redis_factory=_shared_redis,
+)
@@ -152,7 +152,7 @@ class RealCommandHandlers:
                 institution=command.institution,
                 years_experience=command.years_experience,
                 license_expiry_date=command.license_expiry_date,
-                is_approved=False  # Requires manual approval
+                status="PENDIENTE"  # Requires manual approval
             )
             
             db.add(paramedic)
@@ -1,7 +1,46 @@
 """
 SQLAlchemy models for VitalGo Medical Management
+
+This module is the authoritative description of the schema the API queries
+(tables, columns and indexes). Alembic autogenerate compares against it, and
+the migrations under ``alembic/versions`` bring a database to it.
+
+Indexes follow the predicates the routes actually run, not the columns:
+
+- clinical lists and the emergency view filter
+  ``patient_id = ? AND is_active = true AND deleted_at IS NULL``. That is served
+  by a partial ``*_patient_live`` index per table. The plain ``*_patient_id``
+  index serves ``ON DELETE CASCADE`` and the lists that include inactive rows;
+- the emergency lookup ``token_hash = ? AND is_active`` probes one unique
+  index over active codes only, covering ``patient_id``/``expires_at``
+  (see ``qr_tokens.py``);
+- audit tables are partitioned by month (see ``partitions.py``);
+- compaction finds long soft-deleted clinical rows through a partial
+  ``*_deleted`` index that holds deleted rows only, and moves them to
+  ``*_archive`` tables (see ``compaction.py``).
+
+Columns nobody filters on are deliberately left unindexed, since every index
+is paid for on every insert and update. ``tests/medical_management/test_query_plans.py``
+checks that the hot queries use these indexes.
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, ForeignKey, Text
+from sqlalchemy import (
+    ARRAY,
+    Boolean,
+    CheckConstraint,
+    Column,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    PrimaryKeyConstraint,
+    String,
+    Table,
+    Text,
+    text,
+)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -9,43 +48,71 @@ import uuid
 
 Base = declarative_base()
 
+# Rows visible to clinical queries
+LIVE_ROWS = text("is_active = true AND deleted_at IS NULL")
+# Rows waiting for compaction
+DELETED_ROWS = text("deleted_at IS NOT NULL")
+# QR codes that can still be scanned
+ACTIVE_CODES = text("is_active")
+
+
+def _uuid() -> str:
+    return str(uuid.uuid4())
+
+
 class User(Base):
     __tablename__ = "users"
-    
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    email = Column(String(255), unique=True, nullable=False)
+    __table_args__ = (
+        CheckConstraint("role IN ('patient', 'paramedic', 'admin')", name="ck_users_role"),
+        # Admin queue of paramedics awaiting approval, newest first
+        Index(
+            "ix_users_pending_paramedics", text("created_at DESC"),
+            postgresql_where=text("role = 'paramedic' AND is_active = false"),
+        ),
+    )
+
+    id = Column(String(36), primary_key=True, default=_uuid)
+    email = Column(String(255), nullable=False, unique=True, index=True)
     password_hash = Column(String(255), nullable=False)
     first_name = Column(String(100), nullable=False)
     last_name = Column(String(100), nullable=False)
     phone = Column(String(20), nullable=False)
-    role = Column(String(50), nullable=False)  # "patient" or "paramedic"
-    is_active = Column(Boolean, default=True, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
-    
+    role = Column(String(20), nullable=False)
+    is_active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+    deleted_at = Column(DateTime)
+
     # Relationships
     patient = relationship("Patient", back_populates="user", uselist=False)
-    paramedic = relationship("Paramedic", back_populates="user", uselist=False)
+    paramedic = relationship("Paramedic", back_populates="user", uselist=False, foreign_keys="Paramedic.user_id")
 
 
 class Patient(Base):
     __tablename__ = "patients"
-    
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
-    document_type = Column(String(10), nullable=False)
-    document_number = Column(String(50), nullable=False)
+    __table_args__ = (
+        CheckConstraint("gender IN ('M', 'F', 'O')", name="ck_patients_gender"),
+        CheckConstraint(
+            "blood_type IN ('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-')", name="ck_patients_blood_type"
+        ),
+    )
+
+    id = Column(String(36), primary_key=True, default=_uuid)
+    user_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    document_type = Column(String(5), nullable=False)
+    document_number = Column(String(20), nullable=False, unique=True, index=True)
     birth_date = Column(Date, nullable=False)
-    gender = Column(String(1), nullable=False)  # M/F
+    gender = Column(String(1), nullable=False)
     blood_type = Column(String(5), nullable=False)
     eps = Column(String(100), nullable=False)
-    emergency_contact_name = Column(String(200), nullable=False)
+    emergency_contact_name = Column(String(100), nullable=False)
     emergency_contact_phone = Column(String(20), nullable=False)
-    address = Column(String(500))
+    address = Column(Text)
     city = Column(String(100))
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
-    
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+    deleted_at = Column(DateTime)
+
     # Relationships
     user = relationship("User", back_populates="patient")
     allergies = relationship("Allergy", back_populates="patient")
@@ -56,108 +123,225 @@ class Patient(Base):
 
 class Paramedic(Base):
     __tablename__ = "paramedics"
-    
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
-    medical_license = Column(String(100), nullable=False)
+    __table_args__ = (
+        CheckConstraint(
+            "status IN ('PENDIENTE', 'APROBADO', 'RECHAZADO', 'SUSPENDIDO')", name="ck_paramedics_status"
+        ),
+        CheckConstraint("years_experience >= 0 AND years_experience <= 60", name="ck_paramedics_experience"),
+    )
+
+    id = Column(String(36), primary_key=True, default=_uuid)
+    user_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    medical_license = Column(String(50), nullable=False, unique=True, index=True)
     specialty = Column(String(100), nullable=False)
     institution = Column(String(200), nullable=False)
     years_experience = Column(Integer, nullable=False)
     license_expiry_date = Column(DateTime, nullable=False)
-    is_approved = Column(Boolean, default=False, nullable=False)
-    approved_at = Column(DateTime(timezone=True))
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
-    
+    status = Column(String(20), nullable=False, default="PENDIENTE")
+    approved_by = Column(String(36), ForeignKey("users.id", ondelete="SET NULL"))
+    approved_at = Column(DateTime)
+    rejection_reason = Column(Text)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+    deleted_at = Column(DateTime)
+
     # Relationships
-    user = relationship("User", back_populates="paramedic")
+    user = relationship("User", back_populates="paramedic", foreign_keys=[user_id])
+
+    @property
+    def is_approved(self) -> bool:
+        return self.status == "APROBADO"
 
 
 class Allergy(Base):
     __tablename__ = "allergies"
-    
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    patient_id = Column(String, ForeignKey("patients.id"), nullable=False)
+    __table_args__ = (
+        CheckConstraint("severity IN ('LEVE', 'MODERADA', 'SEVERA', 'CRITICA')", name="ck_allergies_severity"),
+        Index("ix_allergies_patient_live", "patient_id", postgresql_where=LIVE_ROWS),
+        Index("ix_allergies_deleted", "deleted_at", postgresql_where=DELETED_ROWS),
+    )
+
+    id = Column(String(36), primary_key=True, default=_uuid)
+    patient_id = Column(String(36), ForeignKey("patients.id", ondelete="CASCADE"), nullable=False, index=True)
     allergen = Column(String(200), nullable=False)
-    severity = Column(String(50), nullable=False)  # "MILD", "MODERATE", "SEVERE"
-    symptoms = Column(Text)
-    diagnosed_date = Column(Date)
+    severity = Column(String(20), nullable=False)
+    symptoms = Column(Text, nullable=False)
+    treatment = Column(Text)
+    diagnosed_date = Column(DateTime)
+    last_reaction_date = Column(DateTime)
     notes = Column(Text)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
-    
+    is_active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+    deleted_at = Column(DateTime)
+
     # Relationships
     patient = relationship("Patient", back_populates="allergies")
 
 
 class Illness(Base):
     __tablename__ = "illnesses"
-    
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    patient_id = Column(String, ForeignKey("patients.id"), nullable=False)
+    __table_args__ = (
+        CheckConstraint("status IN ('ACTIVA', 'RESUELTA', 'CRONICA')", name="ck_illnesses_status"),
+        Index("ix_illnesses_patient_live", "patient_id", postgresql_where=LIVE_ROWS),
+        Index("ix_illnesses_deleted", "deleted_at", postgresql_where=DELETED_ROWS),
+    )
+
+    id = Column(String(36), primary_key=True, default=_uuid)
+    patient_id = Column(String(36), ForeignKey("patients.id", ondelete="CASCADE"), nullable=False, index=True)
     name = Column(String(200), nullable=False)
-    diagnosis_date = Column(Date)
-    status = Column(String(50), nullable=False, default="ACTIVE")  # "ACTIVE", "RESOLVED", "CHRONIC"
+    cie10_code = Column(String(10))
+    status = Column(String(20), nullable=False, default="ACTIVA")
+    diagnosed_date = Column(DateTime, nullable=False)
+    resolved_date = Column(DateTime)
+    symptoms = Column(Text)
     treatment = Column(Text)
+    prescribed_by = Column(String(100))
     notes = Column(Text)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
-    
+    is_chronic = Column(Boolean, nullable=False, default=False)
+    is_active = Column(Boolean, nullable=False, default=True, server_default=text("true"))
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+    deleted_at = Column(DateTime)
+
     # Relationships
     patient = relationship("Patient", back_populates="illnesses")
 
 
 class Surgery(Base):
     __tablename__ = "surgeries"
-    
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    patient_id = Column(String, ForeignKey("patients.id"), nullable=False)
-    procedure_name = Column(String(200), nullable=False)
-    date = Column(Date, nullable=False)
-    surgeon = Column(String(200))
-    hospital = Column(String(200))
-    complications = Column(Text)
+    __table_args__ = (
+        Index("ix_surgeries_patient_live", "patient_id", postgresql_where=LIVE_ROWS),
+        Index("ix_surgeries_deleted", "deleted_at", postgresql_where=DELETED_ROWS),
+    )
+
+    id = Column(String(36), primary_key=True, default=_uuid)
+    patient_id = Column(String(36), ForeignKey("patients.id", ondelete="CASCADE"), nullable=False, index=True)
+    name = Column(String(200), nullable=False)
+    surgery_date = Column(DateTime, nullable=False)
+    surgeon = Column(String(100), nullable=False)
+    hospital = Column(String(200), nullable=False)
+    description = Column(Text)
+    diagnosis = Column(Text)
+    complications = Column(ARRAY(Text))
+    recovery_notes = Column(Text)
+    anesthesia_type = Column(String(100))
+    surgery_duration_minutes = Column(Integer)
+    follow_up_required = Column(Boolean, nullable=False, default=False)
+    follow_up_date = Column(DateTime)
     notes = Column(Text)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
-    
+    is_active = Column(Boolean, nullable=False, default=True, server_default=text("true"))
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+    deleted_at = Column(DateTime)
+
     # Relationships
     patient = relationship("Patient", back_populates="surgeries")
 
 
+def _archive_of(model) -> Table:
+    """``<table>_archive``: the model's columns without foreign keys, plus ``archived_at``"""
+    name = f"{model.__tablename__}_archive"
+    columns = [
+        Column(c.name, c.type, nullable=c.nullable, primary_key=c.primary_key) for c in model.__table__.columns
+    ]
+    return Table(
+        name, Base.metadata, *columns,
+        Column("archived_at", DateTime, nullable=False, server_default=func.now()),
+        Index(f"ix_{name}_patient", "patient_id", text("deleted_at DESC")),
+    )
+
+
+allergies_archive = _archive_of(Allergy)
+illnesses_archive = _archive_of(Illness)
+surgeries_archive = _archive_of(Surgery)
+
+
 class PatientQRCode(Base):
     __tablename__ = "patient_qr_codes"
-    
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    patient_id = Column(String, ForeignKey("patients.id"), nullable=False)
-    qr_code = Column(String(100), unique=True, nullable=False)
-    is_active = Column(Boolean, default=True, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    expires_at = Column(DateTime(timezone=True))
-    
+    __table_args__ = (
+        # Emergency lookup by token hash: active codes only, covering so it can skip the heap
+        Index(
+            "ux_patient_qr_codes_active_token", "token_hash", unique=True,
+            postgresql_include=["patient_id", "expires_at"], postgresql_where=ACTIVE_CODES,
+        ),
+        # At most one active code per patient (issuing a new one retires the old)
+        Index("ux_patient_qr_codes_active_patient", "patient_id", unique=True, postgresql_where=ACTIVE_CODES),
+        # Expiry sweep
+        Index(
+            "ix_patient_qr_codes_active_expiry", "expires_at",
+            postgresql_where=text("is_active AND expires_at IS NOT NULL"),
+        ),
+    )
+
+    id = Column(String(36), primary_key=True, default=_uuid)
+    patient_id = Column(String(36), ForeignKey("patients.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(LargeBinary(32), nullable=False)  # SHA-256 of the token, never the token
+    is_active = Column(Boolean, nullable=False, default=True)
+    expires_at = Column(DateTime)
+    deactivated_at = Column(DateTime)
+    last_accessed_at = Column(DateTime)
+    access_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+
     # Relationships
     patient = relationship("Patient", back_populates="qr_codes")
 
 
 class EPS(Base):
     __tablename__ = "eps"
-    
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+
+    id = Column(String(36), primary_key=True, default=_uuid)
     name = Column(String(200), nullable=False, unique=True)
     code = Column(String(50), nullable=False, unique=True)
     regime_type = Column(String(20), nullable=False)  # "contributivo", "subsidiado", "ambos"
     status = Column(String(20), nullable=False, default="activa")  # "activa", "inactiva", "liquidacion"
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    updated_at = Column(DateTime, onupdate=func.now())
 
 
 class QRAccessLog(Base):
+    """Partitioned by month on ``created_at`` (hence the composite key)"""
+
     __tablename__ = "qr_access_logs"
-    
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    qr_code = Column(String(100), nullable=False)
-    accessor_type = Column(String(50), nullable=False)  # "PATIENT", "PARAMEDIC", "ANONYMOUS"
-    accessor_id = Column(String)  # User ID if authenticated
-    accessed_at = Column(DateTime(timezone=True), server_default=func.now())
+    __table_args__ = (
+        PrimaryKeyConstraint("id", "created_at"),
+        CheckConstraint("access_type IN ('patient', 'paramedic', 'anonymous')", name="ck_qr_access_type"),
+        Index(
+            "ix_qr_access_logs_user_created", "accessed_by_user_id", text("created_at DESC"),
+            postgresql_where=text("success"),
+        ),
+        Index("ix_qr_access_logs_created", text("created_at DESC")),
+        Index("ix_qr_access_logs_qr_code_id", "qr_code_id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    id = Column(String(36), nullable=False, default=_uuid)
+    qr_code_id = Column(String(36), ForeignKey("patient_qr_codes.id", ondelete="CASCADE"), nullable=False)
+    accessed_by_user_id = Column(String(36), ForeignKey("users.id", ondelete="SET NULL"))
+    access_type = Column(String(20), nullable=False)
     ip_address = Column(String(45))
-    user_agent = Column(Text)
\ No newline at end of file
+    user_agent = Column(Text)
+    success = Column(Boolean, nullable=False, default=True)
+    error_message = Column(Text)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+
+class AdminAction(Base):
+    """Partitioned by month on ``created_at`` (hence the composite key)"""
+
+    __tablename__ = "admin_actions"
+    __table_args__ = (
+        PrimaryKeyConstraint("id", "created_at"),
+        Index("ix_admin_actions_created", text("created_at DESC")),
+        Index("ix_admin_actions_admin_created", "admin_id", text("created_at DESC")),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    id = Column(String(36), nullable=False, server_default=text("gen_random_uuid()::VARCHAR"))
+    admin_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    target_user_id = Column(String(36))
+    action_type = Column(String(50), nullable=False)
+    action_details = Column(JSONB)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -0,0 +1,213 @@
+"""
+Monthly range partitions for the audit tables (``qr_access_logs``,
+``admin_actions``), partitioned on ``created_at``.
+
+Maintenance is idempotent and safe to run from every worker; an advisory
+lock makes sure only one of them works at a time:
+
+- partitions are created ``audit_partition_months_ahead`` months ahead so
+  inserts never land in the ``_default`` catch-all partition (rows that did
+  land there are moved into their month when it is created);
+- partitions older than ``audit_retention_months`` are detached, written to
+  ``audit_archive_dir`` as gzipped CSV and then dropped. A partition whose
+  archive fails stays detached and is retried on the next run.
+
+Run once by hand with ``python -m slices.medical_management.infrastructure.partitions``.
+"""
+
+import gzip
+import logging
+import os
+import re
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from slices.core.config import settings
+from slices.shared.infrastructure.periodic import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+AUDIT_TABLES = ("qr_access_logs", "admin_actions")
+
+# pg_try_advisory_lock key shared by all workers ("audit" in ASCII)
+MAINTENANCE_LOCK_KEY = 0x61756469
+
+
+def month_floor(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def partition_month(table: str, name: str) -> Optional[date]:
+    """Month covered by a partition named by ``partition_name``, else None"""
+    match = re.fullmatch(re.escape(table) + r"_p(\d{4})(\d{2})", name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def _bound(month: date) -> str:
+    # Explicit UTC so timestamptz bounds do not depend on the session time zone;
+    # the offset is ignored for plain timestamp columns
+    return f"'{month:%Y-%m-%d} 00:00:00+00'"
+
+
+def create_partition_sql(table: str, month: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+        f"FOR VALUES FROM ({_bound(month)}) TO ({_bound(add_months(month, 1))})"
+    )
+
+
+def create_default_partition_sql(table: str) -> str:
+    return f"CREATE TABLE IF NOT EXISTS {default_partition_name(table)} PARTITION OF {table} DEFAULT"
+
+
+def _existing_tables(cursor, table: str) -> Dict[str, bool]:
+    """Monthly partition tables of ``table`` -> whether they are still attached"""
+    cursor.execute(
+        """
+        SELECT c.relname, i.inhrelid IS NOT NULL
+        FROM pg_class c
+        LEFT JOIN pg_inherits i
+          ON i.inhrelid = c.oid AND i.inhparent = %s::regclass
+        WHERE c.relkind = 'r'
+          AND c.relnamespace = current_schema()::regnamespace
+          AND c.relname LIKE %s
+        """,
+        (table, f"{table}\\_p%"),
+    )
+    return {name: attached for name, attached in cursor.fetchall() if partition_month(table, name)}
+
+
+def ensure_partitions(conn, table: str, through: date, start: Optional[date] = None) -> List[str]:
+    """Create the monthly partitions from ``start`` (default: this month) up to ``through``"""
+    start = month_floor(start or datetime.now(timezone.utc).date())
+    created = []
+    with conn.cursor() as cursor:
+        existing = _existing_tables(cursor, table)
+        month = start
+        while month <= month_floor(through):
+            name = partition_name(table, month)
+            if name not in existing:
+                _create_partition(cursor, table, month)
+                created.append(name)
+            month = add_months(month, 1)
+    conn.commit()
+    return created
+
+
+def _create_partition(cursor, table: str, month: date) -> None:
+    default = default_partition_name(table)
+    lower, upper = _bound(month), _bound(add_months(month, 1))
+    cursor.execute(
+        f"SELECT EXISTS (SELECT 1 FROM {default} WHERE created_at >= {lower} AND created_at < {upper})"
+    )
+    if not cursor.fetchone()[0]:
+        cursor.execute(create_partition_sql(table, month))
+        return
+    # A month cannot be carved out while the default partition holds its rows
+    cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {default}")
+    cursor.execute(create_partition_sql(table, month))
+    cursor.execute(
+        f"WITH moved AS (DELETE FROM {default} WHERE created_at >= {lower} AND created_at < {upper} "
+        f"RETURNING *) INSERT INTO {table} SELECT * FROM moved"
+    )
+    cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT")
+
+
+def archive_partition(conn, name: str, directory: str) -> str:
+    """Write a (detached) partition to ``directory/<name>.csv.gz`` and return the path"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}.csv.gz")
+    partial = f"{path}.partial"
+    with conn.cursor() as cursor, gzip.open(partial, "wt", encoding="utf-8") as archive:
+        cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER true)", archive)
+    os.replace(partial, path)
+    return path
+
+
+def apply_retention(conn, table: str, keep_months: int, archive_dir: str, today: Optional[date] = None) -> List[str]:
+    """Detach, archive and drop partitions older than ``keep_months``; returns archive paths"""
+    cutoff = add_months(month_floor(today or datetime.now(timezone.utc).date()), -keep_months)
+    archived = []
+    with conn.cursor() as cursor:
+        expired = sorted(
+            (name, attached)
+            for name, attached in _existing_tables(cursor, table).items()
+            if partition_month(table, name) < cutoff
+        )
+    for name, attached in expired:
+        try:
+            if attached:
+                with conn.cursor() as cursor:
+                    cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+                conn.commit()
+            path = archive_partition(conn, name, os.path.join(archive_dir, table))
+            with conn.cursor() as cursor:
+                cursor.execute(f"DROP TABLE {name}")
+            conn.commit()
+            archived.append(path)
+            logger.info("Archived audit partition %s to %s", name, path)
+        except Exception as e:
+            conn.rollback()
+            logger.error("Could not archive audit partition %s (kept detached): %s", name, e)
+    return archived
+
+
+def maintain_audit_partitions(conn, today: Optional[date] = None) -> Dict[str, Any]:
+    """Create upcoming partitions and enforce retention for every audit table"""
+    today = today or datetime.now(timezone.utc).date()
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", (MAINTENANCE_LOCK_KEY,))
+        if not cursor.fetchone()[0]:
+            conn.commit()
+            return {"skipped": "maintenance running elsewhere"}
+    conn.commit()
+    summary: Dict[str, Any] = {}
+    try:
+        for table in AUDIT_TABLES:
+            summary[table] = {
+                "created": ensure_partitions(
+                    conn, table, add_months(month_floor(today), settings.audit_partition_months_ahead), today
+                ),
+                "archived": apply_retention(
+                    conn, table, settings.audit_retention_months, settings.audit_archive_dir, today
+                ),
+            }
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (MAINTENANCE_LOCK_KEY,))
+        conn.commit()
+    return summary
+
+
+def run_maintenance() -> Dict[str, Any]:
+    # Own connection: DDL and archive copies stay out of the request concurrency limit
+    import psycopg2
+
+    conn = psycopg2.connect(settings.sync_database_url, connect_timeout=10)
+    try:
+        return maintain_audit_partitions(conn)
+    finally:
+        conn.close()
+
+
+audit_partition_maintainer = PeriodicTask("audit-partitions", run_maintenance, settings.audit_maintenance_interval_hours * 3600)
+
+
+if __name__ == "__main__":
+    import json
+
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(run_maintenance(), indent=2))
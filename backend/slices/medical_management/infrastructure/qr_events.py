@@ -0,0 +1,191 @@
+"""
+Live QR access events, fanned out over Server-Sent Events.
+
+The access-log writer publishes one small event per scan to a single Redis
+pub/sub channel once the row is committed. Each worker holds one
+subscription to that channel and hands every event to the streams connected
+to it:
+
+- the patient whose QR was scanned,
+- the user who scanned it (a paramedic following their own scans),
+- admins, who see every scan.
+
+An idle stream costs a bounded queue and a heartbeat comment every
+``qr_events_heartbeat_seconds``. No database work happens per connection.
+Events carry ids and timestamps only, never medical data.
+
+Delivery is best effort. A stream that falls behind is closed, and while
+Redis is unreachable, events reach only the streams of the worker that
+wrote them. Clients reconnect and read ``/qr/paramedic/scan-history`` once
+to catch up.
+"""
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import AsyncIterator, Callable, Dict, Optional, Set
+
+from slices.core.config import settings
+from slices.observability.infrastructure.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+qr_event_streams = registry.gauge(
+    "qr_event_streams",
+    "Open QR access event streams on this worker",
+)
+qr_events_total = registry.counter(
+    "qr_events_total",
+    "QR access events by outcome",
+    ("outcome",),
+)
+
+CHANNEL = "qr_access_events"
+ALL = "*"
+
+# Ends a stream: the hub is shutting down or the subscriber fell behind
+_CLOSE = object()
+
+
+class StreamLimitReached(Exception):
+    pass
+
+
+class QRAccessEventHub:
+    """One Redis subscription per worker, fanned out to local SSE streams"""
+
+    def __init__(
+        self,
+        redis_factory: Callable,
+        max_streams: int,
+        heartbeat_seconds: float,
+        queue_size: int = 32,
+        retry_redis_after: float = 5.0,
+    ):
+        self._redis_factory = redis_factory
+        self.max_streams = max_streams
+        self.heartbeat_seconds = heartbeat_seconds
+        self.queue_size = queue_size
+        self.retry_redis_after = retry_redis_after
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._streams = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="qr-access-events")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Let open streams finish so shutdown does not wait on idle clients
+        for queues in list(self._subscribers.values()):
+            for queue in queues:
+                _drain_and_close(queue)
+
+    async def publish(self, event: Dict[str, str], patient_user_id: str, accessed_by_user_id: str) -> None:
+        """Announce a committed scan; never raises"""
+        payload = json.dumps({"event": event, "to": [patient_user_id, accessed_by_user_id]}, default=str)
+        try:
+            await self._redis_factory().publish(CHANNEL, payload)
+        except Exception as e:
+            logger.warning("QR access event not published, delivering locally: %s", e)
+            qr_events_total.inc(outcome="local_only")
+            self.dispatch(json.loads(payload))
+            return
+        qr_events_total.inc(outcome="published")
+
+    def dispatch(self, message: Dict) -> None:
+        queues = set(self._subscribers.get(ALL, ()))
+        for user_id in message["to"]:
+            queues.update(self._subscribers.get(user_id, ()))
+        for queue in queues:
+            if not _offer(queue, message["event"]):
+                qr_events_total.inc(outcome="lagged")
+                _drain_and_close(queue)
+
+    def stream(self, user_id: str, see_all: bool = False) -> AsyncIterator[str]:
+        """SSE frames for one client; raises ``StreamLimitReached`` when full"""
+        if self._streams >= self.max_streams:
+            raise StreamLimitReached()
+        return self._frames(ALL if see_all else user_id)
+
+    async def _frames(self, key: str) -> AsyncIterator[str]:
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self._subscribers[key].add(queue)
+        self._streams += 1
+        qr_event_streams.inc()
+        try:
+            yield f"retry: {int(self.retry_redis_after * 1000)}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is _CLOSE:
+                    return
+                qr_events_total.inc(outcome="delivered")
+                yield f"id: {event['log_id']}\nevent: qr_scanned\ndata: {json.dumps(event)}\n\n"
+        finally:
+            self._subscribers[key].discard(queue)
+            if not self._subscribers[key]:
+                del self._subscribers[key]
+            self._streams -= 1
+            qr_event_streams.dec()
+
+    async def _run(self) -> None:
+        while True:
+            pubsub = None
+            try:
+                pubsub = self._redis_factory().pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(CHANNEL)
+                async for raw in pubsub.listen():
+                    try:
+                        self.dispatch(json.loads(raw["data"]))
+                    except (KeyError, TypeError, ValueError) as e:
+                        logger.warning("Ignoring malformed QR access event: %s", e)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("QR access event subscription lost, retrying: %s", e)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+            await asyncio.sleep(self.retry_redis_after)
+
+
+def _offer(queue: asyncio.Queue, item) -> bool:
+    try:
+        queue.put_nowait(item)
+    except asyncio.QueueFull:
+        return False
+    return True
+
+
+def _drain_and_close(queue: asyncio.Queue) -> None:
+    while not queue.empty():
+        queue.get_nowait()
+    queue.put_nowait(_CLOSE)
+
+
+def _shared_redis():
+    from slices.shared.infrastructure.redis import get_redis
+
+    return get_redis()
+
+
+qr_access_events = QRAccessEventHub(
+    _shared_redis,
+    max_streams=settings.qr_events_max_streams,
+    heartbeat_seconds=settings.qr_events_heartbeat_seconds,
+)
@@ -0,0 +1,118 @@
+"""
+Lifecycle of patient QR codes: issue (and rotate), look up, expire.
+
+Tokens are never stored. ``patient_qr_codes.token_hash`` holds the SHA-256
+of the token (32 bytes), and the lookup is one probe of a unique partial
+index over the active codes only (migration ``qr_token_hash_001``), so
+retired codes do not grow the index:
+
+- ``issue_qr_code`` retires the patient's active code and inserts the new
+  one in the same transaction, so a patient has at most one active code.
+  Issuing again is a rotation. A partial unique index on ``patient_id``
+  enforces this in the database too;
+- the lookup still checks ``expires_at``, and a sweep deactivates expired
+  codes in batches every ``qr_sweep_interval_minutes``, so they leave the
+  index without waiting for a scan.
+
+Sweep once by hand with ``python -m slices.medical_management.infrastructure.qr_tokens``.
+"""
+
+import hashlib
+import logging
+import secrets
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from slices.core.config import settings
+from slices.shared.infrastructure.periodic import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+TOKEN_BYTES = 32
+
+RETIRE_SQL = """
+    UPDATE patient_qr_codes
+    SET is_active = false, deactivated_at = %(now)s, updated_at = NOW()
+    WHERE patient_id = %(patient_id)s AND is_active = true
+"""
+
+INSERT_SQL = """
+    INSERT INTO patient_qr_codes
+        (id, patient_id, token_hash, is_active, expires_at, access_count, created_at, updated_at)
+    VALUES (%(id)s, %(patient_id)s, %(token_hash)s, true, %(expires_at)s, 0, NOW(), NOW())
+"""
+
+SWEEP_SQL = """
+    UPDATE patient_qr_codes
+    SET is_active = false, deactivated_at = %(now)s, updated_at = NOW()
+    WHERE id IN (
+        SELECT id FROM patient_qr_codes
+        WHERE is_active = true AND expires_at < %(now)s
+        LIMIT %(limit)s
+        FOR UPDATE SKIP LOCKED
+    )
+"""
+
+
+def new_token() -> str:
+    return secrets.token_urlsafe(TOKEN_BYTES)
+
+
+def hash_token(token: str) -> bytes:
+    """The stored form of a token (also what the SQL ``sha256(convert_to(t, 'UTF8'))`` gives)"""
+    return hashlib.sha256(token.encode()).digest()
+
+
+def issue_qr_code(cursor, patient_id: str, token: str, expires_at: Optional[datetime]) -> str:
+    """Make ``token`` the patient's only active code (caller commits); returns its id"""
+    # Serializes issuing per patient, so two rotations cannot both insert
+    cursor.execute("SELECT id FROM patients WHERE id = %s FOR NO KEY UPDATE", (patient_id,))
+    if cursor.fetchone() is None:
+        raise ValueError("Patient not found")
+    cursor.execute(RETIRE_SQL, {"now": datetime.now(), "patient_id": patient_id})
+    qr_code_id = str(uuid.uuid4())
+    cursor.execute(INSERT_SQL, {
+        "id": qr_code_id,
+        "patient_id": patient_id,
+        "token_hash": hash_token(token),
+        "expires_at": expires_at,
+    })
+    return qr_code_id
+
+
+def sweep_expired(conn, batch_size: int, now: Optional[datetime] = None) -> int:
+    """Deactivate every expired active code, one short transaction per batch"""
+    # expires_at is written as local time by the API, so compare with the same clock
+    now = now or datetime.now()
+    swept = 0
+    while True:
+        with conn.cursor() as cursor:
+            cursor.execute(SWEEP_SQL, {"now": now, "limit": batch_size})
+            count = cursor.rowcount
+        conn.commit()
+        swept += count
+        if count < batch_size:
+            return swept
+
+
+def run_sweep() -> int:
+    # Own connection, like the other maintenance tasks
+    import psycopg2
+
+    conn = psycopg2.connect(settings.sync_database_url, connect_timeout=10)
+    try:
+        swept = sweep_expired(conn, settings.qr_sweep_batch_size)
+    finally:
+        conn.close()
+    if swept:
+        logger.info("Deactivated %d expired QR codes", swept)
+    return swept
+
+
+qr_token_sweeper = PeriodicTask("qr-token-sweep", run_sweep, settings.qr_sweep_interval_minutes * 60)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(run_sweep())
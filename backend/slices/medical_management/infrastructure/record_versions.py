@@ -0,0 +1,234 @@
+"""
+Per-patient record versions for conditional GETs (ETag / If-None-Match).
+
+Every mutation of a patient's record (clinical entries, profile) bumps a
+counter in Redis, keyed by the patient's user id, which is the id the read
+routes already have from the token or the path. Reads tag responses with
+``W/"<owner>.<epoch>.<version>"``. A request whose ``If-None-Match`` still
+matches gets ``304`` after one Redis call, without touching PostgreSQL.
+
+- A missing counter (first read, eviction, Redis restart) starts at the
+  current Redis time in microseconds. It therefore never goes back to a
+  value an old ETag carries.
+- If a bump fails while Redis is unreachable, the worker increments the
+  global epoch as soon as Redis is back. That invalidates every ETag issued
+  before, so a client cannot get a ``304`` for a record that changed
+  during the outage.
+- While Redis is unavailable, responses carry no ETag and reads simply run.
+- Reads routed to the replica stay there. A bump made with a replica
+  configured stores the primary's WAL position after the write, for
+  ``replica_pin_seconds``; a full read is tagged only once the replica has
+  replayed past it. Otherwise it is served untagged, so a lagging replica
+  never pairs a new version with an old body.
+
+Each bump also appends the owner's user id to the ``record_version:changes``
+stream (capped at ``CHANGES_MAXLEN``). Consumers such as the emergency
+snapshot follow it to learn which records changed. A bump missed during a
+Redis outage shows up to them as a new epoch.
+"""
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, NamedTuple, Optional
+
+from fastapi import HTTPException, Request, Response, status
+
+from slices.core.config import settings
+from slices.observability.infrastructure.metrics import record_cache_lookup, registry
+from slices.shared.infrastructure.replica import on_replica, replica_has_replayed, written_lsn
+
+logger = logging.getLogger(__name__)
+
+conditional_requests_total = registry.counter(
+    "conditional_requests_total",
+    "Patient record reads by conditional outcome",
+    ("outcome",),
+)
+
+KEY_PREFIX = "record_version"
+EPOCH_KEY = f"{KEY_PREFIX}:epoch"
+CHANGES_KEY = f"{KEY_PREFIX}:changes"
+CHANGES_MAXLEN = 100_000
+VERSION_TTL_SECONDS = 30 * 86400
+# Owner "lookup failed": bumping it invalidates every record's ETag
+EVERY_RECORD = "*"
+
+# KEYS[1] record version, KEYS[2] epoch, KEYS[3] change stream, KEYS[4] WAL
+# position of the last write; ARGV '1' to bump, TTL seconds, stream length,
+# owner, WAL position ('' if unknown), its TTL seconds
+VERSION_LUA = """
+local version = redis.call('GET', KEYS[1])
+if not version then
+    local clock = redis.call('TIME')
+    version = string.format('%d', tonumber(clock[1]) * 1000000 + tonumber(clock[2]))
+    redis.call('SET', KEYS[1], version)
+end
+if ARGV[1] == '1' then
+    version = redis.call('INCR', KEYS[1])
+    redis.call('XADD', KEYS[3], 'MAXLEN', '~', ARGV[3], '*', 'owner', ARGV[4])
+    if ARGV[5] ~= '' then
+        local written = redis.call('GET', KEYS[4])
+        if not written or tonumber(written) < tonumber(ARGV[5]) then
+            redis.call('SET', KEYS[4], ARGV[5], 'EX', ARGV[6])
+        end
+    end
+end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return {tostring(version), redis.call('GET', KEYS[2]) or '0', redis.call('GET', KEYS[4]) or ''}
+"""
+
+
+class RecordVersion(NamedTuple):
+    etag: str
+    written_lsn: Optional[int]  # WAL position a replica must reach to serve this version
+
+
+class RecordVersions:
+    """Version counters in Redis, plus the patient id -> user id mapping writes need"""
+
+    def __init__(self, redis_factory: Callable, retry_redis_after: float = 5.0, max_owners: int = 50_000):
+        self._redis_factory = redis_factory
+        self._script = None
+        self.retry_redis_after = retry_redis_after
+        self._redis_down_until = 0.0
+        self._missed_bump = False
+        self._owners: "OrderedDict[str, str]" = OrderedDict()
+        self.max_owners = max_owners
+
+    def remember_owner(self, patient_id: str, user_id: str) -> None:
+        self._owners[patient_id] = user_id
+        self._owners.move_to_end(patient_id)
+        if len(self._owners) > self.max_owners:
+            self._owners.popitem(last=False)
+
+    def owner_of(self, patient_id: str) -> Optional[str]:
+        return self._owners.get(patient_id)
+
+    async def etag(self, user_id: str, bump: bool = False) -> Optional[str]:
+        """Current (or, with ``bump``, new) ETag of a record; ``None`` without Redis"""
+        version = await self.lookup(user_id, bump)
+        return version.etag if version is not None else None
+
+    async def lookup(self, user_id: str, bump: bool = False) -> Optional[RecordVersion]:
+        if time.monotonic() < self._redis_down_until:
+            self._missed_bump |= bump
+            return None
+        try:
+            redis = self._redis_factory()
+            if self._missed_bump:
+                await redis.incr(EPOCH_KEY)
+                self._missed_bump = False
+            if self._script is None:
+                self._script = redis.register_script(VERSION_LUA)
+            lsn = written_lsn() if bump else None
+            version, epoch, lsn_text = await self._script(
+                keys=[f"{KEY_PREFIX}:{user_id}", EPOCH_KEY, CHANGES_KEY, f"{KEY_PREFIX}:{user_id}:lsn"],
+                args=[
+                    "1" if bump else "0",
+                    VERSION_TTL_SECONDS,
+                    CHANGES_MAXLEN,
+                    user_id,
+                    "" if lsn is None else lsn,
+                    max(1, settings.replica_pin_seconds),
+                ],
+            )
+        except Exception as e:
+            self._missed_bump |= bump
+            if time.monotonic() >= self._redis_down_until:
+                logger.warning("Record versions unavailable, serving without ETags: %s", e)
+            self._redis_down_until = time.monotonic() + self.retry_redis_after
+            return None
+        owner = hashlib.sha256(user_id.encode()).hexdigest()[:8]
+        lsn_text = _text(lsn_text)
+        return RecordVersion(
+            f'W/"{owner}.{_text(epoch)}.{_text(version)}"', int(lsn_text) if lsn_text else None
+        )
+
+    async def invalidate_all(self) -> None:
+        self._missed_bump = True
+        try:
+            await self._redis_factory().incr(EPOCH_KEY)
+            self._missed_bump = False
+        except Exception:
+            pass  # retried before the next version lookup
+
+    async def bump(self, user_id: str) -> None:
+        await self.etag(user_id, bump=True)
+
+    def owner_for_bump(self, cursor, patient_id: str) -> Optional[str]:
+        """User id to bump after a committed write to one of the patient's clinical tables
+
+        Looked up (once per patient) with the writer's cursor, so the caller
+        can close its connection before ``bump_owner`` waits on Redis.
+        ``EVERY_RECORD`` if the lookup fails, ``None`` for an unknown patient.
+        """
+        user_id = self.owner_of(patient_id)
+        if user_id is not None:
+            return user_id
+        try:
+            cursor.execute("SELECT user_id FROM patients WHERE id = %s", (patient_id,))
+            row = cursor.fetchone()
+        except Exception as e:
+            # The write is committed: invalidate every ETag rather than fail it
+            logger.warning("Record owner lookup failed, invalidating all ETags: %s", e)
+            return EVERY_RECORD
+        if row is None:
+            return None
+        user_id = row["user_id"] if isinstance(row, dict) else row[0]
+        self.remember_owner(patient_id, user_id)
+        return user_id
+
+    async def bump_owner(self, user_id: Optional[str]) -> None:
+        """Bump what ``owner_for_bump`` returned"""
+        if user_id == EVERY_RECORD:
+            await self.invalidate_all()
+        elif user_id is not None:
+            await self.bump(user_id)
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison (RFC 9110 8.8.3.2): compressed and plain bodies share a tag
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip() == "*" or candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+async def conditional_read(request: Request, response: Response, owner_id: str) -> None:
+    """Answer ``304`` when the client's copy is current, else tag the response"""
+    version = await record_versions.lookup(owner_id)
+    if version is None:
+        conditional_requests_total.inc(outcome="unavailable")
+        return
+    etag = version.etag
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # The client's copy is the cache: a revalidation either hits or misses
+        hit = _matches(if_none_match, etag)
+        record_cache_lookup("record_version", hit)
+        if hit:
+            conditional_requests_total.inc(outcome="not_modified")
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if on_replica() and version.written_lsn is not None and not replica_has_replayed(version.written_lsn):
+        # The replica may not have this version's write yet: tagging its body
+        # would let every later 304 confirm stale data
+        conditional_requests_total.inc(outcome="replica_behind")
+        return
+    conditional_requests_total.inc(outcome="full")
+    response.headers.update(headers)
+
+
+def _shared_redis():
+    from slices.shared.infrastructure.redis import get_redis
+
+    return get_redis()
+
+
+record_versions = RecordVersions(_shared_redis)
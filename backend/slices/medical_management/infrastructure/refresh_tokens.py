@@ -0,0 +1,202 @@
+"""
+Rotating refresh tokens with reuse detection, stored in Redis.
+
+Login issues a refresh token next to the access token. ``/auth/refresh``
+exchanges it for a new access token and a new refresh token, with one Lua
+call and no password check or database query.
+
+- A token is ``<family>.<secret>``. Redis keeps one hash per family (login
+  session), holding the user's claims (profile ids included) and the
+  SHA-256 of the only token currently valid. Raw tokens are never stored.
+- Each use rotates the token. Presenting an older token of the family means
+  it was copied, so the whole family is revoked and both holders have to log
+  in again.
+- Families expire after ``refresh_token_expire_days`` without use, and in any
+  case ``refresh_token_max_age_days`` after login. Password changes and
+  account removal revoke all of a user's families.
+
+There is no per-worker fallback, since a token must be valid on every
+worker. While Redis is down, login still returns an access token without a
+refresh token, and ``/auth/refresh`` answers ``503``.
+"""
+
+import hashlib
+import json
+import logging
+import secrets
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from slices.core.config import settings
+from slices.observability.infrastructure.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+refresh_tokens_total = registry.counter(
+    "refresh_tokens_total",
+    "Refresh token operations by outcome",
+    ("outcome",),
+)
+
+FAMILY_PREFIX = "refresh:family"
+# Access token claims beyond sub/email/role; kept with the family so renewed
+# tokens carry them too (absent from tokens issued before they existed)
+PROFILE_CLAIMS = ("patient_id", "paramedic_id", "approved")
+USER_PREFIX = "refresh:user"
+
+# KEYS[1] family; ARGV presented hash, replacement hash, idle TTL (seconds).
+ROTATE_LUA = """
+local state = redis.call('HMGET', KEYS[1], 'current', 'user_id', 'email', 'role', 'expires_at', 'profile')
+if not state[1] then
+    return {'unknown'}
+end
+if state[1] ~= ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return {'reused', state[2]}
+end
+local now = tonumber(redis.call('TIME')[1])
+local expires_at = tonumber(state[5])
+if now >= expires_at then
+    redis.call('DEL', KEYS[1])
+    return {'expired'}
+end
+redis.call('HSET', KEYS[1], 'current', ARGV[2])
+redis.call('EXPIRE', KEYS[1], math.min(tonumber(ARGV[3]), expires_at - now))
+return {'rotated', state[2], state[3], state[4], state[6] or '{}'}
+"""
+
+
+class RefreshTokenInvalid(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+
+
+class RefreshTokenUnavailable(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Session renewal temporarily unavailable",
+            headers={"Retry-After": "5"},
+        )
+
+
+def profile_claims(user: Dict) -> Dict:
+    return {key: user[key] for key in PROFILE_CLAIMS if user.get(key) is not None}
+
+
+def token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class RefreshTokenStore:
+    """Issues, rotates and revokes refresh token families in Redis"""
+
+    def __init__(self, redis_factory: Callable):
+        self._redis_factory = redis_factory
+        self._script = None
+
+    @property
+    def idle_seconds(self) -> int:
+        return settings.refresh_token_expire_days * 86400
+
+    @property
+    def max_age_seconds(self) -> int:
+        return settings.refresh_token_max_age_days * 86400
+
+    @staticmethod
+    def _family_key(family: str) -> str:
+        return f"{FAMILY_PREFIX}:{family}"
+
+    @staticmethod
+    def _user_key(user_id: str) -> str:
+        return f"{USER_PREFIX}:{user_id}"
+
+    async def issue(self, user: Dict[str, str]) -> Optional[str]:
+        """Start a family for a fresh login; ``None`` when Redis is unavailable"""
+        family = secrets.token_urlsafe(16)
+        token = f"{family}.{secrets.token_urlsafe(32)}"
+        ttl = min(self.idle_seconds, self.max_age_seconds)
+        try:
+            pipe = self._redis_factory().pipeline(transaction=True)
+            pipe.hset(self._family_key(family), mapping={
+                "current": token_hash(token),
+                "user_id": user["id"],
+                "email": user["email"],
+                "role": user["role"],
+                "expires_at": int(time.time()) + self.max_age_seconds,
+                "profile": json.dumps(profile_claims(user)),
+            })
+            pipe.expire(self._family_key(family), ttl)
+            pipe.sadd(self._user_key(user["id"]), family)
+            pipe.expire(self._user_key(user["id"]), self.max_age_seconds)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning("Refresh token not issued, Redis unavailable: %s", e)
+            refresh_tokens_total.inc(outcome="unavailable")
+            return None
+        refresh_tokens_total.inc(outcome="issued")
+        return token
+
+    async def rotate(self, token: str) -> Tuple[Dict[str, str], str]:
+        """Claims of the token's user and its replacement; raises ``RefreshTokenInvalid``"""
+        family, _, secret = token.partition(".")
+        if not family or not secret:
+            refresh_tokens_total.inc(outcome="unknown")
+            raise RefreshTokenInvalid()
+        replacement = f"{family}.{secrets.token_urlsafe(32)}"
+        try:
+            if self._script is None:
+                self._script = self._redis_factory().register_script(ROTATE_LUA)
+            result = await self._script(
+                keys=[self._family_key(family)],
+                args=[token_hash(token), token_hash(replacement), self.idle_seconds],
+            )
+        except Exception as e:
+            logger.warning("Refresh token not rotated, Redis unavailable: %s", e)
+            refresh_tokens_total.inc(outcome="unavailable")
+            raise RefreshTokenUnavailable()
+        values = [v.decode() if isinstance(v, bytes) else v for v in result]
+        outcome = values[0]
+        refresh_tokens_total.inc(outcome=outcome)
+        if outcome == "reused":
+            logger.warning("Refresh token reuse for user %s: session family revoked", values[1])
+        if outcome != "rotated":
+            raise RefreshTokenInvalid()
+        _, user_id, email, role, profile = values
+        return {"id": user_id, "email": email, "role": role, **json.loads(profile)}, replacement
+
+    async def revoke(self, token: str) -> None:
+        """End the session the token belongs to (logout)"""
+        family = token.partition(".")[0]
+        if not family:
+            return
+        try:
+            await self._redis_factory().delete(self._family_key(family))
+        except Exception as e:
+            logger.warning("Refresh token not revoked, Redis unavailable: %s", e)
+            raise RefreshTokenUnavailable()
+        refresh_tokens_total.inc(outcome="revoked")
+
+    async def revoke_user(self, user_id: str) -> None:
+        """End every session of a user (password change, account removal)"""
+        try:
+            redis = self._redis_factory()
+            families = await redis.smembers(self._user_key(user_id))
+            keys = [self._family_key(f.decode() if isinstance(f, bytes) else f) for f in families]
+            await redis.delete(self._user_key(user_id), *keys)
+        except Exception as e:
+            # Refresh tokens then live out their idle timeout at most
+            logger.warning("Could not revoke refresh tokens of user %s: %s", user_id, e)
+            return
+        refresh_tokens_total.inc(len(keys), outcome="revoked")
+
+
+def _shared_redis():
+    from slices.shared.infrastructure.redis import get_redis
+
+    return get_redis()
+
+
+refresh_tokens = RefreshTokenStore(_shared_redis)
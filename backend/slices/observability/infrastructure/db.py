@@ -0,0 +1,187 @@
+"""
+psycopg2 instrumentation for the medical management routes.
+
+Connections created through ``instrumented_connect`` hand out cursors whose
+``execute`` is timed and reported under a stable statement name, so
+``db_query_duration_seconds`` can be broken down per query without exploding
+label cardinality with raw SQL. Connections to the primary go through the
+circuit breaker and every statement's outcome is reported to it; all
+connections get a ``statement_timeout`` from the request deadline.
+"""
+
+import re
+import sys
+import time
+from typing import Dict, Optional, Tuple, Type
+
+import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+from fastapi import HTTPException
+
+from slices.shared.infrastructure import deadlines
+from slices.shared.infrastructure.circuit_breaker import CircuitBreaker, db_breaker, is_database_failure
+from slices.shared.infrastructure.concurrency import db_limiter
+from slices.shared.infrastructure.replica import note_commit
+
+from .metrics import db_pool_checkout_wait_seconds, db_query_duration_seconds
+from .slow_query import slow_query_log
+
+_LEADING_COMMENTS = re.compile(r"^\s*(?:--[^\n]*\n\s*)*")
+_TARGET_TABLE = re.compile(r"^(?:insert\s+into|update|delete\s+from)\s+([a-z_][a-z0-9_]*)", re.IGNORECASE)
+_FROM_TABLE = re.compile(r"\bfrom\s+([a-z_][a-z0-9_]*)", re.IGNORECASE)
+
+
+# Statements that never need a read-your-writes pin
+READ_ONLY_VERBS = frozenset({"select", "show", "explain"})
+
+
+def _statement_parts(sql) -> Tuple[str, str]:
+    """(verb, main table or "") of a SQL statement"""
+    text = sql.decode() if isinstance(sql, bytes) else str(sql)
+    text = _LEADING_COMMENTS.sub("", text)
+    verb = text.split(None, 1)[0].lower() if text.strip() else "other"
+    match = _TARGET_TABLE.match(text) or _FROM_TABLE.search(text)
+    return verb, match.group(1).lower() if match else ""
+
+
+def _join_name(caller: str, verb: str, table: str) -> str:
+    return f"{caller}.{verb}_{table}" if table else f"{caller}.{verb}"
+
+
+def statement_name(sql, caller: str) -> str:
+    """Build a low-cardinality name such as ``handle_get_patient_allergies.select_allergies``"""
+    return _join_name(caller, *_statement_parts(sql))
+
+
+def _caller_name(depth: int = 2) -> str:
+    """Name of the function that called ``cursor.execute``"""
+    try:
+        return sys._getframe(depth).f_code.co_name
+    except ValueError:
+        return "unknown"
+
+
+class _TimedCursorMixin:
+    """Times every ``execute`` call and records it per statement name"""
+
+    def execute(self, query, vars=None):
+        # Parsed once: the verb also decides the read-your-writes pin
+        verb, table = _statement_parts(query)
+        name = _join_name(_caller_name(), verb, table)
+        if verb not in READ_ONLY_VERBS:
+            self.connection._wrote = True
+        breaker = self.connection._breaker
+        failed = False
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        except psycopg2.errors.QueryCanceled:
+            failed = True
+            deadlines.note_failure(deadlines.DEADLINE)
+            raise
+        except Exception as e:
+            failed = is_database_failure(e)
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            if breaker is not None:
+                breaker.record(failed, duration)
+            db_query_duration_seconds.observe(duration, statement=name)
+            db_limiter.observe(duration)
+            slow_query_log.observe(
+                name, query, vars, duration, getattr(self.connection, "source_dsn", None)
+            )
+
+
+_timed_cursor_classes: Dict[type, type] = {}
+
+
+def timed_cursor_class(base: Optional[Type] = None) -> type:
+    """Return (and cache) a timed subclass of the given cursor factory"""
+    base = base or psycopg2.extensions.cursor
+    timed = _timed_cursor_classes.get(base)
+    if timed is None:
+        timed = type(f"Timed{base.__name__}", (_TimedCursorMixin, base), {})
+        _timed_cursor_classes[base] = timed
+    return timed
+
+
+class InstrumentedConnection(psycopg2.extensions.connection):
+    """Connection whose cursors are always timed, whatever factory is requested
+
+    While open it also holds one slot of the adaptive DB concurrency limit.
+    """
+
+    _slot_held = False
+    _wrote = False
+    _breaker: Optional[CircuitBreaker] = None
+
+    def cursor(self, *args, **kwargs):
+        kwargs["cursor_factory"] = timed_cursor_class(
+            kwargs.get("cursor_factory") or self.cursor_factory
+        )
+        return super().cursor(*args, **kwargs)
+
+    def commit(self):
+        super().commit()
+        if self._wrote:
+            # Lets read-your-writes routing pin the caller to this WAL position
+            self._wrote = False
+            note_commit(self)
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._release_slot()
+
+    def _release_slot(self):
+        if self._slot_held:
+            self._slot_held = False
+            db_limiter.release()
+
+    def __del__(self):
+        # Handlers that forget close() must not leak their slot
+        self._release_slot()
+
+
+def instrumented_connect(dsn: str, pool: str = "medical", **kwargs):
+    """Open a timed psycopg2 connection and record how long obtaining it took
+
+    Raises ``DeadlineExceededError`` (504) when the request has no time left
+    and ``CircuitOpenError`` (503) while the primary's breaker is open. Then
+    waits for a slot of the adaptive concurrency limit (counted as checkout
+    wait); raises ``DatabaseOverloadedError`` (503) if none frees up.
+    """
+    timeout_ms = deadlines.statement_timeout_ms()
+    kwargs.setdefault("options", f"-c statement_timeout={timeout_ms}")
+    kwargs.setdefault("connect_timeout", max(2, min(10, timeout_ms // 1000)))
+    breaker = db_breaker if pool == "medical" else None
+    trial = None
+    started = time.perf_counter()
+    try:
+        db_limiter.acquire()
+        if breaker is not None:
+            try:
+                trial = breaker.before_call()
+            except HTTPException:
+                db_limiter.release()
+                deadlines.note_failure(deadlines.CIRCUIT_OPEN)
+                raise
+        try:
+            conn = psycopg2.connect(dsn, connection_factory=InstrumentedConnection, **kwargs)
+        except BaseException as e:
+            db_limiter.release()
+            if breaker is not None:
+                breaker.record(is_database_failure(e), time.perf_counter() - started, trial)
+            raise
+        if breaker is not None:
+            breaker.record(False, time.perf_counter() - started, trial)
+        conn._breaker = breaker
+        conn._slot_held = True
+        # Kept for the slow-query EXPLAIN sampler; ``conn.dsn`` masks the password
+        conn.source_dsn = dsn
+        return conn
+    finally:
+        db_pool_checkout_wait_seconds.observe(time.perf_counter() - started, pool=pool)
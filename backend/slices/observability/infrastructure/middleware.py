@@ -0,0 +1,66 @@
+"""
+ASGI middleware recording request latency and in-flight requests.
+"""
+
+import time
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import http_request_duration_seconds, http_requests_in_progress
+from .slow_query import current_request_scope
+
+
+def resolve_route_template(app, scope: Scope) -> str:
+    """Return the path template (e.g. ``/api/v1/qr/emergency/{qr_token}``) for a request
+
+    Labelling by template instead of raw path keeps the metric cardinality
+    bounded no matter how many QR tokens or patient ids are requested.
+    """
+    matched = scope.get("route")
+    if matched is not None and hasattr(matched, "path"):
+        return matched.path
+
+    router = getattr(app, "router", None)
+    for route in getattr(router, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Observe per-route latency histograms and the in-flight request gauge"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_progress.inc(method=method)
+        scope_token = current_request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request_scope.reset(scope_token)
+            http_requests_in_progress.dec(method=method)
+            route = resolve_route_template(scope.get("app"), scope)
+            http_request_duration_seconds.observe(
+                time.perf_counter() - started,
+                method=method,
+                route=route,
+                status=str(status_code),
+            )
@@ -0,0 +1,232 @@
+"""
+Slow-query log with sampled ``EXPLAIN (ANALYZE, BUFFERS)`` capture.
+
+Every statement slower than ``settings.slow_query_threshold_ms`` is written
+to a JSON-lines file with its normalized text, the shape of its parameters
+(types only, never values), its duration and the route that issued it.
+For read-only statements a sample is periodically re-run under
+``EXPLAIN (ANALYZE, BUFFERS)`` on a separate connection by a background
+thread, so the request that hit the slow path never waits on the plan.
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Scope of the HTTP request being served, set by MetricsMiddleware so the
+# route template is only resolved when a slow statement actually needs it.
+current_request_scope: ContextVar[Optional[dict]] = ContextVar(
+    "current_request_scope", default=None
+)
+
+db_slow_queries_total = registry.counter(
+    "db_slow_queries_total",
+    "Statements slower than the slow-query threshold",
+    ("statement",),
+)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_COMMENT = re.compile(r"--[^\n]*")
+_READ_ONLY = re.compile(r"^\s*select\b", re.IGNORECASE)
+_LOCKING = re.compile(r"\bfor\s+(?:update|share)\b", re.IGNORECASE)
+
+
+def normalize_sql(sql: Any) -> str:
+    """Strip comments, literals and placeholders so equal statements group together"""
+    text = sql.decode() if isinstance(sql, bytes) else str(sql)
+    text = _COMMENT.sub(" ", text)
+    text = _STRING_LITERAL.sub("?", text)
+    text = _PLACEHOLDER.sub("?", text)
+    text = _NUMBER_LITERAL.sub("?", text)
+    text = _IN_LIST.sub("(?)", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def params_shape(params: Any) -> Any:
+    """Describe parameters by type only; values may contain patient data"""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [type(value).__name__ for value in params]
+    return type(params).__name__
+
+
+def scrub_plan(plan: Any) -> Any:
+    """Replace literals that psycopg2 interpolated into plan conditions"""
+    return json.loads(_STRING_LITERAL.sub("'?'", json.dumps(plan)))
+
+
+def _current_route() -> Optional[str]:
+    scope = current_request_scope.get()
+    if scope is None:
+        return None
+    # Imported lazily: the middleware module imports this one
+    from .middleware import resolve_route_template
+
+    return resolve_route_template(scope.get("app"), scope)
+
+
+class SlowQueryLog:
+    """Records slow statements and samples their execution plans"""
+
+    def __init__(
+        self,
+        threshold_ms: float,
+        log_path: str,
+        explain_sample_rate: float = 0.0,
+        explain_interval_seconds: float = 300.0,
+    ):
+        self.threshold_seconds = threshold_ms / 1000.0
+        self.log_path = log_path
+        self.explain_sample_rate = explain_sample_rate
+        self.explain_interval_seconds = explain_interval_seconds
+        self._last_explained: Dict[str, float] = {}
+        self._explain_queue: "queue.Queue[dict]" = queue.Queue(maxsize=100)
+        self._worker: Optional[threading.Thread] = None
+        self._write_lock = threading.Lock()
+
+    def observe(
+        self,
+        statement: str,
+        sql: Any,
+        params: Any,
+        duration: float,
+        dsn: Optional[str] = None,
+    ) -> None:
+        """Called for every executed statement; cheap unless it was slow"""
+        if duration < self.threshold_seconds:
+            return
+
+        db_slow_queries_total.inc(statement=statement)
+        normalized = normalize_sql(sql)
+        self._write({
+            "type": "slow_query",
+            "statement": statement,
+            "query": normalized,
+            "params_shape": params_shape(params),
+            "duration_ms": round(duration * 1000, 3),
+            "route": _current_route(),
+        })
+
+        if dsn and self._should_explain(statement, sql):
+            try:
+                self._explain_queue.put_nowait({
+                    "statement": statement,
+                    "query": normalized,
+                    "sql": sql,
+                    "params": params,
+                    "dsn": dsn,
+                })
+                self._ensure_worker()
+            except queue.Full:
+                pass
+
+    def _should_explain(self, statement: str, sql: Any) -> bool:
+        text = sql.decode() if isinstance(sql, bytes) else str(sql)
+        # EXPLAIN ANALYZE executes the statement: never do that for writes
+        if not _READ_ONLY.match(_COMMENT.sub(" ", text)) or _LOCKING.search(text):
+            return False
+        if random.random() >= self.explain_sample_rate:
+            return False
+        now = time.monotonic()
+        last = self._last_explained.get(statement)
+        if last is not None and now - last < self.explain_interval_seconds:
+            return False
+        self._last_explained[statement] = now
+        return True
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(
+                target=self._explain_loop, name="slow-query-explain", daemon=True
+            )
+            self._worker.start()
+
+    def drain(self, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for queued EXPLAIN jobs; True if none are left"""
+        deadline = time.monotonic() + timeout
+        while self._explain_queue.unfinished_tasks and time.monotonic() < deadline:
+            if self._worker is None or not self._worker.is_alive():
+                break
+            time.sleep(0.05)
+        return not self._explain_queue.unfinished_tasks
+
+    def _explain_loop(self) -> None:
+        while True:
+            job = self._explain_queue.get()
+            try:
+                self._write({
+                    "type": "explain",
+                    "statement": job["statement"],
+                    "query": job["query"],
+                    "plan": scrub_plan(self._explain(job)),
+                })
+            except Exception as e:
+                logger.warning("EXPLAIN sampling failed for %s: %s", job["statement"], e)
+            finally:
+                self._explain_queue.task_done()
+
+    def _explain(self, job: dict) -> Any:
+        import psycopg2
+
+        conn = psycopg2.connect(job["dsn"])
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SET LOCAL statement_timeout = %s", (30_000,))
+                cursor.execute(
+                    "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + str(job["sql"]),
+                    job["params"],
+                )
+                return cursor.fetchone()[0]
+        finally:
+            # Whatever the statement did, leave no trace
+            conn.rollback()
+            conn.close()
+
+    def _write(self, entry: dict) -> None:
+        entry["logged_at"] = datetime.now(timezone.utc).isoformat()
+        line = json.dumps(entry, default=str)
+        logger.warning("slow query: %s", line)
+        if not self.log_path:
+            return
+        try:
+            with self._write_lock:
+                directory = os.path.dirname(self.log_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.log_path, "a", encoding="utf-8") as log_file:
+                    log_file.write(line + "\n")
+        except OSError as e:
+            logger.warning("Could not write slow query log: %s", e)
+
+
+def _build_default_log() -> SlowQueryLog:
+    from slices.core.config import settings
+
+    return SlowQueryLog(
+        threshold_ms=settings.slow_query_threshold_ms,
+        log_path=settings.slow_query_log_path,
+        explain_sample_rate=settings.slow_query_explain_sample_rate,
+        explain_interval_seconds=settings.slow_query_explain_interval_seconds,
+    )
+
+
+slow_query_log = _build_default_log()
@@ -0,0 +1,214 @@
+"""
+Production server entrypoint.
+
+    python -m slices.serve [--workers N] [--port 8000] ...
+
+A small pre-fork supervisor: the parent binds the listening socket and
+imports the application once (preload), then forks ``N`` uvicorn workers
+that share the socket and run on uvloop/httptools when available. Each
+worker runs the lifespan hook itself, so pools and warm-up are per process.
+
+On SIGTERM/SIGINT the parent forwards the signal; workers stop accepting,
+let in-flight requests finish (up to the graceful timeout) and run lifespan
+shutdown, which drains background queues. Workers that die unexpectedly are
+replaced. For development keep using ``uvicorn slices.main:app --reload``.
+"""
+
+import argparse
+import importlib.util
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List, Optional
+
+from slices.core.config import settings
+
+logger = logging.getLogger("slices.serve")
+
+
+def resolve_workers(requested: int) -> int:
+    """``requested`` if positive, otherwise the CPUs this process may run on"""
+    if requested > 0:
+        return requested
+    try:
+        return max(len(os.sched_getaffinity(0)), 1)
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def event_loop_implementation() -> str:
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+
+def http_implementation() -> str:
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def build_config(app, args: argparse.Namespace):
+    import uvicorn
+
+    return uvicorn.Config(
+        app,
+        loop=event_loop_implementation(),
+        http=http_implementation(),
+        lifespan="on",
+        backlog=args.backlog,
+        timeout_keep_alive=args.keepalive,
+        limit_concurrency=args.limit_concurrency,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True,
+        access_log=args.access_log,
+    )
+
+
+def run_worker(app, sock: socket.socket, args: argparse.Namespace) -> None:
+    """Serve on the inherited socket until told to stop; never returns"""
+    import uvicorn
+
+    # uvicorn installs its own handlers while running and re-raises the
+    # captured signal afterwards; make that re-raise a no-op so exit is clean
+    signal.signal(signal.SIGTERM, lambda *_: None)
+    signal.signal(signal.SIGINT, lambda *_: None)
+    status = 0
+    try:
+        uvicorn.Server(build_config(app, args)).run(sockets=[sock])
+    except Exception:
+        logger.exception("Worker %d crashed", os.getpid())
+        status = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(status)
+
+
+class Supervisor:
+    """Forks workers, replaces the ones that die and forwards shutdown signals"""
+
+    def __init__(self, app, sock: socket.socket, args: argparse.Namespace):
+        self.app = app
+        self.sock = sock
+        self.args = args
+        self.workers: Dict[int, float] = {}
+        self.stopping = False
+        self.stop_signal = signal.SIGTERM
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            run_worker(self.app, self.sock, self.args)
+        self.workers[pid] = time.monotonic()
+
+    def handle_stop(self, signum, frame) -> None:
+        self.stopping = True
+        self.stop_signal = signum
+
+    def signal_workers(self, signum: int) -> None:
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                self.workers.pop(pid, None)
+
+    def reap(self) -> List[int]:
+        exited = []
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.workers.clear()
+                break
+            if pid == 0:
+                break
+            started = self.workers.pop(pid, None)
+            if started is not None:
+                exited.append(pid)
+                if not self.stopping:
+                    logger.warning("Worker %d exited (status %d) after %.0fs; replacing it",
+                                   pid, status, time.monotonic() - started)
+        return exited
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+        for _ in range(self.args.workers):
+            self.spawn()
+        logger.info("Serving on %s:%d with %d workers (%s/%s)", self.args.host, self.args.port,
+                    self.args.workers, event_loop_implementation(), http_implementation())
+
+        crash_times: List[float] = []
+        while not self.stopping:
+            for _ in self.reap():
+                now = time.monotonic()
+                crash_times = [t for t in crash_times if now - t < 60] + [now]
+                if len(crash_times) > self.args.workers * 3:
+                    logger.error("Workers keep crashing; shutting down")
+                    self.stopping = True
+                    break
+                self.spawn()
+            time.sleep(0.2)
+
+        logger.info("Draining %d workers", len(self.workers))
+        self.signal_workers(self.stop_signal)
+        deadline = time.monotonic() + self.args.graceful_timeout + 5
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        if self.workers:
+            logger.warning("Killing %d workers that did not drain in time", len(self.workers))
+            self.signal_workers(signal.SIGKILL)
+            while self.workers:
+                self.reap()
+                time.sleep(0.05)
+        self.sock.close()
+        return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.server_host)
+    parser.add_argument("--port", type=int, default=settings.server_port)
+    parser.add_argument("--workers", type=int, default=settings.web_concurrency,
+                        help="Worker processes (0 = one per available CPU)")
+    parser.add_argument("--backlog", type=int, default=settings.server_backlog)
+    parser.add_argument("--keepalive", type=int, default=settings.server_keepalive_seconds,
+                        help="Idle keep-alive timeout in seconds")
+    parser.add_argument("--limit-concurrency", type=int, default=settings.server_limit_concurrency,
+                        help="Max concurrent connections per worker before answering 503")
+    parser.add_argument("--graceful-timeout", type=int, default=settings.server_graceful_timeout_seconds,
+                        help="Seconds to let in-flight requests finish on shutdown")
+    parser.add_argument("--access-log", action="store_true")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    args.workers = resolve_workers(args.workers)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    sock = bind_socket(args.host, args.port, args.backlog)
+    # Preload: import once in the parent so workers fork with the code already loaded
+    from slices.main import app
+
+    if args.workers == 1:
+        import uvicorn
+
+        uvicorn.Server(build_config(app, args)).run(sockets=[sock])
+        return 0
+    return Supervisor(app, sock, args).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+Priority admission control.
+
+Every request is classified into a tier by method and path. A worker admits
+at most ``capacity`` requests at once; each tier may only start work while
+total occupancy is below its own share of that capacity and its own
+in-flight cap. Requests that cannot start wait in a per-tier queue for a
+short, tier-specific time; freed slots go to the most important waiter
+first. Whatever cannot be admitted in time gets ``503`` with
+``Retry-After``.
+
+The effect under overload: admin listings and profile edits are shed
+first, then routine patient traffic, while emergency QR lookups keep
+(nearly) the whole worker to themselves.
+"""
+
+import asyncio
+import json
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Iterable, List, Optional, Pattern, Sequence, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from slices.core.config import settings
+from slices.observability.infrastructure.metrics import registry
+
+admission_in_flight = registry.gauge(
+    "admission_in_flight",
+    "Requests admitted and running, per priority tier",
+    ("tier",),
+)
+admission_rejected_total = registry.counter(
+    "admission_rejected_total",
+    "Requests shed with 503 by admission control",
+    ("tier", "reason"),
+)
+admission_queue_wait_seconds = registry.histogram(
+    "admission_queue_wait_seconds",
+    "Time admitted requests spent queued for a slot",
+    ("tier",),
+)
+
+
+@dataclass(frozen=True)
+class Tier:
+    """Admission policy for one priority level (lower ``priority`` wins)"""
+
+    name: str
+    priority: int
+    occupancy_share: float  # may start while total in-flight < share * capacity
+    concurrency_share: float  # own in-flight cap as a share of capacity
+    max_queue: int
+    queue_timeout: float
+    retry_after: int
+
+
+CRITICAL = Tier("critical", 0, 1.0, 1.0, 256, 2.0, 1)
+HIGH = Tier("high", 1, 0.9, 0.75, 128, 1.0, 2)
+NORMAL = Tier("normal", 2, 0.75, 0.5, 64, 0.5, 5)
+LOW = Tier("low", 3, 0.5, 0.25, 16, 0.25, 15)
+TIERS = (CRITICAL, HIGH, NORMAL, LOW)
+
+# (tier, methods or None for any, path pattern); first match wins, default NORMAL
+DEFAULT_RULES: Sequence[Tuple[Tier, Optional[Iterable[str]], str]] = (
+    (CRITICAL, None, r"^/api/v1/qr/(emergency|assets)/"),
+    (HIGH, {"POST"}, r"^/api/v1/auth/(login|refresh)$"),
+    (HIGH, {"GET"}, r"^/api/v1/auth/me$"),
+    (HIGH, {"GET"}, r"^/api/v1/patients/me/"),
+    (LOW, None, r"^/api/v1/admin/"),
+    (LOW, {"PUT"}, r"^/api/v1/patients/[^/]+$"),
+    (LOW, {"PUT"}, r"^/api/v1/auth/users/"),
+    (LOW, None, r"^/api/v1/auth/(register/|check-email|check-document)"),
+    (LOW, {"GET"}, r"^/api/v1/qr/paramedic/scan-history$"),
+    (LOW, None, r"^/(docs|redoc)|^/api/v1/openapi\.json$"),
+)
+
+# Probes and scrapes must answer precisely when the worker is saturated; event
+# streams stay open for hours and are capped by the hub instead
+EXEMPT_PATHS = re.compile(r"^/(health|metrics)(/|$)|^/api/v1/qr/events$")
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class RouteClassifier:
+    def __init__(self, rules=DEFAULT_RULES, default: Tier = NORMAL):
+        self.default = default
+        self.rules: List[Tuple[Tier, Optional[frozenset], Pattern]] = [
+            (tier, frozenset(methods) if methods else None, re.compile(pattern))
+            for tier, methods, pattern in rules
+        ]
+
+    def classify(self, method: str, path: str) -> Tier:
+        for tier, methods, pattern in self.rules:
+            if (methods is None or method in methods) and pattern.search(path):
+                return tier
+        return self.default
+
+
+class AdmissionController:
+    """Per-worker slot accounting with priority hand-off to queued requests"""
+
+    def __init__(self, capacity: int, tiers: Sequence[Tier] = TIERS):
+        self.capacity = capacity
+        self.tiers = sorted(tiers, key=lambda tier: tier.priority)
+        self.total = 0
+        self.in_flight: Dict[str, int] = {tier.name: 0 for tier in self.tiers}
+        self.waiters: Dict[str, Deque[asyncio.Future]] = {tier.name: deque() for tier in self.tiers}
+
+    def can_start(self, tier: Tier) -> bool:
+        return (
+            self.total < max(1, int(self.capacity * tier.occupancy_share))
+            and self.in_flight[tier.name] < max(1, int(self.capacity * tier.concurrency_share))
+        )
+
+    def _start(self, tier: Tier) -> None:
+        self.total += 1
+        self.in_flight[tier.name] += 1
+        admission_in_flight.set(self.in_flight[tier.name], tier=tier.name)
+
+    def _has_priority_waiters(self, tier: Tier) -> bool:
+        return any(self.waiters[other.name] for other in self.tiers if other.priority <= tier.priority)
+
+    async def acquire(self, tier: Tier) -> None:
+        # Queued requests of the same or higher priority go first
+        if self.can_start(tier) and not self._has_priority_waiters(tier):
+            self._start(tier)
+            return
+        queue = self.waiters[tier.name]
+        if tier.queue_timeout <= 0 or len(queue) >= tier.max_queue:
+            raise Rejected("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=tier.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as the timeout fired: keep the slot
+                admission_queue_wait_seconds.observe(time.perf_counter() - started, tier=tier.name)
+                return
+            waiter.cancel()
+            queue.remove(waiter)
+            raise Rejected("queue_timeout")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(tier)
+            else:
+                waiter.cancel()
+                if waiter in queue:
+                    queue.remove(waiter)
+            raise
+        admission_queue_wait_seconds.observe(time.perf_counter() - started, tier=tier.name)
+
+    def release(self, tier: Tier) -> None:
+        self.total -= 1
+        self.in_flight[tier.name] -= 1
+        admission_in_flight.set(self.in_flight[tier.name], tier=tier.name)
+        self._wake()
+
+    def _wake(self) -> None:
+        """Hand freed slots to waiters, most important tier first"""
+        for tier in self.tiers:
+            queue = self.waiters[tier.name]
+            while queue and self.can_start(tier):
+                waiter = queue.popleft()
+                if waiter.done():
+                    continue
+                self._start(tier)
+                waiter.set_result(True)
+            if queue:
+                # Never let a lower tier overtake a blocked higher one
+                return
+
+
+class AdmissionControlMiddleware:
+    """Classify, admit or shed each HTTP request before it reaches the app"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        capacity: Optional[int] = None,
+        classifier: Optional[RouteClassifier] = None,
+        enabled: Optional[bool] = None,
+    ):
+        self.app = app
+        self.enabled = settings.admission_control_enabled if enabled is None else enabled
+        self.controller = AdmissionController(capacity or settings.admission_max_in_flight)
+        self.classifier = classifier or RouteClassifier()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not self.enabled or scope["type"] != "http" or EXEMPT_PATHS.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        tier = self.classifier.classify(scope["method"], scope["path"])
+        try:
+            await self.controller.acquire(tier)
+        except Rejected as rejected:
+            admission_rejected_total.inc(tier=tier.name, reason=rejected.reason)
+            await self._reject(send, tier)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(tier)
+
+    async def _reject(self, send: Send, tier: Tier) -> None:
+        body = json.dumps({"detail": "Server busy, please retry shortly"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(tier.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
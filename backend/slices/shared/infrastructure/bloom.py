@@ -0,0 +1,180 @@
+"""
+Bloom filters, with a bitset shared by all workers through Redis.
+
+A Bloom filter answers "definitely absent" or "possibly present". Its
+``error_rate`` is the share of false positives when it holds ``capacity``
+items. Items cannot be removed, and deleted rows just become false positives.
+
+``SharedBloomFilter`` keeps a copy per worker, so lookups never leave the
+process. It publishes additions to a Redis bitmap with SETBIT. Workers merge
+the bitmap back in when its version counter moves. Bits are only ever
+OR-ed, so concurrent publishers and rebuilds cannot lose items. Lookups
+return ``None`` ("ask the database") until the filter is loaded, or when
+it has not synced with Redis recently.
+"""
+
+import hashlib
+import logging
+import math
+import time
+from typing import Callable, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size bitset, MSB-first per byte like Redis SETBIT offsets"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, item: str) -> List[int]:
+        # Double hashing: k positions from one 128-bit digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str) -> List[int]:
+        positions = self.positions(item)
+        for position in positions:
+            self.bits[position >> 3] |= 0x80 >> (position & 7)
+        return positions
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[p >> 3] & (0x80 >> (p & 7)) for p in self.positions(item))
+
+    def merge(self, bits: bytes) -> None:
+        """OR another bitset of the same geometry into this one"""
+        length = len(self.bits)
+        merged = int.from_bytes(self.bits, "big") | int.from_bytes(bits[:length].ljust(length, b"\0"), "big")
+        self.bits = bytearray(merged.to_bytes(length, "big"))
+
+
+class SharedBloomFilter(BloomFilter):
+    """Per-worker Bloom filter kept in sync with a Redis bitmap"""
+
+    def __init__(
+        self,
+        name: str,
+        capacity: int,
+        error_rate: float,
+        redis_factory: Callable,
+        max_staleness_seconds: float = 15.0,
+        retry_redis_after: float = 5.0,
+    ):
+        super().__init__(capacity, error_rate)
+        self.name = name
+        self.capacity = capacity
+        # Geometry in the key: a resized filter never reads an incompatible bitmap
+        self.key = f"bloom:{name}:{self.size}:{self.hashes}"
+        self.version_key = f"{self.key}:version"
+        # Set once a full rebuild has been merged: publishes alone make a partial bitmap
+        self.seeded_key = f"{self.key}:seeded"
+        self.max_staleness_seconds = max_staleness_seconds
+        self.retry_redis_after = retry_redis_after
+        self._redis_factory = redis_factory
+        self._redis_down_until = 0.0
+        self._version: Optional[bytes] = None
+        self.loaded = False
+        self.synced_at = 0.0
+        self.added = 0
+
+    @property
+    def ready(self) -> bool:
+        return self.loaded and time.monotonic() - self.synced_at <= self.max_staleness_seconds
+
+    def might_contain(self, item: str) -> Optional[bool]:
+        """``False`` = definitely absent; ``None`` when the filter cannot answer"""
+        if not self.ready:
+            return None
+        return item in self
+
+    async def publish(self, item: str) -> None:
+        """Add an item here and, best effort, for every other worker"""
+        positions = self.add(item)
+        self.added += 1
+        if time.monotonic() < self._redis_down_until:
+            return
+        try:
+            pipe = self._redis_factory().pipeline(transaction=False)
+            for position in positions:
+                pipe.setbit(self.key, position, 1)
+            pipe.incr(self.version_key)
+            await pipe.execute()
+        except Exception as e:
+            self._redis_failed(e)
+
+    async def pull(self) -> Optional[bool]:
+        """Merge the Redis bitmap in: ``False`` if Redis has no complete one, ``None`` if unreachable"""
+        if time.monotonic() < self._redis_down_until:
+            return None
+        try:
+            redis = self._redis_factory()
+            # Version first: bits published after this read are picked up next time
+            version, seeded = await redis.mget(self.version_key, self.seeded_key)
+            if seeded is None:
+                return False
+            if self.loaded and version is not None and version == self._version:
+                self.synced_at = time.monotonic()
+                return True
+            bits = await redis.get(self.key)
+        except Exception as e:
+            self._redis_failed(e)
+            return None
+        if bits is None:
+            return False
+        self.merge(bits)
+        self._version = version
+        self.loaded = True
+        self.synced_at = time.monotonic()
+        return True
+
+    async def claim_rebuild(self, ttl_seconds: int = 120) -> bool:
+        """Whether this worker should rebuild the bitmap (one worker at a time)"""
+        try:
+            return bool(await self._redis_factory().set(f"{self.key}:rebuild", 1, nx=True, ex=ttl_seconds))
+        except Exception as e:
+            self._redis_failed(e)
+            return True  # nobody shares the work; build a local copy
+
+    async def seed(self, source: BloomFilter, count: int) -> None:
+        """Merge a filter built from the database, and push it to Redis"""
+        self.merge(bytes(source.bits))
+        self.loaded = True
+        self.synced_at = time.monotonic()
+        if count > self.capacity:
+            logger.warning(
+                "Bloom filter %s holds %d items over its capacity %d; false positives will rise",
+                self.name, count, self.capacity,
+            )
+        try:
+            redis = self._redis_factory()
+            staging = f"{self.key}:seed"
+            pipe = redis.pipeline(transaction=True)
+            pipe.set(staging, bytes(source.bits), ex=60)
+            pipe.bitop("OR", self.key, self.key, staging)
+            pipe.delete(staging)
+            pipe.set(self.seeded_key, 1)
+            pipe.incr(self.version_key)
+            await pipe.execute()
+        except Exception as e:
+            self._redis_failed(e)
+
+    def _redis_failed(self, error: Exception) -> None:
+        if time.monotonic() >= self._redis_down_until:
+            logger.warning("Bloom filter %s not shared, Redis unavailable: %s", self.name, error)
+        self._redis_down_until = time.monotonic() + self.retry_redis_after
+
+
+def build(items: Iterable[str], capacity: int, error_rate: float) -> Tuple[BloomFilter, int]:
+    """A plain filter over ``items`` and how many there were"""
+    bloom = BloomFilter(capacity, error_rate)
+    count = 0
+    for item in items:
+        bloom.add(item)
+        count += 1
+    return bloom, count
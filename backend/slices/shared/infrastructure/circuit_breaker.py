@@ -0,0 +1,192 @@
+"""
+Circuit breaker around the primary database.
+
+Every connection attempt and statement is recorded as a success or a
+failure, and as slow if it took longer than ``slow_call_seconds``. Only
+errors that point at the database count as failures: connection errors,
+cancelled (timed-out) statements and lost connections. Constraint
+violations and other errors caused by the request do not.
+
+- **closed**: calls go through. Once the last ``window_seconds`` hold at
+  least ``min_calls`` calls, and ``failure_ratio`` of them failed or
+  ``slow_call_ratio`` of them were slow, the breaker opens.
+- **open**: new connections fail at once with ``CircuitOpenError`` (503)
+  for ``open_seconds``. A degraded database then costs requests nothing,
+  instead of every worker stacking up on connects and timeouts.
+- **half-open**: ``half_open_calls`` trial connections are let through. If
+  they all succeed the breaker closes; any failure opens it again. Only the
+  trials count: statements on connections opened before the breaker
+  opened, or on the trial connections, say nothing about whether the
+  database accepts connections again.
+
+The breaker is per worker and thread-safe, as connections are opened from
+threads.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Deque, List, Optional
+
+from fastapi import HTTPException, status
+
+from slices.core.config import settings
+from slices.observability.infrastructure.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+db_circuit_state = registry.gauge(
+    "db_circuit_state",
+    "Database circuit breaker state (0 closed, 1 half-open, 2 open)",
+    ("breaker",),
+)
+db_circuit_rejected_total = registry.counter(
+    "db_circuit_rejected_total",
+    "Database calls refused while the circuit was open",
+    ("breaker",),
+)
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(HTTPException):
+    """Raised when the circuit is open (served as 503)"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database unavailable, please retry shortly",
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+        )
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_ratio: float = 0.5,
+        slow_call_seconds: float = 2.0,
+        slow_call_ratio: float = 0.8,
+        min_calls: int = 20,
+        window_seconds: float = 10.0,
+        open_seconds: float = 5.0,
+        half_open_calls: int = 3,
+    ):
+        self.name = name
+        self.failure_ratio = failure_ratio
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_ratio = slow_call_ratio
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+
+        self.state = CLOSED
+        self._lock = threading.Lock()
+        # One [second, calls, failures, slow] bucket per second of the window
+        self._buckets: Deque[List[int]] = deque()
+        self._opened_at = 0.0
+        self._trials_since = 0.0
+        self._trial_round = 0
+        self._trials_started = 0
+        self._trials_passed = 0
+        db_circuit_state.set(0, breaker=name)
+
+    def before_call(self) -> Optional[int]:
+        """Raise CircuitOpenError unless a call may go to the database now
+
+        Returns the trial round when the call is a half-open trial, to be
+        passed back to ``record``; ``None`` otherwise.
+        """
+        with self._lock:
+            if self.state == OPEN:
+                waited = time.monotonic() - self._opened_at
+                if waited < self.open_seconds:
+                    db_circuit_rejected_total.inc(breaker=self.name)
+                    raise CircuitOpenError(self.open_seconds - waited)
+                self._start_trials()
+            if self.state == HALF_OPEN:
+                if time.monotonic() - self._trials_since >= self.open_seconds:
+                    self._start_trials()  # earlier trials never reported back
+                if self._trials_started >= self.half_open_calls:
+                    db_circuit_rejected_total.inc(breaker=self.name)
+                    raise CircuitOpenError(1)
+                self._trials_started += 1
+                return self._trial_round
+            return None
+
+    def record(self, failed: bool, duration: float = 0.0, trial: Optional[int] = None) -> None:
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if trial != self._trial_round:
+                    return  # not one of this round's trials
+                if failed:
+                    self._open()
+                else:
+                    self._trials_passed += 1
+                    if self._trials_passed >= self.half_open_calls:
+                        self._buckets.clear()
+                        self._set_state(CLOSED)
+                return
+            if self.state == OPEN:
+                return  # late results of calls started before it opened
+            calls, failures, slow = self._add(failed, duration >= self.slow_call_seconds)
+            if calls >= self.min_calls and (
+                failures >= calls * self.failure_ratio or slow >= calls * self.slow_call_ratio
+            ):
+                self._open()
+
+    def _add(self, failed: bool, slow: bool):
+        second = int(time.monotonic())
+        while self._buckets and self._buckets[0][0] <= second - self.window_seconds:
+            self._buckets.popleft()
+        if not self._buckets or self._buckets[-1][0] != second:
+            self._buckets.append([second, 0, 0, 0])
+        bucket = self._buckets[-1]
+        bucket[1] += 1
+        bucket[2] += failed
+        bucket[3] += slow
+        return (
+            sum(b[1] for b in self._buckets),
+            sum(b[2] for b in self._buckets),
+            sum(b[3] for b in self._buckets),
+        )
+
+    def _start_trials(self) -> None:
+        self._set_state(HALF_OPEN)
+        self._trials_since = time.monotonic()
+        self._trial_round += 1
+        self._trials_started = self._trials_passed = 0
+
+    def _open(self) -> None:
+        if self.state != OPEN:
+            logger.warning("Circuit %s open for %.0f s", self.name, self.open_seconds)
+        self._opened_at = time.monotonic()
+        self._buckets.clear()
+        self._set_state(OPEN)
+
+    def _set_state(self, state: str) -> None:
+        if state == CLOSED and self.state != CLOSED:
+            logger.info("Circuit %s closed", self.name)
+        self.state = state
+        db_circuit_state.set(_STATE_VALUES[state], breaker=self.name)
+
+
+def is_database_failure(error: BaseException) -> bool:
+    """Errors that say the database is unwell rather than the request wrong"""
+    import psycopg2
+
+    return isinstance(error, (psycopg2.OperationalError, psycopg2.InterfaceError))
+
+
+db_breaker = CircuitBreaker(
+    "primary",
+    failure_ratio=settings.db_breaker_failure_ratio,
+    slow_call_seconds=settings.db_breaker_slow_call_ms / 1000,
+    slow_call_ratio=settings.db_breaker_slow_call_ratio,
+    min_calls=settings.db_breaker_min_calls,
+    window_seconds=settings.db_breaker_window_seconds,
+    open_seconds=settings.db_breaker_open_seconds,
+)
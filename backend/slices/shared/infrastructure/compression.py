@@ -0,0 +1,114 @@
+"""
+Response compression: brotli when the client accepts it, gzip otherwise (and
+when the ``brotli`` dependency is missing from the environment).
+
+Only complete (single-message) responses of a compressible type and at least
+``minimum_size`` bytes are compressed. Streamed responses such as SSE,
+responses that are already encoded, and ``304``s pass through untouched.
+A strong ETag is weakened when the body is compressed, because the bytes no
+longer match the tag's representation.
+"""
+
+import asyncio
+import gzip
+from functools import lru_cache
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+COMPRESSIBLE_TYPES = ("application/json", "text/html", "text/plain", "text/css", "application/javascript",
+                      "image/svg+xml")
+
+# Above this, compress in a thread instead of on the event loop
+OFFLOAD_SIZE = 64 * 1024
+
+
+@lru_cache
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def accepted_encoding(accept_encoding: str) -> Optional[str]:
+    """``br`` or ``gzip`` per the client's Accept-Encoding (q=0 excludes), else None"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    if accepted.get("br", 0) > 0 and _brotli() is not None:
+        return "br"
+    if accepted.get("gzip", accepted.get("*", 0)) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 4) -> bytes:
+    if encoding == "br":
+        return _brotli().compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = accepted_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            pending, start = start, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=pending["headers"])
+            content_type = headers.get("content-type", "")
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            ):
+                await send(pending)
+                await send(message)
+                return
+
+            if len(body) > OFFLOAD_SIZE:
+                body = await asyncio.to_thread(compress, body, encoding)
+            else:
+                body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            await send(pending)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,262 @@
+"""
+Adaptive concurrency limit for database work (AIMD on observed latency).
+
+The limiter learns a latency baseline (the best recent window average,
+allowed to drift up slowly so it can re-learn) and every window compares the
+current average statement latency against ``baseline * tolerance``:
+
+- below target while the limit is actually being used: limit + 1
+  (additive increase);
+- above target, or callers timed out waiting: limit * ``backoff``
+  (multiplicative decrease).
+
+Callers beyond the limit queue briefly and are rejected with 503 after
+``queue_timeout`` rather than opening yet another connection against a
+database that is already slowing down. Slots can be taken from threads
+(``slot``) or coroutines (``async_slot``). A thread running the event loop
+(an async handler calling psycopg2 inline) never queues: it takes a free
+slot or is rejected at once, because waiting there would stall every other
+request, including those holding the slots.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Deque, Optional, Union
+
+from fastapi import HTTPException, status
+
+from slices.core.config import settings
+from slices.observability.infrastructure.metrics import registry
+
+db_concurrency_limit = registry.gauge(
+    "db_concurrency_limit",
+    "Current adaptive limit on concurrent database operations",
+    ("pool",),
+)
+db_concurrency_in_flight = registry.gauge(
+    "db_concurrency_in_flight",
+    "Database operations currently holding a concurrency slot",
+    ("pool",),
+)
+db_concurrency_rejected_total = registry.counter(
+    "db_concurrency_rejected_total",
+    "Database operations rejected after queueing for a slot",
+    ("pool",),
+)
+
+
+class DatabaseOverloadedError(HTTPException):
+    """Raised when no database slot frees up in time (served as 503)"""
+
+    def __init__(self, retry_after: int = 1):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database busy, please retry shortly",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class _AsyncWaiter:
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.future = self.loop.create_future()
+
+
+_Waiter = Union[threading.Event, _AsyncWaiter]
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class AdaptiveConcurrencyLimiter:
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        tolerance: float = 2.0,
+        backoff: float = 0.8,
+        window_seconds: float = 1.0,
+        min_window_samples: int = 10,
+        queue_timeout: float = 0.2,
+        max_queue: int = 256,
+    ):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.window_seconds = window_seconds
+        self.min_window_samples = min_window_samples
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+
+        self.in_flight = 0
+        self.baseline: Optional[float] = None
+        self._lock = threading.Lock()
+        self._waiters: Deque[_Waiter] = deque()
+        self._window_started = time.monotonic()
+        self._window_sum = 0.0
+        self._window_count = 0
+        self._window_peak = 0
+        self._window_timeouts = 0
+        db_concurrency_limit.set(int(self.limit), pool=name)
+
+    # Slot accounting
+
+    def _try_start(self) -> bool:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self._start()
+            return True
+        return False
+
+    def _start(self) -> None:
+        self.in_flight += 1
+        self._window_peak = max(self._window_peak, self.in_flight)
+        db_concurrency_in_flight.set(self.in_flight, pool=self.name)
+
+    def _reject(self) -> None:
+        with self._lock:
+            self._window_timeouts += 1
+        db_concurrency_rejected_total.inc(pool=self.name)
+        raise DatabaseOverloadedError()
+
+    def acquire(self) -> None:
+        """Take a slot from a thread; raises DatabaseOverloadedError after queue_timeout
+
+        Raises at once, without queueing, on the event loop's thread.
+        """
+        with self._lock:
+            if self._try_start():
+                return
+            if len(self._waiters) >= self.max_queue or _on_event_loop():
+                waiter = None
+            else:
+                waiter = threading.Event()
+                self._waiters.append(waiter)
+        if waiter is None or not waiter.wait(self.queue_timeout):
+            with self._lock:
+                if waiter is not None and waiter.is_set():
+                    return  # granted just as the wait timed out
+                if waiter is not None:
+                    self._waiters.remove(waiter)
+            self._reject()
+
+    async def acquire_async(self) -> None:
+        """Take a slot from a coroutine; raises DatabaseOverloadedError after queue_timeout"""
+        with self._lock:
+            if self._try_start():
+                return
+            if len(self._waiters) >= self.max_queue:
+                waiter = None
+            else:
+                waiter = _AsyncWaiter()
+                self._waiters.append(waiter)
+        if waiter is None:
+            self._reject()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with self._lock:
+                granted = waiter.future.done() and not waiter.future.cancelled()
+                if not granted:
+                    waiter.future.cancel()
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                if granted:
+                    self.release()
+                raise
+            if not granted:
+                self._reject()
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            db_concurrency_in_flight.set(self.in_flight, pool=self.name)
+            self._hand_off()
+
+    def _hand_off(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if isinstance(waiter, threading.Event):
+                self._start()
+                waiter.set()
+            elif not waiter.future.done():
+                self._start()
+                waiter.loop.call_soon_threadsafe(self._grant, waiter)
+
+    def _grant(self, waiter: _AsyncWaiter) -> None:
+        if waiter.future.done():
+            # Cancelled between hand-off and delivery: give the slot back
+            self.release()
+        else:
+            waiter.future.set_result(True)
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def async_slot(self):
+        await self.acquire_async()
+        try:
+            yield
+        finally:
+            self.release()
+
+    # Limit adaptation
+
+    def observe(self, latency: float) -> None:
+        """Feed one operation latency (seconds); adjusts the limit once per window"""
+        with self._lock:
+            self._window_sum += latency
+            self._window_count += 1
+            now = time.monotonic()
+            if (
+                now - self._window_started < self.window_seconds
+                or self._window_count < self.min_window_samples
+            ) and not self._window_timeouts:
+                return
+            average = self._window_sum / self._window_count
+            self._adjust(average, self._window_peak, self._window_timeouts)
+            self._window_started = now
+            self._window_sum = 0.0
+            self._window_count = 0
+            self._window_peak = self.in_flight
+            self._window_timeouts = 0
+
+    def _adjust(self, average: float, peak: int, timeouts: int) -> None:
+        # Baseline: best window seen, drifting up 1% per window to re-learn
+        self.baseline = average if self.baseline is None else min(average, self.baseline * 1.01)
+        if average > self.baseline * self.tolerance or timeouts:
+            self.limit = max(float(self.min_limit), self.limit * self.backoff)
+        elif peak >= int(self.limit):
+            # Only grow when the current limit was actually reached
+            self.limit = min(float(self.max_limit), self.limit + 1)
+        db_concurrency_limit.set(int(self.limit), pool=self.name)
+        self._hand_off()
+
+
+db_limiter = AdaptiveConcurrencyLimiter(
+    "medical",
+    initial_limit=settings.db_concurrency_initial_limit,
+    min_limit=settings.db_concurrency_min_limit,
+    max_limit=settings.database_pool_size + settings.database_max_overflow,
+    tolerance=settings.db_concurrency_latency_tolerance,
+    queue_timeout=settings.db_concurrency_queue_timeout_ms / 1000,
+)
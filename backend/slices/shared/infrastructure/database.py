@@ -1,28 +1,67 @@
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.orm import DeclarativeBase
+"""
+Async SQLAlchemy engine and session factory.
+
+SQLAlchemy and asyncpg are imported the first time the engine, a session or
+``Base`` is needed, which keeps them off the application import path; the
+startup warm-up opens the pool before traffic arrives.
+"""
+
+from functools import lru_cache
 
 from slices.core.config import settings
 
 
-class Base(DeclarativeBase):
-    pass
+@lru_cache
+def get_engine():
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    return create_async_engine(
+        settings.async_database_url,
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+        echo=settings.debug,
+    )
+
+
+@lru_cache
+def get_sessionmaker():
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+    return async_sessionmaker(get_engine(), class_=AsyncSession, expire_on_commit=False)
 
 
-engine = create_async_engine(
-    settings.database_url,
-    pool_size=settings.database_pool_size,
-    max_overflow=settings.database_max_overflow,
-    echo=settings.debug,
-)
+@lru_cache
+def _declarative_base():
+    from sqlalchemy.orm import DeclarativeBase
 
-AsyncSessionLocal = async_sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
-)
+    class Base(DeclarativeBase):
+        pass
+
+    return Base
 
 
 async def get_db():
-    async with AsyncSessionLocal() as session:
+    from slices.shared.infrastructure.concurrency import db_limiter
+
+    async with db_limiter.async_slot(), get_sessionmaker()() as session:
         try:
             yield session
         finally:
             await session.close()
+
+
+async def dispose_engine() -> None:
+    """Close pooled connections, if the engine was ever created"""
+    if get_engine.cache_info().currsize:
+        await get_engine().dispose()
+
+
+def __getattr__(name: str):
+    # Lazily resolved module attributes kept for existing importers
+    if name == "Base":
+        return _declarative_base()
+    if name == "engine":
+        return get_engine()
+    if name == "AsyncSessionLocal":
+        return get_sessionmaker()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,152 @@
+"""
+Per-request deadlines, enforced in PostgreSQL as ``statement_timeout``.
+
+``DeadlineMiddleware`` gives each request a time budget by priority tier (the
+tiers of admission control, ``request_deadlines`` in seconds). The deadline
+lives in a context variable, so it follows the request into dependencies,
+handlers and ``asyncio.to_thread``. ``instrumented_connect`` reads it:
+
+- a connection opened after the deadline is refused (504) without a round
+  trip to the database;
+- otherwise the connection is opened with ``statement_timeout`` set to the
+  time left, so a stuck query is cancelled by the server instead of holding
+  the worker. Work outside a request (jobs, warm-up) gets
+  ``db_statement_timeout_ms``.
+
+Routes and handlers turn database exceptions into 500s (some into 400s).
+When the request ran out of time or the database circuit breaker refused
+it, the middleware replaces that error response with a 504 or a 503. That
+way clients and proxies can tell the cases apart.
+"""
+
+import json
+import math
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from fastapi import HTTPException, status
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from slices.core.config import settings
+from slices.observability.infrastructure.metrics import registry
+from slices.shared.infrastructure.admission import EXEMPT_PATHS, RouteClassifier
+
+request_deadline_exceeded_total = registry.counter(
+    "request_deadline_exceeded_total",
+    "Requests answered 504 because their deadline passed",
+    ("tier",),
+)
+
+# Why the database failed this request, when it matters for the status code
+DEADLINE = "deadline"
+CIRCUIT_OPEN = "circuit_open"
+
+
+class DeadlineExceededError(HTTPException):
+    """Raised when a request has no time left for database work (served as 504)"""
+
+    def __init__(self):
+        super().__init__(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Request deadline exceeded")
+
+
+class Deadline:
+    __slots__ = ("expires_at", "failure")
+
+    def __init__(self, budget: float):
+        self.expires_at = time.monotonic() + budget
+        self.failure: Optional[str] = None
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+
+_deadline: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left for the current request; None outside a request"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline.remaining()
+
+
+def note_failure(reason: str) -> None:
+    """Record why the database failed the current request (first reason wins)"""
+    deadline = _deadline.get()
+    if deadline is not None and deadline.failure is None:
+        deadline.failure = reason
+
+
+def statement_timeout_ms() -> int:
+    """``statement_timeout`` for a new connection; raises DeadlineExceededError when none is left"""
+    left = remaining()
+    if left is None:
+        return settings.db_statement_timeout_ms
+    if left <= 0.001:
+        note_failure(DEADLINE)
+        raise DeadlineExceededError()
+    return max(1, min(settings.db_statement_timeout_ms, math.ceil(left * 1000)))
+
+
+class DeadlineMiddleware:
+    """Start each request's deadline and answer 504/503 for database failures"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        budgets: Optional[Dict[str, float]] = None,
+        classifier: Optional[RouteClassifier] = None,
+    ):
+        self.app = app
+        self.budgets = budgets or settings.request_deadlines
+        self.classifier = classifier or RouteClassifier()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or EXEMPT_PATHS.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        tier = self.classifier.classify(scope["method"], scope["path"])
+        budget = self.budgets.get(tier.name)
+        if not budget:
+            await self.app(scope, receive, send)
+            return
+
+        deadline = Deadline(budget)
+        token = _deadline.set(deadline)
+        replaced = False
+
+        async def send_or_replace(message) -> None:
+            nonlocal replaced
+            if message["type"] == "http.response.start":
+                if deadline.failure is not None and message["status"] >= 400:
+                    replaced = True
+                    if deadline.failure == DEADLINE:
+                        request_deadline_exceeded_total.inc(tier=tier.name)
+                    await self._replace(send, deadline.failure)
+                    return
+            elif replaced:
+                return  # body of the response that was replaced
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_or_replace)
+        finally:
+            _deadline.reset(token)
+
+    async def _replace(self, send: Send, failure: str) -> None:
+        if failure == DEADLINE:
+            status_code, detail, headers = 504, "Request deadline exceeded", []
+        else:
+            status_code, detail = 503, "Database unavailable, please retry shortly"
+            headers = [(b"retry-after", str(math.ceil(settings.db_breaker_open_seconds)).encode())]
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                *headers,
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,354 @@
+"""
+In-process background jobs for side effects a response does not wait for.
+
+Route handlers ``await jobs.enqueue("name", **payload)`` after their own
+commit and return. Each worker runs ``concurrency`` asyncio consumers per
+queue, which execute the registered task (sync tasks run in a thread).
+
+- Broker: a Redis stream per queue with one consumer group, so every job
+  runs once across all workers. A job a crashed worker had claimed is
+  reclaimed by another one after ``job_reclaim_idle_seconds``. The
+  in-memory broker is used in tests, and as the fallback when Redis cannot
+  take a job (such jobs run on the worker that enqueued them and are lost if
+  it dies).
+- Failures are retried with exponential backoff up to the task's
+  ``max_attempts``. After that the job is dead-lettered: kept in
+  ``jobs:<queue>:dead`` (the last ``DEAD_LETTER_KEEP``) and logged.
+- Delivery is at least once, so tasks must be idempotent (e.g. insert with
+  an id chosen at enqueue time and ``ON CONFLICT DO NOTHING``).
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from slices.core.config import settings
+from slices.observability.infrastructure.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+jobs_total = registry.counter(
+    "jobs_total",
+    "Background jobs by queue and outcome",
+    ("queue", "outcome"),
+)
+job_duration_seconds = registry.histogram(
+    "job_duration_seconds",
+    "Background job run time",
+    ("queue",),
+)
+
+KEY_PREFIX = "jobs"
+GROUP = "workers"
+DEAD_LETTER_KEEP = 1000
+
+
+@dataclass
+class Job:
+    name: str
+    queue: str
+    payload: Dict[str, Any]
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    attempts: int = 0
+    enqueued_at: float = field(default_factory=time.time)
+    receipt: Optional[str] = field(default=None, repr=False, compare=False)
+
+    def dumps(self) -> str:
+        data = asdict(self)
+        del data["receipt"]
+        return json.dumps(data, default=str)
+
+    @classmethod
+    def loads(cls, raw, receipt: Optional[str] = None) -> "Job":
+        return cls(**json.loads(raw), receipt=receipt)
+
+
+@dataclass(frozen=True)
+class Task:
+    name: str
+    queue: str
+    func: Callable[..., Any]
+    max_attempts: int
+    retry_base_seconds: float
+
+
+class InMemoryBroker:
+    """Per-process queues; for tests and as the fallback while Redis is down"""
+
+    def __init__(self):
+        self._queues: Dict[str, asyncio.Queue] = defaultdict(asyncio.Queue)
+        self.dead: List[Tuple[Job, str]] = []
+
+    async def push(self, job: Job) -> None:
+        self._queues[job.queue].put_nowait(job)
+
+    async def pull(self, queue: str, timeout: float) -> Optional[Job]:
+        try:
+            return await asyncio.wait_for(self._queues[queue].get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def ack(self, job: Job) -> None:
+        pass
+
+    async def retry(self, job: Job, delay: float) -> None:
+        asyncio.get_running_loop().call_later(delay, self._queues[job.queue].put_nowait, job)
+
+    async def dead_letter(self, job: Job, error: str) -> None:
+        self.dead = (self.dead + [(job, error)])[-DEAD_LETTER_KEEP:]
+
+    async def maintain(self, queues) -> None:
+        pass
+
+
+# KEYS[1] delayed set; ARGV now, stream key prefix, limit
+PROMOTE_LUA = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[3]))
+for _, raw in ipairs(due) do
+    local queue = cjson.decode(raw)['queue']
+    redis.call('XADD', ARGV[2] .. ':' .. queue, '*', 'job', raw)
+    redis.call('ZREM', KEYS[1], raw)
+end
+return #due
+"""
+
+
+class RedisBroker:
+    """A Redis stream per queue, read by one consumer group shared by all workers"""
+
+    def __init__(self, redis_factory: Callable, reclaim_idle_seconds: float, max_length: int = 100_000):
+        self._redis_factory = redis_factory
+        self.reclaim_idle_seconds = reclaim_idle_seconds
+        self.max_length = max_length
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self._groups = set()
+        self._promote = None
+
+    @staticmethod
+    def _stream(queue: str) -> str:
+        return f"{KEY_PREFIX}:{queue}"
+
+    async def _ensure_group(self, queue: str) -> None:
+        if queue in self._groups:
+            return
+        try:
+            await self._redis_factory().xgroup_create(self._stream(queue), GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._groups.add(queue)
+
+    async def push(self, job: Job) -> None:
+        await self._redis_factory().xadd(
+            self._stream(job.queue), {"job": job.dumps()}, maxlen=self.max_length, approximate=True
+        )
+
+    async def pull(self, queue: str, timeout: float) -> Optional[Job]:
+        await self._ensure_group(queue)
+        response = await self._redis_factory().xreadgroup(
+            GROUP, self.consumer, {self._stream(queue): ">"}, count=1, block=int(timeout * 1000)
+        )
+        for _, messages in response or ():
+            for message_id, fields in messages:
+                return self._decode(message_id, fields)
+        return None
+
+    @staticmethod
+    def _decode(message_id, fields) -> Job:
+        raw = fields.get(b"job", fields.get("job"))
+        receipt = message_id.decode() if isinstance(message_id, bytes) else message_id
+        return Job.loads(raw, receipt=receipt)
+
+    async def ack(self, job: Job) -> None:
+        redis = self._redis_factory()
+        await redis.xack(self._stream(job.queue), GROUP, job.receipt)
+        await redis.xdel(self._stream(job.queue), job.receipt)
+
+    async def retry(self, job: Job, delay: float) -> None:
+        await self._redis_factory().zadd(f"{KEY_PREFIX}:delayed", {job.dumps(): time.time() + delay})
+        await self.ack(job)
+
+    async def dead_letter(self, job: Job, error: str) -> None:
+        key = f"{self._stream(job.queue)}:dead"
+        pipe = self._redis_factory().pipeline(transaction=False)
+        pipe.lpush(key, json.dumps({"job": json.loads(job.dumps()), "error": error}))
+        pipe.ltrim(key, 0, DEAD_LETTER_KEEP - 1)
+        await pipe.execute()
+        await self.ack(job)
+
+    async def maintain(self, queues) -> List[Job]:
+        """Move due retries back onto their streams; claim jobs of dead consumers"""
+        redis = self._redis_factory()
+        if self._promote is None:
+            self._promote = redis.register_script(PROMOTE_LUA)
+        await self._promote(keys=[f"{KEY_PREFIX}:delayed"], args=[time.time(), KEY_PREFIX, 100])
+        claimed = []
+        for queue in queues:
+            await self._ensure_group(queue)
+            response = await redis.xautoclaim(
+                self._stream(queue), GROUP, self.consumer, int(self.reclaim_idle_seconds * 1000), count=10
+            )
+            claimed.extend(self._decode(message_id, fields) for message_id, fields in response[1] if fields)
+        return claimed
+
+
+class JobRunner:
+    """Task registry plus the per-queue consumers of this worker"""
+
+    def __init__(self, broker, fallback: Optional[InMemoryBroker] = None, concurrency: Optional[Dict[str, int]] = None,
+                 retry_redis_after: float = 5.0):
+        self.broker = broker
+        self.fallback = fallback
+        self.concurrency = concurrency or {}
+        self.retry_redis_after = retry_redis_after
+        self.tasks: Dict[str, Task] = {}
+        self._workers: List[asyncio.Task] = []
+        self._in_flight: set = set()
+        self._stopping = False
+
+    def task(self, name: str, queue: str = "default", max_attempts: int = 5, retry_base_seconds: float = 2.0):
+        """Register ``func(**payload)`` (sync or async) as the job ``name``"""
+        def register(func):
+            self.tasks[name] = Task(name, queue, func, max_attempts, retry_base_seconds)
+            return func
+        return register
+
+    @property
+    def queues(self) -> List[str]:
+        return sorted({task.queue for task in self.tasks.values()})
+
+    async def enqueue(self, name: str, **payload: Any) -> Job:
+        """Hand a job to the broker (or the local fallback); never raises for broker errors"""
+        job = Job(name, self.tasks[name].queue, payload)
+        try:
+            await self.broker.push(job)
+        except Exception as e:
+            if self.fallback is None:
+                raise
+            logger.warning("Job %s not queued in Redis, running it locally: %s", name, e)
+            jobs_total.inc(queue=job.queue, outcome="local_fallback")
+            await self.fallback.push(job)
+            return job
+        jobs_total.inc(queue=job.queue, outcome="enqueued")
+        return job
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        self._stopping = False
+        brokers = [self.broker] + ([self.fallback] if self.fallback is not None else [])
+        for broker in brokers:
+            for queue in self.queues:
+                for n in range(self.concurrency.get(queue, 1)):
+                    self._workers.append(asyncio.create_task(self._consume(broker, queue), name=f"jobs-{queue}-{n}"))
+        self._workers.append(asyncio.create_task(self._maintain(), name="jobs-maintenance"))
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Stop taking jobs, let running ones finish (Redis redelivers the rest)"""
+        self._stopping = True
+        for worker in self._workers:
+            if worker not in self._in_flight:
+                worker.cancel()
+        if self._in_flight:
+            await asyncio.wait(self._in_flight, timeout=timeout)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._in_flight = set()
+
+    async def _consume(self, broker, queue: str) -> None:
+        while not self._stopping:
+            try:
+                job = await broker.pull(queue, timeout=5.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Job queue %s unavailable: %s", queue, e)
+                await asyncio.sleep(self.retry_redis_after)
+                continue
+            if job is not None:
+                await self._run_shielded(broker, job)
+
+    async def _run_shielded(self, broker, job: Job) -> None:
+        current = asyncio.current_task()
+        self._in_flight.add(current)
+        try:
+            await self.run(broker, job)
+        finally:
+            self._in_flight.discard(current)
+
+    async def run(self, broker, job: Job) -> None:
+        """Execute one job and settle it: ack, schedule a retry, or dead-letter"""
+        task = self.tasks.get(job.name)
+        if task is None:
+            await self._settle(broker.dead_letter(job, f"unknown task {job.name}"), job, "dead")
+            return
+        job.attempts += 1
+        started = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(task.func):
+                await task.func(**job.payload)
+            else:
+                await asyncio.to_thread(task.func, **job.payload)
+        except Exception as e:
+            job_duration_seconds.observe(time.perf_counter() - started, queue=job.queue)
+            if job.attempts >= task.max_attempts:
+                logger.error("Job %s %s dead-lettered after %d attempts: %s", job.name, job.id, job.attempts, e)
+                await self._settle(broker.dead_letter(job, repr(e)), job, "dead")
+            else:
+                delay = task.retry_base_seconds * 2 ** (job.attempts - 1)
+                logger.warning("Job %s %s failed (attempt %d), retrying in %.0fs: %s",
+                               job.name, job.id, job.attempts, delay, e)
+                await self._settle(broker.retry(job, delay), job, "retried")
+            return
+        job_duration_seconds.observe(time.perf_counter() - started, queue=job.queue)
+        await self._settle(broker.ack(job), job, "succeeded")
+
+    async def _settle(self, settling: Awaitable, job: Job, outcome: str) -> None:
+        jobs_total.inc(queue=job.queue, outcome=outcome)
+        try:
+            await settling
+        except Exception as e:
+            # Unacknowledged: the broker hands the job out again later
+            logger.warning("Job %s %s not settled (%s): %s", job.name, job.id, outcome, e)
+
+    async def _maintain(self) -> None:
+        while not self._stopping:
+            await asyncio.sleep(settings.job_maintenance_interval_seconds)
+            try:
+                for job in await self.broker.maintain(self.queues) or ():
+                    jobs_total.inc(queue=job.queue, outcome="reclaimed")
+                    await self._run_shielded(self.broker, job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Job maintenance failed: %s", e)
+
+
+def _shared_redis():
+    from slices.shared.infrastructure.redis import get_redis
+
+    return get_redis()
+
+
+def _build_runner() -> JobRunner:
+    concurrency = settings.job_queue_concurrency
+    if settings.job_broker == "memory":
+        return JobRunner(InMemoryBroker(), concurrency=concurrency)
+    return JobRunner(
+        RedisBroker(_shared_redis, settings.job_reclaim_idle_seconds),
+        fallback=InMemoryBroker(),
+        concurrency=concurrency,
+    )
+
+
+jobs = _build_runner()
@@ -0,0 +1,45 @@
+"""
+Periodic maintenance tasks run inside the API process.
+
+``PeriodicTask(name, run, interval_seconds)`` calls the blocking ``run`` in a
+thread once at startup and then every interval, until ``stop()``. A failed
+run is logged and retried on the next tick; it never ends the loop. The
+lifespan starts and stops each task.
+"""
+
+import asyncio
+import logging
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """Runs ``run`` in a thread at startup and then every interval"""
+
+    def __init__(self, name: str, run: Callable[[], Any], interval_seconds: float):
+        self.name = name
+        self.run = run
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name=self.name)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.run)
+            except Exception as e:
+                logger.warning("Periodic task %s failed: %s", self.name, e)
+            await asyncio.sleep(self.interval_seconds)
@@ -0,0 +1,230 @@
+"""
+Token-bucket rate limiting backed by Redis, with a per-process fallback.
+
+Each bucket lives in one Redis hash and is refilled and debited by a Lua
+script, so a check is a single atomic round trip shared by all workers.
+If Redis is unreachable the limiter keeps enforcing the same rules with
+in-memory buckets local to the worker (a looser, per-process limit) rather
+than failing open or rejecting everything.
+
+Usage as a route dependency:
+
+    @router.post("/login", dependencies=[Depends(rate_limit(LOGIN_PER_IP, client_ip))])
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+
+from slices.core.config import settings
+from slices.observability.infrastructure.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+rate_limit_decisions_total = registry.counter(
+    "rate_limit_decisions_total",
+    "Rate limiter decisions per rule",
+    ("rule", "result"),
+)
+
+KEY_PREFIX = "ratelimit"
+
+# KEYS[1] bucket; ARGV capacity, refill tokens/second, cost.
+# A cost of 0 only checks that at least one token is left.
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local needed = math.max(cost, 1)
+local allowed = 0
+if tokens >= needed then
+    allowed = 1
+    tokens = tokens - cost
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+local retry_after = 0
+if allowed == 0 then
+    retry_after = (needed - tokens) / rate
+end
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """``capacity`` requests in a burst, refilled evenly over ``period_seconds``"""
+
+    name: str
+    capacity: int
+    period_seconds: float
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.capacity / self.period_seconds
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    allowed: bool
+    remaining: float
+    retry_after: float
+
+
+class InMemoryTokenBuckets:
+    """Same algorithm as the Lua script, for one process"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, rule: RateLimitRule, cost: int) -> RateLimitResult:
+        now = time.monotonic()
+        rate = rule.refill_per_second
+        with self._lock:
+            tokens, ts = self._buckets.get(key, (float(rule.capacity), now))
+            tokens = min(rule.capacity, tokens + max(0.0, now - ts) * rate)
+            needed = max(cost, 1)
+            allowed = tokens >= needed
+            if allowed:
+                tokens -= cost
+            if len(self._buckets) >= self.max_keys and key not in self._buckets:
+                self._evict(now)
+            self._buckets[key] = (tokens, now)
+        return RateLimitResult(allowed, tokens, 0.0 if allowed else (needed - tokens) / rate)
+
+    def _evict(self, now: float) -> None:
+        # Drop the longest-idle half; those buckets are (nearly) full again anyway
+        idle = sorted(self._buckets.items(), key=lambda item: item[1][1])
+        for key, _ in idle[: len(idle) // 2]:
+            del self._buckets[key]
+
+
+class RateLimiter:
+    """Token buckets in Redis, falling back to local buckets on Redis errors"""
+
+    def __init__(
+        self,
+        redis_factory: Callable,
+        retry_redis_after: float = 5.0,
+        fallback_log_interval: float = 60.0,
+    ):
+        self._redis_factory = redis_factory
+        self._script = None
+        self.fallback = InMemoryTokenBuckets()
+        self.retry_redis_after = retry_redis_after
+        self.fallback_log_interval = fallback_log_interval
+        self._redis_down_until = 0.0
+        self._last_fallback_log = 0.0
+
+    async def consume(self, rule: RateLimitRule, key: str, cost: int = 1) -> RateLimitResult:
+        # Keys may be emails or QR tokens: only their digest is stored
+        digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+        bucket = f"{KEY_PREFIX}:{rule.name}:{digest}"
+        result = None
+        # After a Redis error, stay local for a while instead of paying a
+        # connection timeout on every request
+        if time.monotonic() >= self._redis_down_until:
+            try:
+                result = await self._consume_redis(bucket, rule, cost)
+            except Exception as e:
+                self._redis_down_until = time.monotonic() + self.retry_redis_after
+                self._log_fallback(e)
+        if result is None:
+            result = self.fallback.consume(bucket, rule, cost)
+        if cost:
+            rate_limit_decisions_total.inc(rule=rule.name, result="allowed" if result.allowed else "limited")
+        return result
+
+    async def _consume_redis(self, bucket: str, rule: RateLimitRule, cost: int) -> RateLimitResult:
+        if self._script is None:
+            # EVALSHA, transparently re-loading the script after a Redis restart
+            self._script = self._redis_factory().register_script(TOKEN_BUCKET_LUA)
+        allowed, tokens, retry_after = await self._script(
+            keys=[bucket], args=[rule.capacity, rule.refill_per_second, cost]
+        )
+        return RateLimitResult(bool(int(allowed)), float(tokens), float(retry_after))
+
+    def _log_fallback(self, error: Exception) -> None:
+        now = time.monotonic()
+        if now - self._last_fallback_log >= self.fallback_log_interval:
+            self._last_fallback_log = now
+            logger.warning("Rate limiter using in-memory buckets, Redis unavailable: %s", error)
+
+
+def _shared_redis():
+    from slices.shared.infrastructure.redis import get_redis
+
+    return get_redis()
+
+
+rate_limiter = RateLimiter(_shared_redis)
+
+
+# Key functions: map a request to the identity a rule is counted against
+
+def client_ip(request: Request) -> str:
+    """Peer address (the real client once the server trusts proxy headers)"""
+    return request.client.host if request.client else "unknown"
+
+
+def path_param(name: str) -> Callable[[Request], str]:
+    def key(request: Request) -> str:
+        return str(request.path_params.get(name, ""))
+
+    key.__name__ = f"path_param_{name}"
+    return key
+
+
+def authenticated_user(request: Request) -> str:
+    """JWT subject when a valid bearer token is present, otherwise the client IP"""
+    import jwt
+
+    header = request.headers.get("authorization", "")
+    if header.lower().startswith("bearer "):
+        try:
+            payload = jwt.decode(header[7:], settings.secret_key, algorithms=[settings.algorithm])
+            if payload.get("sub"):
+                return f"user:{payload['sub']}"
+        except jwt.PyJWTError:
+            pass
+    return f"ip:{client_ip(request)}"
+
+
+def raise_rate_limited(result: RateLimitResult, detail: str = "Too many requests, try again later") -> None:
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(result.retry_after)))},
+    )
+
+
+def rate_limit(
+    rule: RateLimitRule,
+    key_func: Callable[[Request], str] = client_ip,
+    limiter: Optional[RateLimiter] = None,
+) -> Callable[[Request], Awaitable[None]]:
+    """FastAPI dependency enforcing ``rule`` per ``key_func(request)``; 429 when exhausted"""
+
+    async def dependency(request: Request) -> None:
+        if not settings.rate_limit_enabled:
+            return
+        result = await (limiter or rate_limiter).consume(rule, key_func(request))
+        if not result.allowed:
+            raise_rate_limited(result)
+
+    dependency.__name__ = f"rate_limit_{rule.name}"
+    return dependency
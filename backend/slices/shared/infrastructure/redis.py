@@ -0,0 +1,29 @@
+"""
+Process-wide Redis client.
+
+One client (and its connection pool) per worker, created on first use;
+callers must not create their own clients per request.
+"""
+
+from functools import lru_cache
+
+from slices.core.config import settings
+
+
+@lru_cache
+def get_redis():
+    import redis.asyncio as redis
+
+    return redis.from_url(
+        settings.redis_url,
+        socket_connect_timeout=2,
+        socket_timeout=2,
+        health_check_interval=30,
+    )
+
+
+async def close_redis() -> None:
+    """Close the shared client, if it was ever created"""
+    if get_redis.cache_info().currsize:
+        await get_redis().aclose()
+        get_redis.cache_clear()
@@ -0,0 +1,311 @@
+"""
+Read-replica routing with read-your-writes consistency.
+
+Only routes that declare ``Depends(replica_reads)`` are candidates for the
+replica; everything else, including every write, uses the primary.
+
+- ``ReadYourWritesMiddleware`` notes the primary's WAL position
+  (``pg_current_wal_lsn()``) after any transaction that wrote. Before the
+  response starts, it pins the caller (JWT subject, else client IP) to that
+  LSN in Redis, shared by all workers, with a local fallback.
+- ``replica_reads`` sends a request to the replica only when the replica is
+  healthy, its lag is within ``replica_max_lag_seconds``, and it has
+  replayed past the caller's pinned LSN. Otherwise reads stay on the
+  primary. Pins expire after ``replica_pin_seconds`` at the latest.
+- ``ReplicaMonitor`` polls the replica's replay position in the background,
+  so routing never adds a round trip to the replica.
+
+Emergency QR lookups are deliberately not routed: they must never be stale.
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import Request
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from slices.core.config import settings
+from slices.observability.infrastructure.metrics import registry
+from slices.shared.infrastructure.rate_limit import authenticated_user
+
+logger = logging.getLogger(__name__)
+
+db_read_routing_total = registry.counter(
+    "db_read_routing_total",
+    "Routing decisions for replica-eligible requests",
+    ("target", "reason"),
+)
+db_replica_lag_seconds = registry.gauge(
+    "db_replica_lag_seconds",
+    "Replay lag of the read replica at the last check",
+)
+
+# Pin used when a write's LSN could not be read: primary until the pin expires
+UNKNOWN_LSN = 2**64 - 1
+
+PIN_KEY_PREFIX = "ryw"
+
+# Replay position of the replica (current position if pointed at a primary) and
+# its lag; a replica that has replayed everything it received is not lagging
+REPLICA_STATUS_SQL = """
+SELECT CASE WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn() ELSE pg_current_wal_lsn() END::text,
+       CASE WHEN NOT pg_is_in_recovery()
+                 OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+       END
+"""
+
+
+def parse_lsn(text: str) -> int:
+    """``'16/B374D848'`` -> comparable integer"""
+    high, low = text.split("/")
+    return (int(high, 16) << 32) | int(low, 16)
+
+
+class _WritePosition:
+    __slots__ = ("lsn",)
+
+    def __init__(self):
+        self.lsn: Optional[int] = None
+
+
+_route: ContextVar[str] = ContextVar("db_route", default="primary")
+_write_position: ContextVar[Optional[_WritePosition]] = ContextVar("db_write_position", default=None)
+
+
+class PinStore:
+    """Per-subject minimum LSN, in Redis with a per-process fallback"""
+
+    def __init__(self, redis_factory: Callable, retry_redis_after: float = 5.0, max_keys: int = 100_000):
+        self._redis_factory = redis_factory
+        self.retry_redis_after = retry_redis_after
+        self.max_keys = max_keys
+        self._local: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        self._redis_down_until = 0.0
+
+    @staticmethod
+    def _key(subject: str) -> str:
+        return f"{PIN_KEY_PREFIX}:{hashlib.sha256(subject.encode()).hexdigest()[:32]}"
+
+    async def pin(self, subject: str, lsn: int) -> None:
+        key = self._key(subject)
+        ttl = settings.replica_pin_seconds
+        now = time.monotonic()
+        with self._lock:
+            current, expires = self._local.get(key, (0, 0.0))
+            lsn = max(lsn, current) if expires > now else lsn
+            if len(self._local) >= self.max_keys and key not in self._local:
+                self._local = {k: v for k, v in self._local.items() if v[1] > now}
+            self._local[key] = (lsn, now + ttl)
+        if now >= self._redis_down_until:
+            try:
+                await self._redis_factory().set(key, lsn, ex=max(1, ttl))
+            except Exception as e:
+                self._redis_failed(e)
+
+    async def get(self, subject: str) -> Optional[int]:
+        key = self._key(subject)
+        now = time.monotonic()
+        with self._lock:
+            lsn, expires = self._local.get(key, (None, 0.0))
+        local = lsn if expires > now else None
+        remote = None
+        if now >= self._redis_down_until:
+            try:
+                value = await self._redis_factory().get(key)
+                remote = int(value) if value is not None else None
+            except Exception as e:
+                self._redis_failed(e)
+        pins = [pin for pin in (local, remote) if pin is not None]
+        return max(pins) if pins else None
+
+    def _redis_failed(self, error: Exception) -> None:
+        if time.monotonic() >= self._redis_down_until:
+            logger.warning("Read-your-writes pins kept per worker, Redis unavailable: %s", error)
+        self._redis_down_until = time.monotonic() + self.retry_redis_after
+
+
+class ReplicaMonitor:
+    """Polls the replica's replay position and lag on a dedicated connection"""
+
+    def __init__(self, interval_seconds: float, max_lag_seconds: float):
+        self.interval_seconds = interval_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self.replay_lsn: Optional[int] = None
+        self.lag_seconds: Optional[float] = None
+        self.checked_at = 0.0
+        self._conn = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def usable(self) -> bool:
+        return (
+            self.replay_lsn is not None
+            and self.lag_seconds is not None
+            and self.lag_seconds <= self.max_lag_seconds
+            and time.monotonic() - self.checked_at <= 3 * self.interval_seconds
+        )
+
+    def check(self) -> None:
+        import psycopg2
+
+        try:
+            if self._conn is None or self._conn.closed:
+                self._conn = psycopg2.connect(settings.sync_replica_url, connect_timeout=3)
+                self._conn.autocommit = True
+            with self._conn.cursor() as cursor:
+                cursor.execute(REPLICA_STATUS_SQL)
+                replay, lag = cursor.fetchone()
+        except Exception as e:
+            if self.replay_lsn is not None:
+                logger.warning("Read replica unavailable, reads go to the primary: %s", e)
+            self.replay_lsn = None
+            self._close()
+            return
+        self.replay_lsn = parse_lsn(replay)
+        self.lag_seconds = float(lag)
+        self.checked_at = time.monotonic()
+        db_replica_lag_seconds.set(self.lag_seconds)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="replica-monitor")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._close()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.to_thread(self.check)
+            await asyncio.sleep(self.interval_seconds)
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+
+def _shared_redis():
+    from slices.shared.infrastructure.redis import get_redis
+
+    return get_redis()
+
+
+pin_store = PinStore(_shared_redis)
+replica_monitor = ReplicaMonitor(settings.replica_check_interval_seconds, settings.replica_max_lag_seconds)
+
+
+async def replica_reads(request: Request) -> None:
+    """Route dependency: serve this request's reads from the replica when that is safe"""
+    if not settings.database_replica_url:
+        return
+    if not replica_monitor.usable:
+        db_read_routing_total.inc(target="primary", reason="replica_unavailable")
+        return
+    pinned = await pin_store.get(authenticated_user(request))
+    if pinned is not None and replica_monitor.replay_lsn < pinned:
+        db_read_routing_total.inc(target="primary", reason="pinned")
+        return
+    _route.set("replica")
+    db_read_routing_total.inc(target="replica", reason="caught_up")
+
+
+def use_primary(reason: str) -> None:
+    """Undo ``replica_reads`` for the rest of the request"""
+    if _route.get() == "replica":
+        _route.set("primary")
+        db_read_routing_total.inc(target="primary", reason=reason)
+
+
+def on_replica() -> bool:
+    """Whether this request's reads go to the replica"""
+    return _route.get() == "replica"
+
+
+def replica_has_replayed(lsn: int) -> bool:
+    replay = replica_monitor.replay_lsn
+    return replay is not None and replay >= lsn
+
+
+def written_lsn() -> Optional[int]:
+    """The primary's WAL position after this request's writes (``None`` without writes or a replica)"""
+    position = _write_position.get()
+    return position.lsn if position is not None else None
+
+
+def routed_connect(**kwargs):
+    """psycopg2 connection for the current request: replica if routed there, else primary"""
+    from slices.observability.infrastructure.db import instrumented_connect
+
+    if _route.get() == "replica":
+        try:
+            return instrumented_connect(settings.sync_replica_url, pool="replica", **kwargs)
+        except Exception as e:
+            if getattr(e, "status_code", None):
+                raise  # overload, not a replica failure
+            logger.warning("Replica connection failed, using the primary: %s", e)
+            db_read_routing_total.inc(target="primary", reason="replica_error")
+            _route.set("primary")
+    return instrumented_connect(settings.sync_database_url, **kwargs)
+
+
+def note_commit(conn) -> None:
+    """Record the primary's WAL position after a committed write (called by the connection)"""
+    position = _write_position.get()
+    if position is None or _route.get() == "replica":
+        return
+    import psycopg2.extensions
+
+    try:
+        # Plain cursor: this bookkeeping is not a route's statement
+        with psycopg2.extensions.cursor(conn) as cursor:
+            cursor.execute("SELECT pg_current_wal_lsn()::text")
+            lsn = parse_lsn(cursor.fetchone()[0])
+        conn.rollback()
+    except Exception as e:
+        logger.warning("Could not read WAL position after write: %s", e)
+        lsn = UNKNOWN_LSN
+    position.lsn = max(position.lsn or 0, lsn)
+
+
+class ReadYourWritesMiddleware:
+    """Pin callers that wrote to the primary's WAL position before answering them"""
+
+    def __init__(self, app: ASGIApp, pins: Optional[PinStore] = None):
+        self.app = app
+        self.pins = pins or pin_store
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.database_replica_url:
+            await self.app(scope, receive, send)
+            return
+
+        position = _WritePosition()
+        token = _write_position.set(position)
+
+        async def send_with_pin(message) -> None:
+            if message["type"] == "http.response.start" and position.lsn is not None:
+                # Before the client can see the response, so its next read is consistent
+                await self.pins.pin(authenticated_user(Request(scope)), position.lsn)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_pin)
+        finally:
+            _write_position.reset(token)
@@ -0,0 +1,131 @@
+"""
+Single-flight: concurrent identical cache misses share one execution.
+
+``await flights.run(key, load)`` starts ``load()`` for the first caller of a
+key. Callers that arrive while it is running await the same result (or the
+same exception) instead of running the queries again. The load runs as its
+own task, so a leader whose client disconnects does not cancel it for the
+others.
+
+With a ``redis_factory`` the coalescing also spans workers. The worker that
+gets the Redis lock for a key loads it and leaves the (JSON) result in Redis
+for ``result_ttl`` seconds. Other workers poll for that result for up to
+``wait`` seconds, then load the key themselves. Redis errors fall back to
+per-worker coalescing. Keys are hashed before they reach Redis.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import secrets
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from slices.observability.infrastructure.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+single_flight_total = registry.counter(
+    "single_flight_total",
+    "Coalesced loads by flight and role of the caller",
+    ("flight", "outcome"),
+)
+
+KEY_PREFIX = "singleflight"
+
+# KEYS[1] lock; ARGV owner token
+RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    def __init__(
+        self,
+        name: str,
+        redis_factory: Optional[Callable] = None,
+        lock_ttl: float = 5.0,
+        result_ttl: float = 1.0,
+        wait: float = 2.0,
+        poll_interval: float = 0.025,
+    ):
+        self.name = name
+        self._redis_factory = redis_factory
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self.wait = wait
+        self.poll_interval = poll_interval
+        self._flights: Dict[str, asyncio.Future] = {}
+        self._release = None
+
+    async def run(self, key: str, load: Callable[[], Awaitable[T]]) -> T:
+        flight = self._flights.get(key)
+        if flight is None:
+            single_flight_total.inc(flight=self.name, outcome="leader")
+            flight = asyncio.ensure_future(self._load(key, load))
+            self._flights[key] = flight
+            flight.add_done_callback(lambda done: self._landed(key, done))
+        else:
+            single_flight_total.inc(flight=self.name, outcome="joined")
+        return await asyncio.shield(flight)
+
+    def _landed(self, key: str, flight: asyncio.Future) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.cancelled():
+            flight.exception()  # retrieved here too, in case every caller went away
+
+    async def _load(self, key: str, load: Callable[[], Awaitable[T]]) -> T:
+        if self._redis_factory is None:
+            return await load()
+        hashed = hashlib.sha256(key.encode()).hexdigest()[:32]
+        lock_key = f"{KEY_PREFIX}:{self.name}:{hashed}:lock"
+        result_key = f"{KEY_PREFIX}:{self.name}:{hashed}:result"
+        owner = secrets.token_hex(8)
+        try:
+            redis = self._redis_factory()
+            cached = await redis.get(result_key)
+            if cached is not None:
+                single_flight_total.inc(flight=self.name, outcome="shared")
+                return json.loads(cached)
+            locked = await redis.set(lock_key, owner, nx=True, px=int(self.lock_ttl * 1000))
+        except Exception as e:
+            logger.warning("Single-flight %s without Redis: %s", self.name, e)
+            return await load()
+
+        if not locked:
+            shared = await self._await_remote(redis, result_key)
+            if shared is not None:
+                single_flight_total.inc(flight=self.name, outcome="shared")
+                return json.loads(shared)
+            return await load()
+
+        try:
+            value = await load()
+            await redis.set(result_key, json.dumps(value, default=str), px=int(self.result_ttl * 1000))
+            return value
+        finally:
+            try:
+                if self._release is None:
+                    self._release = redis.register_script(RELEASE_LUA)
+                await self._release(keys=[lock_key], args=[owner])
+            except Exception:
+                pass  # the lock expires after lock_ttl
+
+    async def _await_remote(self, redis, result_key: str) -> Optional[Any]:
+        deadline = time.monotonic() + self.wait
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                shared = await redis.get(result_key)
+            except Exception:
+                return None
+            if shared is not None:
+                return shared
+        return None
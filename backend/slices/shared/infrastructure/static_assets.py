@@ -0,0 +1,108 @@
+"""
+Prebuilt static pages and their assets, compressed once and served from memory.
+
+A bundle is a directory holding one HTML shell and the CSS/JS it references
+as ``{{name}}``. On first use (the startup warm-up calls ``load``) every asset
+is fingerprinted, as ``emergency.<sha8>.js``, and the shell is rewritten to point at
+those URLs. Every file is then gzip- and, if available, brotli-compressed
+at the highest level. Requests only pick the stored variant that matches
+Accept-Encoding, so there is no templating or compression per request.
+
+Fingerprinted assets never change under their URL and are served with
+``immutable``. The shell keeps a short max-age plus an ETag, so a deploy
+reaches clients within minutes.
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import HTTPException, Request, Response, status
+
+from slices.shared.infrastructure.compression import _brotli, accepted_encoding
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+SHELL_CACHE_CONTROL = "public, max-age=300"
+
+
+@dataclass(frozen=True)
+class StaticAsset:
+    content_type: str
+    etag: str
+    encodings: Dict[str, bytes] = field(repr=False)
+
+    @classmethod
+    def build(cls, body: bytes, content_type: str) -> "StaticAsset":
+        encodings = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        brotli = _brotli()
+        if brotli is not None:
+            encodings["br"] = brotli.compress(body, quality=11)
+        etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+        return cls(content_type, etag, encodings)
+
+    def response(self, request: Request, cache_control: str) -> Response:
+        headers = {"ETag": self.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if_none_match = request.headers.get("if-none-match", "")
+        if self.etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        encoding = accepted_encoding(request.headers.get("accept-encoding", "")) or "identity"
+        if encoding not in self.encodings:
+            encoding = "gzip" if encoding == "br" else "identity"
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(self.encodings[encoding], media_type=self.content_type, headers=headers)
+
+
+class StaticBundle:
+    """An HTML shell plus fingerprinted assets, served under ``url_prefix``"""
+
+    def __init__(self, directory: Path, shell: str, url_prefix: str):
+        self.directory = directory
+        self.shell_name = shell
+        self.url_prefix = url_prefix.rstrip("/")
+        self._lock = threading.Lock()
+        self._shell: Optional[StaticAsset] = None
+        self._assets: Dict[str, StaticAsset] = {}
+
+    def load(self) -> None:
+        with self._lock:
+            if self._shell is not None:
+                return
+            html = (self.directory / self.shell_name).read_text(encoding="utf-8")
+            assets = {}
+            for path in sorted(self.directory.iterdir()):
+                if path.name == self.shell_name or not path.is_file():
+                    continue
+                body = path.read_bytes()
+                fingerprinted = f"{path.stem}.{hashlib.sha256(body).hexdigest()[:8]}{path.suffix}"
+                content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+                if content_type.startswith(("text/", "application/javascript")):
+                    content_type += "; charset=utf-8"
+                assets[fingerprinted] = StaticAsset.build(body, content_type)
+                html = html.replace("{{%s}}" % path.name, f"{self.url_prefix}/{fingerprinted}")
+            self._assets = assets
+            self._shell = StaticAsset.build(html.encode(), "text/html; charset=utf-8")
+            logger.info("Static bundle %s ready (%d assets)", self.directory.name, len(assets))
+
+    def shell(self, request: Request) -> Response:
+        self.load()
+        return self._shell.response(request, SHELL_CACHE_CONTROL)
+
+    def asset(self, request: Request, name: str) -> Response:
+        self.load()
+        asset = self._assets.get(name)
+        if asset is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+        return asset.response(request, IMMUTABLE)
+
+    @property
+    def asset_names(self):
+        self.load()
+        return list(self._assets)
@@ -7,7 +7,9 @@ from fastapi.testclient import TestClient
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
+from slices.core.config import settings
 from slices.main import app
+from slices.shared.infrastructure import rate_limit
 from slices.shared.infrastructure.database import Base, get_db
 
 # Test database URL
@@ -16,6 +18,21 @@ TEST_DATABASE_URL = (
 )
 
 
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "rate_limited: keep per-IP and per-account rate limits enforced"
+    )
+
+
+@pytest.fixture(autouse=True)
+def rate_limits(request, monkeypatch):
+    """Turn rate limits off so flows registering and logging in repeatedly aren't
+    throttled; tests marked ``rate_limited`` keep them on, with empty buckets."""
+    monkeypatch.setattr(rate_limit.rate_limiter, "fallback", rate_limit.InMemoryTokenBuckets())
+    if request.node.get_closest_marker("rate_limited") is None:
+        monkeypatch.setattr(settings, "rate_limit_enabled", False)
+
+
 @pytest.fixture(scope="session")
 def event_loop():
     """Create an instance of the default event loop for the test session."""
@@ -0,0 +1,27 @@
+"""
+Tests for the production server entrypoint configuration
+"""
+
+import os
+
+from slices.serve import build_config, build_parser, resolve_workers
+
+
+class TestServeConfig:
+    """Worker sizing and uvicorn settings derived from the CLI"""
+
+    def test_workers_default_to_available_cpus(self):
+        assert resolve_workers(3) == 3
+        assert resolve_workers(0) == len(os.sched_getaffinity(0))
+
+    def test_cli_options_reach_uvicorn_config(self):
+        args = build_parser().parse_args(
+            ["--keepalive", "15", "--backlog", "4096", "--limit-concurrency", "200", "--graceful-timeout", "20"]
+        )
+        config = build_config(object(), args)
+
+        assert config.timeout_keep_alive == 15
+        assert config.backlog == 4096
+        assert config.limit_concurrency == 200
+        assert config.timeout_graceful_shutdown == 20
+        assert config.lifespan == "on"
@@ -0,0 +1,92 @@
+"""
+Tests for the cached health snapshot and readiness decisions
+"""
+
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from slices.health_check.infrastructure import prober as prober_module
+from slices.health_check.infrastructure.prober import HealthProber
+from slices.main import app
+from slices.observability.infrastructure.metrics import db_pool_checkout_wait_seconds
+
+
+async def _healthy():
+    return {}
+
+
+async def _down():
+    raise ConnectionError("connection refused")
+
+
+def _prober() -> HealthProber:
+    return HealthProber(interval_seconds=60, max_pool_wait_ms=100, max_loop_lag_ms=50)
+
+
+class TestHealthProber:
+    """Readiness is derived from dependency probes and saturation signals"""
+
+    def test_ready_when_dependencies_answer(self, monkeypatch):
+        monkeypatch.setattr(prober_module, "_probe_database", _healthy)
+        monkeypatch.setattr(prober_module, "_probe_redis", _healthy)
+
+        snapshot = asyncio.run(_prober().snapshot())
+
+        assert snapshot["ready"] is True
+        assert snapshot["status"] == "healthy"
+
+    def test_redis_outage_degrades_without_failing_readiness(self, monkeypatch):
+        monkeypatch.setattr(prober_module, "_probe_database", _healthy)
+        monkeypatch.setattr(prober_module, "_probe_redis", _down)
+
+        snapshot = asyncio.run(_prober().snapshot())
+
+        assert snapshot["ready"] is True
+        assert snapshot["status"] == "degraded"
+
+    def test_slow_connection_checkout_fails_readiness(self, monkeypatch):
+        monkeypatch.setattr(prober_module, "_probe_database", _healthy)
+        monkeypatch.setattr(prober_module, "_probe_redis", _healthy)
+        prober = _prober()
+        asyncio.run(prober.refresh())
+
+        db_pool_checkout_wait_seconds.observe(0.4, pool="medical")
+        snapshot = asyncio.run(prober.refresh())
+
+        assert snapshot["ready"] is False
+        assert any("connection wait" in reason for reason in snapshot["reasons"])
+
+    def test_snapshot_is_reused_between_probes(self, monkeypatch):
+        calls = []
+
+        async def counting():
+            calls.append(1)
+            return {}
+
+        monkeypatch.setattr(prober_module, "_probe_database", counting)
+        monkeypatch.setattr(prober_module, "_probe_redis", _healthy)
+        prober = _prober()
+
+        async def read_twice():
+            await prober.snapshot()
+            await prober.snapshot()
+
+        asyncio.run(read_twice())
+        assert len(calls) == 1
+
+
+class TestReadinessEndpoint:
+    """HTTP status codes of the probe endpoints"""
+
+    def test_not_ready_returns_503(self, monkeypatch):
+        monkeypatch.setattr(prober_module, "_probe_database", _down)
+        monkeypatch.setattr(prober_module, "_probe_redis", _healthy)
+        monkeypatch.setattr(prober_module, "health_prober", _prober())
+        monkeypatch.setattr("slices.health_check.api.routes.health_prober", prober_module.health_prober)
+        client = TestClient(app)
+
+        assert client.get("/health/live").status_code == 200
+        response = client.get("/health/ready")
+        assert response.status_code == 503
+        assert "database unreachable" in response.json()["reasons"]
@@ -0,0 +1,113 @@
+"""
+Tests for admin routes: the action commits, then its audit row is queued
+"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from slices.medical_management.api.routes import admin
+from slices.medical_management.api.routes.auth import create_access_token
+
+ADMIN_ID = "a1d3c0de-0000-4000-8000-000000000001"
+PARAMEDIC = ("pm-1", "paula@example.com", "Paula", "Rojas", "paramedic")
+
+
+class FakeCursor:
+    def __init__(self, row):
+        self.row = row
+        self.statements = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+    def fetchone(self):
+        return self.row
+
+
+class FakeConnection:
+    def __init__(self, row):
+        self.cursor_ = FakeCursor(row)
+        self.committed = False
+        self.closed = False
+
+    def cursor(self, cursor_factory=None):
+        return self.cursor_
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def client(monkeypatch):
+    conn = FakeConnection(PARAMEDIC)
+    queued = []
+
+    async def enqueue(name, **payload):
+        assert conn.closed, "connection held while queueing"
+        queued.append((name, payload))
+
+    monkeypatch.setattr(admin, "get_db_connection", lambda: conn)
+    monkeypatch.setattr(admin.jobs, "enqueue", enqueue)
+    app = FastAPI()
+    app.include_router(admin.router)
+    # Tokens carry the admin's id as ``sub`` only
+    token = create_access_token({"id": ADMIN_ID, "email": "admin@example.com", "role": "admin"})
+    test_client = TestClient(app, headers={"Authorization": f"Bearer {token}"})
+    return test_client, conn, queued
+
+
+def test_approving_a_paramedic_queues_the_audit_row(client):
+    test_client, conn, queued = client
+
+    response = test_client.post("/admin/approve-paramedic/pm-1")
+
+    assert response.status_code == 200 and response.json()["status"] == "approved"
+    assert conn.committed
+    [(name, payload)] = queued
+    assert name == "record_admin_action" and payload["action_type"] == "approve_paramedic"
+    assert payload["admin_id"] == ADMIN_ID and payload["target_user_id"] == "pm-1"
+
+
+def test_rejecting_a_paramedic_queues_the_audit_row(client):
+    test_client, conn, queued = client
+
+    response = test_client.post("/admin/reject-paramedic/pm-1", json={"rejection_reason": " Sin licencia "})
+
+    assert response.status_code == 200 and response.json()["status"] == "rejected"
+    [(name, payload)] = queued
+    assert payload["action_type"] == "reject_paramedic" and payload["admin_id"] == ADMIN_ID
+    assert payload["details"]["rejection_reason"] == "Sin licencia"
+
+
+def test_restoring_an_archived_record_queues_the_audit_row(client, monkeypatch):
+    test_client, conn, queued = client
+    bumped = []
+
+    async def bump_owner(owner):
+        assert conn.closed  # the database slot is free before Redis is awaited
+        bumped.append(owner)
+
+    monkeypatch.setattr(admin, "restore_record", lambda cur, table, record_id: {"id": record_id, "patient_id": "p-9"})
+    monkeypatch.setattr(admin.record_versions, "owner_for_bump", lambda cur, patient_id: f"owner-of-{patient_id}")
+    monkeypatch.setattr(admin.record_versions, "bump_owner", bump_owner)
+
+    response = test_client.post("/admin/archived-records/allergies/al-1/restore")
+
+    assert response.status_code == 200 and response.json()["patient_id"] == "p-9"
+    assert conn.committed and bumped == ["owner-of-p-9"]
+    [(name, payload)] = queued
+    assert payload["action_type"] == "restore_archived_record" and payload["admin_id"] == ADMIN_ID
+    assert payload["details"] == {"record_type": "allergies", "record_id": "al-1", "patient_id": "p-9"}
@@ -0,0 +1,31 @@
+"""
+Tests for soft-deleted record compaction statements
+"""
+
+from datetime import datetime
+
+from slices.medical_management.infrastructure.compaction import (
+    compact_batch_sql,
+    restore_sql,
+    retention_cutoff,
+)
+
+COLUMNS = ["id", "patient_id", "allergen", "is_active", "updated_at", "deleted_at"]
+
+
+class TestCompactionStatements:
+    def test_batch_moves_only_expired_rows_without_waiting_on_locks(self):
+        sql = compact_batch_sql("allergies", COLUMNS)
+
+        assert "WHERE deleted_at < %(cutoff)s" in sql
+        assert "LIMIT %(limit)s FOR UPDATE SKIP LOCKED" in sql
+        assert "INSERT INTO allergies_archive (id, patient_id, allergen, is_active, updated_at, deleted_at)" in sql
+
+    def test_restore_brings_the_row_back_undeleted(self):
+        sql = restore_sql("allergies", COLUMNS)
+
+        assert sql.startswith("WITH moved AS (DELETE FROM allergies_archive WHERE id = %(id)s")
+        assert "SELECT id, patient_id, allergen, true AS is_active, NOW() AS updated_at, NULL AS deleted_at" in sql
+
+    def test_cutoff_is_the_retention_window_before_now(self):
+        assert retention_cutoff(90, datetime(2025, 10, 15, 12)) == datetime(2025, 7, 17, 12)
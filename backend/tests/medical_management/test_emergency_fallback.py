@@ -0,0 +1,98 @@
+"""
+Tests for the emergency route's fallback: outages only, never bugs
+"""
+
+from datetime import date
+
+import psycopg2
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from slices.core.config import settings
+from slices.medical_management.api.routes import qr
+from slices.medical_management.api.routes.auth import create_access_token
+from slices.shared.infrastructure.circuit_breaker import CircuitOpenError
+
+RECORD = {
+    "qr": {
+        "qr_code_id": "qr-1",
+        "user_id": "user-1",
+        "patient_id": "p-1",
+        "first_name": "Ana",
+        "last_name": "Gómez",
+        "document_type": "CC",
+        "document_number": "123",
+        "phone": "+57300",
+        "birth_date": date(1990, 5, 17),
+        "gender": "F",
+        "blood_type": "O+",
+        "eps": "Sura",
+        "emergency_contact_name": None,
+        "emergency_contact_phone": None,
+        "expires_at": None,
+    },
+    "allergies": [],
+    "illnesses": [],
+    "surgeries": [],
+}
+
+
+@pytest.fixture
+def scan(monkeypatch):
+    async def enqueue(name, **payload):
+        pass
+
+    monkeypatch.setattr(qr.jobs, "enqueue", enqueue)
+    monkeypatch.setattr(qr, "recall_emergency_record", lambda token: (RECORD, 90.0, "snapshot"))
+    app = FastAPI()
+    app.include_router(qr.router)
+    token = create_access_token(
+        {"id": "pm-1", "email": "paula@example.com", "role": "paramedic", "paramedic_id": "pm-1", "approved": True}
+    )
+    client = TestClient(app, headers={"Authorization": f"Bearer {token}"})
+
+    def scan_with(error):
+        def load(qr_token):
+            raise error
+
+        monkeypatch.setattr(qr, "load_emergency_record", load)
+        return client.get("/qr/emergency/some-token")
+
+    return scan_with
+
+
+@pytest.mark.parametrize(
+    "error",
+    [CircuitOpenError(5), psycopg2.OperationalError("server closed the connection"), psycopg2.errors.QueryCanceled()],
+)
+def test_outages_serve_the_last_good_record(scan, error):
+    response = scan(error)
+
+    assert response.status_code == 200
+    assert response.json()["staleness"]["source"] == "snapshot"
+    assert response.headers["age"] == "90"
+
+
+def test_other_errors_are_not_masked(scan):
+    response = scan(psycopg2.ProgrammingError('column "token_hash" does not exist'))
+
+    assert response.status_code == 500
+    assert "staleness" not in response.text
+
+
+@pytest.mark.rate_limited
+def test_emergency_page_is_a_plain_static_shell():
+    app = FastAPI()
+    app.include_router(qr.router)
+    client = TestClient(app)
+    page = "/qr/emergency/some-token/page"
+
+    responses = [client.get(page) for _ in range(settings.rate_limit_emergency_token_per_minute + 1)]
+
+    assert {response.status_code for response in responses} == {200}
+    # The shell reads the record from the emergency GET (the page path minus /page)
+    assert {(route.path, method) for route in app.routes for method in route.methods} >= {
+        ("/qr/emergency/{qr_token}/page", "GET"),
+        ("/qr/emergency/{qr_token}", "GET"),
+    }
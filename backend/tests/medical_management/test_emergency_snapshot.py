@@ -0,0 +1,131 @@
+"""
+Tests for the node-local emergency snapshot
+"""
+
+import asyncio
+import time
+from datetime import date, datetime
+
+import pytest
+
+pytest.importorskip("cryptography")
+
+from slices.medical_management.infrastructure import emergency_snapshot as snapshots
+from slices.medical_management.infrastructure.emergency_snapshot import (
+    EmergencySnapshot,
+    SnapshotCipher,
+    SnapshotFile,
+    rewrite,
+)
+from slices.medical_management.infrastructure.qr_tokens import hash_token
+
+
+def _record(user_id, blood_type="O+"):
+    return {
+        "qr": {
+            "qr_code_id": f"qr-{user_id}",
+            "user_id": user_id,
+            "blood_type": blood_type,
+            "birth_date": date(1990, 5, 17),
+            "expires_at": datetime(2030, 1, 1, 12, 30),
+        },
+        "allergies": [{"allergen": "penicillin", "severity": "ALTA", "diagnosed_date": None}],
+        "illnesses": [],
+        "surgeries": [],
+    }
+
+
+@pytest.fixture
+def cipher(monkeypatch):
+    cipher = SnapshotCipher("test-secret")
+    monkeypatch.setattr(snapshots, "snapshot_cipher", lambda: cipher)
+    return cipher
+
+
+def test_records_round_trip_encrypted(tmp_path, cipher):
+    path = str(tmp_path / "emergency.snapshot")
+    fresh = [(hash_token(f"token-{n}"), _record(f"user-{n}")) for n in range(50)]
+
+    assert rewrite(path, cipher, None, fresh, None, epoch=3, position=(10, 0), synced_at=time.time()) == 50
+
+    raw = open(path, "rb").read()
+    assert b"penicillin" not in raw and b"user-7" not in raw
+    record, age = EmergencySnapshot(path, max_age_seconds=60).recall("token-7")
+    assert record == _record("user-7")  # dates come back as dates
+    assert 0 <= age < 60
+    assert EmergencySnapshot(path, max_age_seconds=60).recall("unknown") is None
+
+
+def test_incremental_rewrite_replaces_only_changed_owners(tmp_path, cipher):
+    path = str(tmp_path / "emergency.snapshot")
+    rewrite(path, cipher, None, [(hash_token("a"), _record("user-a")), (hash_token("b"), _record("user-b"))],
+            None, epoch=0, position=(1, 0), synced_at=time.time() - 30)
+    current = SnapshotFile(path)
+
+    # user-a rotated their code and changed blood type; user-b is untouched
+    rewrite(path, cipher, current, [(hash_token("a2"), _record("user-a", "AB-"))], {"user-a"},
+            epoch=0, position=(2, 0), synced_at=time.time())
+
+    snapshot = EmergencySnapshot(path, max_age_seconds=60)
+    assert snapshot.recall("a") is None
+    assert snapshot.recall("a2")[0]["qr"]["blood_type"] == "AB-"
+    assert snapshot.recall("b")[0]["qr"]["user_id"] == "user-b"
+    updated = SnapshotFile(path)
+    assert updated.position == (2, 0) and updated.built_at == current.built_at
+
+
+def test_old_or_foreign_snapshots_are_not_served(tmp_path, cipher, monkeypatch):
+    path = str(tmp_path / "emergency.snapshot")
+    rewrite(path, cipher, None, [(hash_token("a"), _record("user-a"))], None,
+            epoch=0, position=(0, 0), synced_at=time.time() - 7200)
+
+    assert EmergencySnapshot(path, max_age_seconds=3600).recall("a") is None
+
+    monkeypatch.setattr(snapshots, "snapshot_cipher", lambda: SnapshotCipher("rotated-secret"))
+    assert EmergencySnapshot(path, max_age_seconds=86400).recall("a") is None
+
+
+class FakeChanges:
+    """The record version epoch and change stream, as Redis would return them"""
+
+    def __init__(self):
+        self.epoch = b"0"
+        self.entries = []
+
+    async def get(self, key):
+        return self.epoch
+
+    async def xrevrange(self, key, count=None):
+        return self.entries[-1:]
+
+    async def xrange(self, key, min="-", count=None):
+        after = snapshots._stream_id(min.lstrip("(")) if min != "-" else (-1, 0)
+        return [e for e in self.entries if snapshots._stream_id(e[0]) > after][:count]
+
+
+def test_sync_follows_the_change_stream(tmp_path, cipher, monkeypatch):
+    path = str(tmp_path / "emergency.snapshot")
+    changes = FakeChanges()
+    sync = snapshots.EmergencySnapshotSync(path, 15, 86400, lambda: changes)
+    written = []
+
+    def write(cipher, current, owners, epoch, position, synced_at):
+        written.append(owners)
+        fresh = [(hash_token(f"t-{o}"), _record(o)) for o in (owners or {"u1", "u2"})]
+        return rewrite(path, cipher, current, fresh, owners, epoch, position, synced_at)
+
+    monkeypatch.setattr(sync, "_write", write)
+
+    async def scenario():
+        kinds = [await sync.sync()]
+        kinds.append(await sync.sync())
+        changes.entries.append((b"5-0", {b"owner": b"u2"}))
+        kinds.append(await sync.sync())
+        changes.epoch = b"1"  # a bump was missed while Redis was down
+        kinds.append(await sync.sync())
+        await sync.stop()
+        return kinds
+
+    assert asyncio.run(scenario()) == ["full", "unchanged", "incremental", "full"]
+    assert written == [None, {"u2"}, None]
+    assert SnapshotFile(path).epoch == 1
@@ -0,0 +1,34 @@
+"""
+Tests for audit table partition naming and bounds
+"""
+
+from datetime import date
+
+from slices.medical_management.infrastructure.partitions import (
+    add_months,
+    create_partition_sql,
+    month_floor,
+    partition_month,
+    partition_name,
+)
+
+
+class TestPartitionCalendar:
+    def test_months_roll_over_year_boundaries(self):
+        assert add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+        assert add_months(date(2025, 1, 1), -1) == date(2024, 12, 1)
+        assert month_floor(date(2025, 6, 17)) == date(2025, 6, 1)
+
+    def test_names_round_trip_and_ignore_other_tables(self):
+        name = partition_name("qr_access_logs", date(2025, 3, 1))
+
+        assert name == "qr_access_logs_p202503"
+        assert partition_month("qr_access_logs", name) == date(2025, 3, 1)
+        assert partition_month("qr_access_logs", "qr_access_logs_default") is None
+        assert partition_month("admin_actions", name) is None
+
+    def test_partition_covers_exactly_one_month(self):
+        sql = create_partition_sql("admin_actions", date(2025, 12, 1))
+
+        assert "admin_actions_p202512 PARTITION OF admin_actions" in sql
+        assert "FROM ('2025-12-01 00:00:00+00') TO ('2026-01-01 00:00:00+00')" in sql
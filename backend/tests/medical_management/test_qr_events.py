@@ -0,0 +1,73 @@
+"""
+Tests for the QR access event fan-out
+"""
+
+import asyncio
+
+import pytest
+
+from slices.medical_management.infrastructure.qr_events import QRAccessEventHub, StreamLimitReached
+
+
+class _UnavailableRedis:
+    def __getattr__(self, name):
+        raise ConnectionError("redis is down")
+
+
+def _hub(max_streams=10, **kwargs):
+    return QRAccessEventHub(lambda: _UnavailableRedis(), max_streams, heartbeat_seconds=0.05, **kwargs)
+
+
+async def _next_event(frames):
+    while True:
+        frame = await frames.__anext__()
+        if frame.startswith("id:"):
+            return frame
+
+
+def test_scan_reaches_the_patient_and_admins_but_not_other_users():
+    async def scenario():
+        hub = _hub()
+        patient, other = hub.stream("patient-1"), hub.stream("patient-2")
+        admin = hub.stream("admin-1", see_all=True)
+        for frames in (patient, admin, other):
+            assert (await frames.__anext__()).startswith("retry:")
+        await hub.publish({"log_id": "log-1", "patient_id": "p1"}, "patient-1", "medic-1")
+
+        received = [await asyncio.wait_for(_next_event(f), 1) for f in (patient, admin)]
+        await hub.stop()
+        return received, [frame async for frame in other]
+
+    received, other = asyncio.run(scenario())
+
+    assert all(frame.startswith("id: log-1\nevent: qr_scanned\n") for frame in received)
+    assert not any(frame.startswith("id:") for frame in other)
+
+
+def test_idle_streams_get_heartbeats_and_limits_apply():
+    async def scenario():
+        hub = _hub(max_streams=2)
+        first = hub.stream("u1")
+        await first.__anext__()
+        second = hub.stream("u2")
+        await second.__anext__()
+        heartbeat = await first.__anext__()
+        with pytest.raises(StreamLimitReached):
+            hub.stream("u3")
+        await first.aclose()
+        hub.stream("u3")
+        return heartbeat
+
+    assert asyncio.run(scenario()) == ": keep-alive\n\n"
+
+
+def test_a_stream_that_falls_behind_is_closed():
+    async def scenario():
+        hub = _hub(queue_size=2)
+        frames = hub.stream("patient-1")
+        await frames.__anext__()
+        for n in range(3):
+            await hub.publish({"log_id": f"log-{n}"}, "patient-1", "medic-1")
+        return [frame async for frame in frames]
+
+    assert asyncio.run(scenario()) == []
@@ -0,0 +1,48 @@
+"""
+Tests for QR code issuing and token hashing
+"""
+
+import hashlib
+
+import pytest
+
+from slices.medical_management.infrastructure.qr_tokens import hash_token, issue_qr_code, new_token
+
+
+class _RecordingCursor:
+    def __init__(self, patient_exists=True):
+        self.patient_exists = patient_exists
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append((" ".join(sql.split()), params))
+
+    def fetchone(self):
+        return ("p1",) if self.patient_exists else None
+
+
+class TestQRTokens:
+    def test_tokens_are_stored_as_fixed_width_hashes(self):
+        token = new_token()
+
+        assert hash_token(token) == hashlib.sha256(token.encode()).digest()
+        assert len(hash_token(token)) == len(hash_token("x" * 100)) == 32
+
+    def test_issuing_retires_the_active_code_before_inserting(self):
+        cursor = _RecordingCursor()
+
+        qr_code_id = issue_qr_code(cursor, "p1", "token", None)
+
+        lock, retire, insert = [sql for sql, _ in cursor.statements]
+        assert lock.endswith("FOR NO KEY UPDATE")
+        assert retire.startswith("UPDATE patient_qr_codes SET is_active = false")
+        assert insert.startswith("INSERT INTO patient_qr_codes")
+        assert cursor.statements[2][1]["id"] == qr_code_id
+        assert cursor.statements[2][1]["token_hash"] == hash_token("token")
+
+    def test_unknown_patient_gets_no_code(self):
+        cursor = _RecordingCursor(patient_exists=False)
+
+        with pytest.raises(ValueError):
+            issue_qr_code(cursor, "missing", "token", None)
+        assert len(cursor.statements) == 1
@@ -0,0 +1,170 @@
+"""
+Query plan tests for the hot queries against the model schema
+
+Builds the schema from ``models.py`` in a throwaway PostgreSQL schema, seeds it
+with generate_series, and checks that the queries the routes run on every
+request use the intended index instead of a sequential scan. Everything runs
+in one transaction that is rolled back. Skipped when PostgreSQL is not
+reachable (``QUERY_PLAN_DATABASE_URL``, else ``DATABASE_URL``).
+"""
+
+import json
+import os
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from slices.core.config import settings
+from slices.medical_management.infrastructure.models import Base
+from slices.medical_management.infrastructure.partitions import (
+    AUDIT_TABLES,
+    create_default_partition_sql,
+)
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+SEED_SQL = [
+    # 20k users: every 10th a paramedic, 20 of them awaiting approval
+    """
+    INSERT INTO users (id, email, password_hash, first_name, last_name, phone, role, is_active,
+                       created_at, updated_at)
+    SELECT 'u' || g, 'user' || g || '@example.com', 'x', 'F', 'L', '3000000000',
+           CASE WHEN g % 10 = 0 THEN 'paramedic' ELSE 'patient' END,
+           NOT (g % 1000 = 0), now() - g * INTERVAL '1 minute', now()
+    FROM generate_series(1, 20000) g
+    """,
+    """
+    INSERT INTO patients (id, user_id, document_type, document_number, birth_date, gender, blood_type,
+                          eps, emergency_contact_name, emergency_contact_phone, created_at, updated_at)
+    SELECT 'p' || g, 'u' || g, 'CC', lpad(g::text, 10, '0'), DATE '1990-01-01', 'M', 'O+',
+           'EPS', 'Contact', '3000000000', now(), now()
+    FROM generate_series(1, 20000) g
+    WHERE g % 10 <> 0
+    """,
+    # Five clinical rows per patient: one inactive, one soft-deleted
+    """
+    INSERT INTO allergies (id, patient_id, allergen, severity, symptoms, is_active, deleted_at,
+                           created_at, updated_at)
+    SELECT p.id || '-' || n, p.id, 'allergen', 'LEVE', 'symptoms', n <> 5,
+           CASE WHEN n = 4 THEN now() END, now(), now()
+    FROM patients p, generate_series(1, 5) n
+    """,
+    """
+    INSERT INTO illnesses (id, patient_id, name, status, diagnosed_date, is_chronic, is_active, deleted_at,
+                           created_at, updated_at)
+    SELECT p.id || '-' || n, p.id, 'illness', 'ACTIVA', now(), n = 1, n <> 5,
+           CASE WHEN n = 4 THEN now() END, now(), now()
+    FROM patients p, generate_series(1, 5) n
+    """,
+    """
+    INSERT INTO surgeries (id, patient_id, name, surgery_date, surgeon, hospital, follow_up_required,
+                           is_active, deleted_at, created_at, updated_at)
+    SELECT p.id || '-' || n, p.id, 'surgery', now(), 'Surgeon', 'Hospital', false, n <> 5,
+           CASE WHEN n = 4 THEN now() END, now(), now()
+    FROM patients p, generate_series(1, 5) n
+    """,
+    """
+    INSERT INTO patient_qr_codes (id, patient_id, token_hash, is_active, access_count, created_at, updated_at)
+    SELECT 'q' || p.id, p.id, sha256(convert_to(md5(p.id), 'UTF8')), true, 0, now(), now()
+    FROM patients p
+    """,
+    # Two retired codes per patient, which the token index must not hold
+    """
+    INSERT INTO patient_qr_codes (id, patient_id, token_hash, is_active, access_count, created_at, updated_at)
+    SELECT 'r' || n || p.id, p.id, sha256(convert_to(md5(p.id || n), 'UTF8')), false, 0, now(), now()
+    FROM patients p, generate_series(1, 2) n
+    """,
+    # Three scans per code spread over ~1000 paramedics and the last month
+    """
+    INSERT INTO qr_access_logs (id, qr_code_id, accessed_by_user_id, access_type, success, created_at)
+    SELECT q.id || '-' || n, q.id, 'u' || (10 * (1 + (hashtext(q.id) & 1023))), 'paramedic', true,
+           LOCALTIMESTAMP - n * INTERVAL '10 days'
+    FROM patient_qr_codes q, generate_series(1, 3) n
+    """,
+]
+
+LIVE_CHILD_SQL = "SELECT id FROM {table} WHERE patient_id = 'p7' AND is_active = true AND deleted_at IS NULL"
+
+# (case, query, relation that must not be sequentially scanned, expected index)
+HOT_QUERIES = [
+    ("login", "SELECT id, password_hash, role FROM users WHERE email = 'user7@example.com' AND is_active = true",
+     "users", "ix_users_email"),
+    ("check_document",
+     "SELECT p.id FROM patients p JOIN users u ON p.user_id = u.id "
+     "WHERE p.document_type = 'CC' AND p.document_number = '0000000007'",
+     "patients", "ix_patients_document_number"),
+    ("patient_by_user", "SELECT id FROM patients WHERE user_id = 'u7' AND deleted_at IS NULL",
+     "patients", "ix_patients_user_id"),
+    ("emergency_allergies", LIVE_CHILD_SQL.format(table="allergies"), "allergies", "ix_allergies_patient_live"),
+    ("emergency_illnesses", LIVE_CHILD_SQL.format(table="illnesses"), "illnesses", "ix_illnesses_patient_live"),
+    ("emergency_surgeries", LIVE_CHILD_SQL.format(table="surgeries"), "surgeries", "ix_surgeries_patient_live"),
+    ("illness_list",
+     "SELECT id FROM illnesses WHERE patient_id = 'p7' AND deleted_at IS NULL ORDER BY created_at DESC",
+     "illnesses", "ix_illnesses_patient_id"),
+    ("qr_lookup",
+     "SELECT patient_id, expires_at FROM patient_qr_codes "
+     "WHERE token_hash = sha256(convert_to(md5('p7'), 'UTF8')) AND is_active = true",
+     "patient_qr_codes", "ux_patient_qr_codes_active_token"),
+    ("pending_paramedics",
+     "SELECT id, email FROM users WHERE role = 'paramedic' AND is_active = false ORDER BY created_at DESC",
+     "users", "ix_users_pending_paramedics"),
+    # Partition indexes are named by PostgreSQL, so match on the key column
+    ("scan_history",
+     "SELECT id FROM qr_access_logs WHERE accessed_by_user_id = 'u10' AND success = true "
+     "AND created_at >= LOCALTIMESTAMP - 90 * INTERVAL '1 day' ORDER BY created_at DESC LIMIT 50",
+     "qr_access_logs_default", "accessed_by_user_id"),
+]
+
+
+def _schema_ddl():
+    dialect = postgresql.dialect()
+    for table in Base.metadata.sorted_tables:
+        yield str(CreateTable(table).compile(dialect=dialect))
+        if table.name in AUDIT_TABLES:
+            yield create_default_partition_sql(table.name)
+        for index in table.indexes:
+            yield str(CreateIndex(index).compile(dialect=dialect))
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+@pytest.fixture(scope="module")
+def plan_cursor():
+    url = os.environ.get("QUERY_PLAN_DATABASE_URL") or settings.sync_database_url
+    try:
+        conn = psycopg2.connect(url, connect_timeout=2)
+    except psycopg2.Error as e:
+        pytest.skip(f"PostgreSQL not reachable: {e}")
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("CREATE SCHEMA plan_check")
+            cursor.execute("SET LOCAL search_path = plan_check, public")
+            for statement in _schema_ddl():
+                cursor.execute(statement)
+            for statement in SEED_SQL:
+                cursor.execute(statement)
+            cursor.execute("ANALYZE")
+            yield cursor
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+@pytest.mark.parametrize("query,relation,index", [case[1:] for case in HOT_QUERIES],
+                         ids=[case[0] for case in HOT_QUERIES])
+def test_hot_query_uses_its_index(plan_cursor, query, relation, index):
+    plan_cursor.execute(f"EXPLAIN (FORMAT JSON) {query}")
+    plan = plan_cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    nodes = list(_plan_nodes(plan[0]["Plan"]))
+
+    seq_scans = [n for n in nodes if n["Node Type"] == "Seq Scan" and n.get("Relation Name") == relation]
+    assert not seq_scans, f"sequential scan on {relation}: {json.dumps(plan, indent=1)}"
+    used = [n.get("Index Name", "") for n in nodes]
+    assert any(index in name for name in used), f"{index} not used: {json.dumps(plan, indent=1)}"
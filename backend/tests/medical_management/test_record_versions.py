@@ -0,0 +1,80 @@
+"""
+Tests for conditional patient record reads
+"""
+
+from fastapi import Depends, FastAPI, Request, Response
+from fastapi.testclient import TestClient
+
+from slices.medical_management.infrastructure import record_versions as versions
+from slices.medical_management.infrastructure.record_versions import RecordVersion, conditional_read
+from slices.observability.infrastructure.metrics import cache_requests_total
+from slices.shared.infrastructure import replica
+
+
+def _client(monkeypatch, etag, written_lsn=None, route="primary"):
+    async def current_version(user_id, bump=False):
+        return RecordVersion(etag, written_lsn) if etag else None
+
+    monkeypatch.setattr(versions.record_versions, "lookup", current_version)
+    calls = []
+    app = FastAPI()
+
+    async def record_version(request: Request, response: Response):
+        replica._route.set(route)  # what replica_reads decided
+        await conditional_read(request, response, "user-1")
+
+    @app.get("/me/allergies", dependencies=[Depends(record_version)])
+    async def allergies():
+        calls.append(replica._route.get())  # stands in for the SQL, on this connection
+        return {"allergies": []}
+
+    return TestClient(app), calls
+
+
+def test_current_copy_gets_304_without_running_the_route(monkeypatch):
+    client, calls = _client(monkeypatch, 'W/"abc.0.7"')
+    hits = cache_requests_total.get(cache="record_version", result="hit")
+
+    first = client.get("/me/allergies")
+    again = client.get("/me/allergies", headers={"If-None-Match": first.headers["etag"]})
+
+    assert first.status_code == 200 and first.headers["etag"] == 'W/"abc.0.7"'
+    assert again.status_code == 304 and again.headers["etag"] == 'W/"abc.0.7"'
+    assert len(calls) == 1
+    assert cache_requests_total.get(cache="record_version", result="hit") == hits + 1
+
+
+def test_stale_copy_gets_the_new_version(monkeypatch):
+    client, _ = _client(monkeypatch, 'W/"abc.0.8"')
+
+    misses = cache_requests_total.get(cache="record_version", result="miss")
+
+    response = client.get("/me/allergies", headers={"If-None-Match": 'W/"abc.0.7"'})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] == 'W/"abc.0.8"'
+    assert cache_requests_total.get(cache="record_version", result="miss") == misses + 1
+
+
+def test_without_redis_reads_run_untagged(monkeypatch):
+    client, calls = _client(monkeypatch, None)
+
+    response = client.get("/me/allergies", headers={"If-None-Match": "*"})
+
+    assert response.status_code == 200 and "etag" not in response.headers
+    assert len(calls) == 1
+
+
+def test_replica_reads_stay_on_the_replica(monkeypatch):
+    monkeypatch.setattr(replica.replica_monitor, "replay_lsn", 500)
+
+    caught_up, calls = _client(monkeypatch, 'W/"abc.0.7"', written_lsn=400, route="replica")
+    response = caught_up.get("/me/allergies")
+    assert response.status_code == 200 and response.headers["etag"] == 'W/"abc.0.7"'
+    assert calls == ["replica"]
+
+    # The last write is not replayed yet: same replica body, but no tag to revalidate with
+    behind, calls = _client(monkeypatch, 'W/"abc.0.8"', written_lsn=600, route="replica")
+    response = behind.get("/me/allergies")
+    assert response.status_code == 200 and "etag" not in response.headers
+    assert calls == ["replica"]
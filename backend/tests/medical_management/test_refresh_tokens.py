@@ -0,0 +1,147 @@
+"""
+Tests for refresh token rotation, reuse detection and revocation, and for
+handling tokens or Redis that are not usable
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from slices.medical_management.infrastructure.refresh_tokens import (
+    ROTATE_LUA,
+    RefreshTokenInvalid,
+    RefreshTokenStore,
+    RefreshTokenUnavailable,
+)
+
+
+class _UnavailableRedis:
+    def __getattr__(self, name):
+        raise ConnectionError("redis is down")
+
+
+@pytest.fixture
+def store():
+    return RefreshTokenStore(lambda: _UnavailableRedis())
+
+
+def test_login_without_redis_gets_no_refresh_token(store):
+    user = {"id": "u1", "email": "a@example.com", "role": "patient"}
+
+    assert asyncio.run(store.issue(user)) is None
+
+
+def test_renewal_without_redis_is_retryable_not_a_logout(store):
+    with pytest.raises(RefreshTokenUnavailable) as error:
+        asyncio.run(store.rotate("family.secret"))
+
+    assert error.value.status_code == 503
+    assert "Retry-After" in error.value.headers
+
+
+def test_malformed_token_is_rejected_without_a_lookup(store):
+    with pytest.raises(RefreshTokenInvalid):
+        asyncio.run(store.rotate("no-family-separator"))
+
+
+class FakeRedis:
+    """The hashes, sets and ``ROTATE_LUA`` the store uses, kept in dicts"""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    def register_script(self, script):
+        assert script == ROTATE_LUA
+
+        async def rotate(keys, args):
+            # Mirrors ROTATE_LUA step by step
+            family = self.data.get(keys[0])
+            if family is None:
+                return [b"unknown"]
+            if family["current"] != args[0]:
+                del self.data[keys[0]]
+                return [b"reused", family["user_id"].encode()]
+            if time.time() >= int(family["expires_at"]):
+                del self.data[keys[0]]
+                return [b"expired"]
+            family["current"] = args[1]
+            return [b"rotated", *(family[f].encode() for f in ("user_id", "email", "role", "profile"))]
+
+        return rotate
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def hset(self, key, mapping):
+        self.commands.append(lambda data: data.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()}))
+
+    def sadd(self, key, member):
+        self.commands.append(lambda data: data.setdefault(key, set()).add(member))
+
+    def expire(self, key, seconds):
+        pass
+
+    async def execute(self):
+        for command in self.commands:
+            command(self.redis.data)
+
+
+@pytest.fixture
+def redis():
+    return FakeRedis()
+
+
+@pytest.fixture
+def live_store(redis):
+    return RefreshTokenStore(lambda: redis)
+
+
+PATIENT = {"id": "u1", "email": "a@example.com", "role": "patient", "patient_id": "p1"}
+
+
+def test_rotation_issues_a_new_token_with_the_same_claims(live_store):
+    token = asyncio.run(live_store.issue(PATIENT))
+
+    claims, replacement = asyncio.run(live_store.rotate(token))
+
+    assert claims == PATIENT
+    assert replacement != token and replacement.partition(".")[0] == token.partition(".")[0]
+    claims, _ = asyncio.run(live_store.rotate(replacement))
+    assert claims["id"] == "u1"
+
+
+def test_reusing_a_rotated_token_revokes_the_family(live_store, redis):
+    token = asyncio.run(live_store.issue(PATIENT))
+    _, replacement = asyncio.run(live_store.rotate(token))
+
+    with pytest.raises(RefreshTokenInvalid):
+        asyncio.run(live_store.rotate(token))  # the copy is replayed
+
+    assert f"refresh:family:{token.partition('.')[0]}" not in redis.data
+    with pytest.raises(RefreshTokenInvalid):
+        asyncio.run(live_store.rotate(replacement))  # the legitimate holder is logged out too
+
+
+def test_logout_deletes_the_family(live_store, redis):
+    token = asyncio.run(live_store.issue(PATIENT))
+    other_session = asyncio.run(live_store.issue(PATIENT))
+
+    asyncio.run(live_store.revoke(token))
+
+    assert f"refresh:family:{token.partition('.')[0]}" not in redis.data
+    with pytest.raises(RefreshTokenInvalid):
+        asyncio.run(live_store.rotate(token))
+    assert asyncio.run(live_store.rotate(other_session))[0]["id"] == "u1"
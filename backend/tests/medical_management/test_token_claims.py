@@ -0,0 +1,70 @@
+"""
+Tests for profile claims in access tokens
+"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from slices.medical_management.api.routes import patients
+from slices.medical_management.api.routes.auth import create_access_token, verify_token
+
+USER_ID = "6f1c2b9e-0d55-4a57-9a51-6a4b1f0e2c11"
+
+
+def _claims(**user):
+    token = create_access_token({"id": USER_ID, "email": "ana@example.com", "role": "patient", **user})
+    return verify_token(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
+
+
+def test_patient_id_comes_from_the_token_without_a_lookup(monkeypatch):
+    async def no_lookup(self, query):
+        raise AssertionError("patient looked up")
+
+    monkeypatch.setattr(patients.SimpleMedicalHandlers, "handle_get_patient_by_user_id", no_lookup)
+    claims = _claims(patient_id="p-1", paramedic_id=None, approved=True)
+
+    current_user = asyncio.run(patients.require_patient_role(claims))
+
+    assert current_user["patient_id"] == "p-1" and "paramedic_id" not in claims
+    assert claims["approved"] is True
+
+
+def test_tokens_without_profile_claims_fall_back_to_a_lookup(monkeypatch):
+    async def lookup(self, query):
+        return {"id": "p-2", "user_id": query.user_id} if query.user_id == USER_ID else None
+
+    monkeypatch.setattr(patients.SimpleMedicalHandlers, "handle_get_patient_by_user_id", lookup)
+
+    assert asyncio.run(patients.require_patient_role(_claims()))["patient_id"] == "p-2"
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(patients.require_patient_role({**_claims(), "role": "paramedic"}))
+    assert error.value.status_code == 403
+
+
+def test_paramedic_approval_comes_from_the_token(monkeypatch):
+    async def no_lookup(self, query):
+        raise AssertionError("paramedic looked up")
+
+    monkeypatch.setattr(patients.SimpleMedicalHandlers, "handle_get_paramedic_approval", no_lookup)
+
+    approved = _claims(role="paramedic", paramedic_id="pm-1", approved=True)
+    assert asyncio.run(patients.require_paramedic_approval(approved))["approved"] is True
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(patients.require_paramedic_approval(_claims(role="paramedic", paramedic_id="pm-1", approved=False)))
+    assert error.value.status_code == 403
+    # Other roles are not paramedics to approve
+    assert asyncio.run(patients.require_paramedic_approval(_claims(patient_id="p-1")))["role"] == "patient"
+
+
+def test_paramedic_tokens_without_the_claim_fall_back_to_a_lookup(monkeypatch):
+    async def lookup(self, query):
+        return query.user_id == USER_ID
+
+    monkeypatch.setattr(patients.SimpleMedicalHandlers, "handle_get_paramedic_approval", lookup)
+
+    assert asyncio.run(patients.require_paramedic_approval(_claims(role="paramedic")))["approved"] is True
+    with pytest.raises(HTTPException):
+        asyncio.run(patients.require_paramedic_approval({**_claims(role="paramedic"), "sub": "someone-else"}))
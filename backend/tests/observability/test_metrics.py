@@ -0,0 +1,105 @@
+"""
+Tests for the in-process metrics registry and the /metrics endpoint
+"""
+
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from slices.main import app
+from slices.medical_management.api.routes import auth
+from slices.observability.infrastructure.db import statement_name
+from slices.observability.infrastructure.metrics import (
+    MetricsRegistry,
+    cache_requests_total,
+    http_request_duration_seconds,
+)
+from slices.shared.infrastructure.single_flight import SingleFlight
+
+client = TestClient(app)
+
+
+class TestMetricsRegistry:
+    """Prometheus text rendering of the metric primitives"""
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+
+        histogram.observe(0.05, route="/a")
+        histogram.observe(0.5, route="/a")
+        histogram.observe(5.0, route="/a")
+
+        output = registry.render()
+        assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in output
+        assert 'latency_seconds_bucket{route="/a",le="1"} 2' in output
+        assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in output
+        assert 'latency_seconds_count{route="/a"} 3' in output
+
+    def test_counter_and_gauge(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("hits_total", "Hits", ("cache",))
+        gauge = registry.gauge("in_flight", "In flight")
+
+        counter.inc(cache="eps")
+        counter.inc(cache="eps")
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+
+        output = registry.render()
+        assert "# TYPE hits_total counter" in output
+        assert 'hits_total{cache="eps"} 2' in output
+        assert "in_flight 1" in output
+
+    def test_statement_names_are_low_cardinality(self):
+        sql = """
+            INSERT INTO qr_access_logs (id, qr_code_id)
+            SELECT %s, pqr.id FROM patient_qr_codes pqr WHERE pqr.qr_token = %s
+        """
+        assert statement_name(sql, "get_emergency_patient_data") == (
+            "get_emergency_patient_data.insert_qr_access_logs"
+        )
+        assert statement_name("SELECT id FROM allergies WHERE patient_id = %s", "f") == (
+            "f.select_allergies"
+        )
+
+
+class TestMetricsEndpoint:
+    """Request instrumentation exposed on /metrics"""
+
+    def test_requests_are_labelled_by_route_template(self):
+        before = http_request_duration_seconds.count(method="GET", route="/health", status="200")
+
+        response = client.get("/health")
+
+        assert response.status_code == 200
+        assert http_request_duration_seconds.count(
+            method="GET", route="/health", status="200"
+        ) == before + 1
+
+    def test_metrics_endpoint_exposes_prometheus_text(self):
+        client.get("/health")
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        body = response.text
+        assert "# TYPE http_request_duration_seconds histogram" in body
+        assert "http_requests_in_progress" in body
+        assert "db_query_duration_seconds" in body
+        assert "qr_render_duration_seconds" in body
+
+    def test_eps_cache_lookups_are_counted(self, monkeypatch):
+        monkeypatch.setattr(auth, "_eps_cache", {})
+        monkeypatch.setattr(auth, "eps_flights", SingleFlight("eps"))
+        monkeypatch.setattr(auth, "load_eps", lambda status, regime_type: [{"id": 1}])
+        hits = cache_requests_total.get(cache="eps", result="hit")
+        misses = cache_requests_total.get(cache="eps", result="miss")
+
+        async def list_twice():
+            return [await auth.cached_eps("activa", None) for _ in range(2)]
+
+        assert asyncio.run(list_twice()) == [[{"id": 1}], [{"id": 1}]]
+        assert cache_requests_total.get(cache="eps", result="miss") == misses + 1
+        assert cache_requests_total.get(cache="eps", result="hit") == hits + 1
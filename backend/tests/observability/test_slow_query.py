@@ -0,0 +1,50 @@
+"""
+Tests for the slow-query log
+"""
+
+import json
+
+from slices.observability.infrastructure.slow_query import (
+    SlowQueryLog,
+    normalize_sql,
+    params_shape,
+)
+
+
+class TestSlowQueryLog:
+    """Threshold filtering, normalization and sampling rules"""
+
+    def test_normalize_sql_strips_literals_and_placeholders(self):
+        sql = """
+            SELECT id FROM users -- lookup
+            WHERE email = %s AND role IN ('patient', 'admin') LIMIT 50
+        """
+        assert normalize_sql(sql) == "SELECT id FROM users WHERE email = ? AND role IN (?) LIMIT ?"
+
+    def test_params_shape_never_contains_values(self):
+        assert params_shape(("juan@example.com", 3)) == ["str", "int"]
+        assert params_shape({"email": "juan@example.com"}) == {"email": "str"}
+        assert params_shape(None) is None
+
+    def test_only_statements_over_threshold_are_logged(self, tmp_path):
+        log_path = tmp_path / "slow.jsonl"
+        slow_log = SlowQueryLog(threshold_ms=100, log_path=str(log_path))
+
+        slow_log.observe("f.select_users", "SELECT 1 FROM users", None, 0.05)
+        slow_log.observe("f.select_users", "SELECT * FROM users WHERE id = %s", ("abc",), 0.25)
+
+        entries = [json.loads(line) for line in log_path.read_text().splitlines()]
+        assert len(entries) == 1
+        assert entries[0]["statement"] == "f.select_users"
+        assert entries[0]["query"] == "SELECT * FROM users WHERE id = ?"
+        assert entries[0]["params_shape"] == ["str"]
+        assert entries[0]["duration_ms"] == 250.0
+
+    def test_writes_are_never_explained(self):
+        slow_log = SlowQueryLog(threshold_ms=0, log_path="", explain_sample_rate=1.0)
+
+        assert not slow_log._should_explain("f.update_users", "UPDATE users SET x = 1")
+        assert not slow_log._should_explain("f.select_users", "SELECT * FROM users FOR UPDATE")
+        assert slow_log._should_explain("f.select_users", "SELECT * FROM users")
+        # Sampled at most once per interval per statement
+        assert not slow_log._should_explain("f.select_users", "SELECT * FROM users")
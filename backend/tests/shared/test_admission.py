@@ -0,0 +1,92 @@
+"""
+Tests for priority admission control
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from slices.shared.infrastructure.admission import (
+    CRITICAL,
+    LOW,
+    NORMAL,
+    AdmissionControlMiddleware,
+    AdmissionController,
+    Rejected,
+    RouteClassifier,
+)
+
+
+class TestRouteClassifier:
+    def test_emergency_lookups_are_critical_and_admin_is_low(self):
+        classifier = RouteClassifier()
+
+        assert classifier.classify("GET", "/api/v1/qr/emergency/abc") is CRITICAL
+        assert classifier.classify("GET", "/api/v1/admin/pending-paramedics") is LOW
+        assert classifier.classify("PUT", "/api/v1/patients/123") is LOW
+        assert classifier.classify("POST", "/api/v1/qr/generate") is NORMAL
+
+
+class TestAdmissionController:
+    """Low tiers are shed first; freed slots go to the most important waiter"""
+
+    def test_low_priority_is_shed_while_critical_still_admitted(self):
+        async def scenario():
+            controller = AdmissionController(capacity=4)
+            await controller.acquire(NORMAL)
+            await controller.acquire(NORMAL)
+            # Occupancy 2 of 4: LOW may only start below 50%
+            with pytest.raises(Rejected):
+                await controller.acquire(LOW)
+            await controller.acquire(CRITICAL)
+            await controller.acquire(CRITICAL)
+            assert controller.total == 4
+
+        asyncio.run(scenario())
+
+    def test_released_slot_goes_to_critical_before_low(self):
+        async def scenario():
+            controller = AdmissionController(capacity=2)
+            await controller.acquire(CRITICAL)
+            await controller.acquire(CRITICAL)
+
+            low = asyncio.create_task(controller.acquire(LOW))
+            critical = asyncio.create_task(controller.acquire(CRITICAL))
+            await asyncio.sleep(0)
+            controller.release(CRITICAL)
+
+            await asyncio.wait_for(critical, timeout=0.1)
+            assert not low.done()
+            with pytest.raises(Rejected):
+                await low
+
+        asyncio.run(scenario())
+
+
+class TestAdmissionMiddleware:
+    def test_saturated_worker_answers_503_with_retry_after(self):
+        release = asyncio.Event()
+        app = FastAPI()
+
+        @app.get("/api/v1/admin/slow")
+        async def slow():
+            await release.wait()
+            return {"ok": True}
+
+        wrapped = AdmissionControlMiddleware(app, capacity=2, enabled=True)
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=wrapped)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                first = asyncio.create_task(client.get("/api/v1/admin/slow"))
+                await asyncio.sleep(0.05)
+                shed = await client.get("/api/v1/admin/slow")
+                release.set()
+                return (await first), shed
+
+        admitted, shed = asyncio.run(scenario())
+        assert admitted.status_code == 200
+        assert shed.status_code == 503
+        assert shed.headers["retry-after"] == str(LOW.retry_after)
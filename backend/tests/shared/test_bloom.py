@@ -0,0 +1,138 @@
+"""
+Tests for Bloom filters shared between workers through Redis
+"""
+
+import asyncio
+
+from slices.shared.infrastructure.bloom import BloomFilter, SharedBloomFilter, build
+
+
+class _FakeRedis:
+    """The few bitmap commands the shared filter uses, with Redis bit order"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def mget(self, *keys):
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+        return True
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+    def _setbit(self, key, offset, value):
+        bits = bytearray(self.data.get(key, b""))
+        if len(bits) <= offset >> 3:
+            bits.extend(bytes((offset >> 3) + 1 - len(bits)))
+        bits[offset >> 3] |= 0x80 >> (offset & 7)
+        self.data[key] = bytes(bits)
+
+    def _bitop_or(self, dest, *keys):
+        values = [self.data.get(key, b"") for key in keys]
+        length = max(len(v) for v in values)
+        merged = bytearray(length)
+        for value in values:
+            for i, byte in enumerate(value):
+                merged[i] |= byte
+        self.data[dest] = bytes(merged)
+
+    def _incr(self, key):
+        self.data[key] = str(int(self.data.get(key, b"0")) + 1).encode()
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def setbit(self, key, offset, value):
+        self.calls.append(lambda: self.redis._setbit(key, offset, value))
+
+    def incr(self, key):
+        self.calls.append(lambda: self.redis._incr(key))
+
+    def set(self, key, value, ex=None):
+        self.calls.append(lambda: self.redis.data.__setitem__(key, value if isinstance(value, bytes) else b"1"))
+
+    def bitop(self, op, dest, *keys):
+        self.calls.append(lambda: self.redis._bitop_or(dest, *keys))
+
+    def delete(self, key):
+        self.calls.append(lambda: self.redis.data.pop(key, None))
+
+    async def execute(self):
+        for call in self.calls:
+            call()
+
+
+class _UnavailableRedis:
+    def __getattr__(self, name):
+        raise ConnectionError("redis is down")
+
+
+def test_no_false_negatives_and_bounded_false_positives():
+    bloom, count = build((f"user{i}@example.com" for i in range(5000)), 5000, 0.01)
+
+    assert count == 5000
+    assert all(f"user{i}@example.com" in bloom for i in range(5000))
+    false_positives = sum(f"other{i}@example.com" in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.02
+
+
+class TestSharedBloomFilter:
+    def test_workers_see_each_others_registrations_after_a_pull(self):
+        redis = _FakeRedis()
+        worker_a = SharedBloomFilter("emails", 1000, 0.01, lambda: redis)
+        worker_b = SharedBloomFilter("emails", 1000, 0.01, lambda: redis)
+
+        async def scenario():
+            # Nothing seeded yet: the filter must not claim anything is free
+            assert await worker_b.pull() is False
+            assert worker_b.might_contain("new@example.com") is None
+
+            seed, count = build(["old@example.com"], 1000, 0.01)
+            await worker_a.seed(seed, count)
+            await worker_a.publish("new@example.com")
+            assert await worker_b.pull() is True
+
+        asyncio.run(scenario())
+        assert worker_b.might_contain("old@example.com") is True
+        assert worker_b.might_contain("new@example.com") is True
+        assert worker_b.might_contain("free@example.com") is False
+
+    def test_only_one_worker_rebuilds(self):
+        redis = _FakeRedis()
+        workers = [SharedBloomFilter("docs", 100, 0.01, lambda: redis) for _ in range(3)]
+
+        async def claims():
+            return [await worker.claim_rebuild() for worker in workers]
+
+        assert asyncio.run(claims()) == [True, False, False]
+
+    def test_stops_answering_when_it_cannot_sync(self):
+        bloom = SharedBloomFilter("emails", 100, 0.01, lambda: _UnavailableRedis(), max_staleness_seconds=0.05)
+        source, count = build(["a@example.com"], 100, 0.01)
+
+        async def scenario():
+            await bloom.seed(source, count)
+            assert bloom.might_contain("b@example.com") is False
+            await asyncio.sleep(0.1)
+            assert await bloom.pull() is None
+
+        asyncio.run(scenario())
+        assert bloom.might_contain("b@example.com") is None
+
+
+def test_geometry_matches_requested_error_rate():
+    bloom = BloomFilter(1_000_000, 0.01)
+
+    assert 9_500_000 < bloom.size < 9_700_000
+    assert bloom.hashes == 7
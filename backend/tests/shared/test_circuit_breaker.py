@@ -0,0 +1,132 @@
+"""
+Tests for the database circuit breaker and request deadlines
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+
+from slices.shared.infrastructure import deadlines
+from slices.shared.infrastructure.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+from slices.shared.infrastructure.deadlines import DeadlineExceededError, DeadlineMiddleware
+
+
+def _breaker(**overrides):
+    options = dict(failure_ratio=0.5, min_calls=4, window_seconds=10, open_seconds=0.05, half_open_calls=2)
+    options.update(overrides)
+    return CircuitBreaker("test", **options)
+
+
+class TestCircuitBreaker:
+    def test_opens_on_failure_ratio_once_min_calls_seen(self):
+        breaker = _breaker()
+        breaker.record(failed=True)
+        breaker.record(failed=True)
+        breaker.record(failed=True)
+        assert breaker.state == CLOSED  # fewer than min_calls
+
+        breaker.record(failed=False)
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError) as excinfo:
+            breaker.before_call()
+        assert excinfo.value.status_code == 503
+        assert "Retry-After" in excinfo.value.headers
+
+    def test_slow_calls_open_the_circuit(self):
+        breaker = _breaker(slow_call_seconds=1.0, slow_call_ratio=0.75)
+        for _ in range(4):
+            breaker.record(failed=False, duration=1.5)
+        assert breaker.state == OPEN
+
+    def test_half_open_trials_close_or_reopen(self):
+        breaker = _breaker()
+        for _ in range(4):
+            breaker.record(failed=True)
+        time.sleep(0.06)
+
+        first = breaker.before_call()
+        second = breaker.before_call()
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()  # only half_open_calls trials at a time
+        breaker.record(failed=False, trial=first)
+        breaker.record(failed=False, trial=second)
+        assert breaker.state == CLOSED
+
+        for _ in range(4):
+            breaker.record(failed=True)
+        time.sleep(0.06)
+        trial = breaker.before_call()
+        breaker.record(failed=True, trial=trial)
+        assert breaker.state == OPEN
+
+    def test_only_trials_decide_the_half_open_state(self):
+        breaker = _breaker()
+        for _ in range(4):
+            breaker.record(failed=True)
+        time.sleep(0.06)
+        first = breaker.before_call()
+        second = breaker.before_call()
+
+        # Statements on connections that are not trials, in either direction
+        breaker.record(failed=False)
+        breaker.record(failed=False)
+        breaker.record(failed=True)
+        assert breaker.state == HALF_OPEN
+
+        breaker.record(failed=False, trial=first)
+        breaker.record(failed=False, trial=second)
+        assert breaker.state == CLOSED
+
+
+class TestDeadlines:
+    def test_statement_timeout_follows_the_remaining_budget(self):
+        assert deadlines.statement_timeout_ms() > 0  # outside a request: the default
+
+        token = deadlines._deadline.set(deadlines.Deadline(0.5))
+        try:
+            assert 0 < deadlines.statement_timeout_ms() <= 500
+        finally:
+            deadlines._deadline.reset(token)
+
+        token = deadlines._deadline.set(deadlines.Deadline(-1))
+        try:
+            with pytest.raises(DeadlineExceededError):
+                deadlines.statement_timeout_ms()
+        finally:
+            deadlines._deadline.reset(token)
+
+    def test_error_response_after_database_failure_is_replaced(self):
+        app = FastAPI()
+
+        @app.get("/api/v1/qr/emergency/abc")
+        async def timed_out():
+            # What a handler sees when PostgreSQL cancels its statement
+            deadlines.note_failure(deadlines.DEADLINE)
+            raise HTTPException(status_code=500, detail="Error retrieving emergency data")
+
+        @app.get("/api/v1/qr/history")
+        async def fine():
+            return {"ok": True}
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=DeadlineMiddleware(app, budgets={"critical": 3, "normal": 10}))
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return (
+                    await client.get("/api/v1/qr/emergency/abc"),
+                    await client.get("/api/v1/qr/history"),
+                )
+
+        timed_out_response, fine_response = asyncio.run(scenario())
+        assert timed_out_response.status_code == 504
+        assert timed_out_response.json() == {"detail": "Request deadline exceeded"}
+        assert fine_response.status_code == 200
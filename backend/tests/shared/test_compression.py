@@ -0,0 +1,47 @@
+"""
+Tests for response compression
+"""
+
+import gzip
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+from slices.shared.infrastructure.compression import CompressionMiddleware, accepted_encoding
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+
+    @app.get("/large")
+    async def large():
+        return {"allergies": [{"allergen": "penicillin", "severity": "SEVERA"}] * 200}
+
+    @app.get("/small")
+    async def small():
+        return PlainTextResponse("ok", headers={"ETag": '"v1"'})
+
+    return TestClient(CompressionMiddleware(app, minimum_size=512))
+
+
+def test_large_json_is_gzipped_and_varies_on_encoding():
+    response = _client().get("/large", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < 2000
+    assert response.json()["allergies"][0]["allergen"] == "penicillin"
+
+
+def test_small_responses_pass_through_untouched():
+    response = _client().get("/small", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == '"v1"'
+
+
+def test_accept_encoding_honours_q_zero():
+    assert accepted_encoding("gzip;q=0, identity") is None
+    assert accepted_encoding("deflate, gzip;q=0.5") == "gzip"
+    assert gzip.decompress(gzip.compress(b"x")) == b"x"
@@ -0,0 +1,136 @@
+"""
+Tests for the adaptive database concurrency limiter
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from slices.shared.infrastructure.concurrency import (
+    AdaptiveConcurrencyLimiter,
+    DatabaseOverloadedError,
+)
+
+
+def _limiter(**overrides) -> AdaptiveConcurrencyLimiter:
+    options = dict(
+        initial_limit=4,
+        min_limit=1,
+        max_limit=8,
+        window_seconds=0,
+        min_window_samples=5,
+        queue_timeout=0.05,
+    )
+    options.update(overrides)
+    return AdaptiveConcurrencyLimiter("test", **options)
+
+
+def _window(limiter: AdaptiveConcurrencyLimiter, latency: float) -> None:
+    for _ in range(limiter.min_window_samples):
+        limiter.observe(latency)
+
+
+class TestLimitAdaptation:
+    """Additive increase while latency holds, multiplicative decrease when it climbs"""
+
+    def test_grows_only_while_the_limit_is_in_use(self):
+        limiter = _limiter()
+        _window(limiter, 0.01)
+        assert limiter.limit == 4
+
+        for _ in range(4):
+            limiter.acquire()
+        _window(limiter, 0.01)
+        assert limiter.limit == 5
+
+    def test_backs_off_when_latency_rises_and_respects_bounds(self):
+        limiter = _limiter(initial_limit=8)
+        _window(limiter, 0.01)
+
+        _window(limiter, 0.05)
+        assert limiter.limit == pytest.approx(6.4)
+
+        for _ in range(20):
+            _window(limiter, 1.0)
+        assert limiter.limit == 1
+
+
+class TestSlots:
+    def test_excess_work_queues_then_is_rejected(self):
+        limiter = _limiter(initial_limit=1)
+        limiter.acquire()
+
+        with pytest.raises(DatabaseOverloadedError) as exc_info:
+            limiter.acquire()
+        assert exc_info.value.status_code == 503
+        assert "Retry-After" in exc_info.value.headers
+
+    def test_queued_thread_gets_the_released_slot(self):
+        limiter = _limiter(initial_limit=1, queue_timeout=1.0)
+        limiter.acquire()
+        acquired = threading.Event()
+
+        def waiter():
+            limiter.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        limiter.release()
+        thread.join(timeout=1)
+
+        assert acquired.is_set()
+        assert limiter.in_flight == 1
+
+    def test_async_waiter_is_woken_by_release(self):
+        async def scenario():
+            limiter = _limiter(initial_limit=1, queue_timeout=1.0)
+            await limiter.acquire_async()
+            waiting = asyncio.create_task(limiter.acquire_async())
+            await asyncio.sleep(0)
+            limiter.release()
+            await asyncio.wait_for(waiting, timeout=0.5)
+            return limiter.in_flight
+
+        assert asyncio.run(scenario()) == 1
+
+    def test_full_limiter_does_not_stall_the_event_loop(self):
+        async def scenario():
+            limiter = _limiter(initial_limit=1, queue_timeout=1.0)
+            ticks = []
+
+            async def heartbeat():
+                while True:
+                    ticks.append(time.monotonic())
+                    await asyncio.sleep(0.005)
+
+            async def holder():
+                # A handler that holds the only slot while awaiting something else
+                await limiter.acquire_async()
+                await asyncio.sleep(0.1)
+                limiter.release()
+
+            beat = asyncio.create_task(heartbeat())
+            held = asyncio.create_task(holder())
+            await asyncio.sleep(0.01)
+
+            # A handler calling psycopg2 inline, on the loop's thread: rejected at once
+            started = time.monotonic()
+            with pytest.raises(DatabaseOverloadedError):
+                limiter.acquire()
+            rejected_after = time.monotonic() - started
+
+            # Work moved to a thread still queues, and gets the slot once it is released
+            await asyncio.wait_for(asyncio.to_thread(limiter.acquire), timeout=1.0)
+            await held
+            beat.cancel()
+            gaps = [b - a for a, b in zip(ticks, ticks[1:])]
+            return rejected_after, max(gaps), limiter.in_flight
+
+        rejected_after, longest_gap, in_flight = asyncio.run(scenario())
+
+        assert rejected_after < 0.05
+        assert longest_gap < 0.05  # the loop kept running while the slot was held
+        assert in_flight == 1
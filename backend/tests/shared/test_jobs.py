@@ -0,0 +1,77 @@
+"""
+Tests for the background job runner (in-memory broker)
+"""
+
+import asyncio
+
+from slices.shared.infrastructure.jobs import InMemoryBroker, JobRunner
+
+
+class _UnavailableBroker(InMemoryBroker):
+    async def push(self, job):
+        raise ConnectionError("redis is down")
+
+
+async def _until(predicate, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_failed_jobs_are_retried_then_succeed():
+    runner = JobRunner(InMemoryBroker(), concurrency={"audit": 2})
+    calls = []
+
+    @runner.task("flaky", queue="audit", retry_base_seconds=0.01)
+    async def flaky(n):
+        calls.append(n)
+        if len(calls) < 3:
+            raise RuntimeError("database busy")
+
+    async def scenario():
+        runner.start()
+        await runner.enqueue("flaky", n=1)
+        await _until(lambda: len(calls) == 3)
+        await runner.stop()
+
+    asyncio.run(scenario())
+    assert calls == [1, 1, 1] and runner.broker.dead == []
+
+
+def test_jobs_are_dead_lettered_after_max_attempts():
+    runner = JobRunner(InMemoryBroker())
+    attempts = []
+
+    @runner.task("broken", max_attempts=2, retry_base_seconds=0.01)
+    def broken():
+        attempts.append(1)
+        raise ValueError("bad payload")
+
+    async def scenario():
+        runner.start()
+        await runner.enqueue("broken")
+        await _until(lambda: runner.broker.dead)
+        await runner.stop()
+
+    asyncio.run(scenario())
+    ((job, error),) = runner.broker.dead
+    assert len(attempts) == 2 and job.attempts == 2 and "bad payload" in error
+
+
+def test_jobs_run_locally_when_the_broker_is_down():
+    runner = JobRunner(_UnavailableBroker(), fallback=InMemoryBroker())
+    done = []
+
+    @runner.task("audit")
+    async def audit(row):
+        done.append(row)
+
+    async def scenario():
+        runner.start()
+        await runner.enqueue("audit", row="r1")
+        await _until(lambda: done)
+        await runner.stop()
+
+    asyncio.run(scenario())
+    assert done == ["r1"]
@@ -0,0 +1,30 @@
+"""
+Tests for periodic maintenance tasks
+"""
+
+import asyncio
+
+from slices.shared.infrastructure.periodic import PeriodicTask
+
+
+def test_runs_at_start_and_every_interval_through_failures():
+    calls = []
+
+    def run():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("database is down")
+
+    async def scenario():
+        task = PeriodicTask("test-task", run, interval_seconds=0.01)
+        task.start()
+        await asyncio.sleep(0.05)
+        await task.stop()
+        stopped_at = len(calls)
+        await asyncio.sleep(0.03)
+        return stopped_at
+
+    stopped_at = asyncio.run(scenario())
+
+    assert stopped_at >= 3
+    assert len(calls) == stopped_at
@@ -0,0 +1,112 @@
+"""
+Tests for the token-bucket rate limiter and its FastAPI dependency
+"""
+
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from slices.medical_management.api.routes import auth
+from slices.shared.infrastructure import rate_limit as rate_limit_module
+from slices.shared.infrastructure.rate_limit import (
+    InMemoryTokenBuckets,
+    RateLimiter,
+    RateLimitRule,
+    client_ip,
+    rate_limit,
+)
+
+
+class _UnavailableRedis:
+    def register_script(self, script):
+        async def run(keys, args):
+            raise ConnectionError("redis is down")
+
+        return run
+
+
+def _limiter() -> RateLimiter:
+    return RateLimiter(lambda: _UnavailableRedis())
+
+
+class TestTokenBuckets:
+    """Bucket arithmetic shared with the Lua script"""
+
+    def test_burst_then_limited_with_retry_after(self):
+        buckets = InMemoryTokenBuckets()
+        rule = RateLimitRule("test", capacity=3, period_seconds=60)
+
+        results = [buckets.consume("k", rule, 1) for _ in range(4)]
+
+        assert [r.allowed for r in results] == [True, True, True, False]
+        assert 0 < results[-1].retry_after <= 20
+
+    def test_zero_cost_checks_without_spending(self):
+        buckets = InMemoryTokenBuckets()
+        rule = RateLimitRule("test", capacity=1, period_seconds=60)
+
+        assert buckets.consume("k", rule, 0).allowed
+        assert buckets.consume("k", rule, 1).allowed
+        assert not buckets.consume("k", rule, 0).allowed
+
+    def test_keys_are_independent(self):
+        buckets = InMemoryTokenBuckets()
+        rule = RateLimitRule("test", capacity=1, period_seconds=60)
+
+        assert buckets.consume("a", rule, 1).allowed
+        assert buckets.consume("b", rule, 1).allowed
+
+
+@pytest.mark.rate_limited
+class TestRateLimitDependency:
+    """429 responses and the fallback used while Redis is unreachable"""
+
+    def test_falls_back_to_memory_and_returns_429(self):
+        rule = RateLimitRule("endpoint", capacity=2, period_seconds=60)
+        app = FastAPI()
+
+        @app.get("/limited", dependencies=[Depends(rate_limit(rule, client_ip, _limiter()))])
+        async def limited():
+            return {"ok": True}
+
+        client = TestClient(app)
+        statuses = [client.get("/limited").status_code for _ in range(3)]
+
+        assert statuses == [200, 200, 429]
+        assert int(client.get("/limited").headers["Retry-After"]) >= 1
+
+    def test_registration_is_limited_per_ip(self, monkeypatch):
+        monkeypatch.setattr(rate_limit_module.rate_limiter, "_redis_factory", lambda: _UnavailableRedis())
+        monkeypatch.setattr(rate_limit_module.rate_limiter, "_script", None)
+        app = FastAPI()
+        app.include_router(auth.router)
+        client = TestClient(app)
+
+        # The limit is checked before the body, so empty bodies spend tokens without a database
+        capacity = auth.REGISTRATION_PER_IP.capacity
+        statuses = [client.post("/auth/register/patient", json={}).status_code for _ in range(capacity + 1)]
+
+        assert statuses == [422] * capacity + [429]
+
+    def test_redis_is_skipped_for_a_while_after_an_error(self):
+        calls = []
+
+        class CountingRedis:
+            def register_script(self, script):
+                async def run(keys, args):
+                    calls.append(keys)
+                    raise ConnectionError("redis is down")
+
+                return run
+
+        limiter = RateLimiter(lambda: CountingRedis(), retry_redis_after=60)
+        rule = RateLimitRule("endpoint", capacity=5, period_seconds=60)
+
+        async def consume_twice():
+            await limiter.consume(rule, "k")
+            await limiter.consume(rule, "k")
+
+        asyncio.run(consume_twice())
+        assert len(calls) == 1
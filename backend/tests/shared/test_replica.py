@@ -0,0 +1,94 @@
+"""
+Tests for read-replica routing and read-your-writes pinning
+"""
+
+import asyncio
+import time
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from slices.core.config import settings
+from slices.shared.infrastructure import replica
+from slices.shared.infrastructure.replica import (
+    PinStore,
+    ReadYourWritesMiddleware,
+    _route,
+    _write_position,
+    parse_lsn,
+    replica_reads,
+)
+
+
+class _UnavailableRedis:
+    async def get(self, key):
+        raise ConnectionError("redis is down")
+
+    async def set(self, key, value, ex=None):
+        raise ConnectionError("redis is down")
+
+
+@pytest.fixture
+def routing(monkeypatch):
+    """Replica configured, caught up to LSN 0/100, pins kept in memory"""
+    monkeypatch.setattr(settings, "database_replica_url", "postgresql://replica/db")
+    pins = PinStore(lambda: _UnavailableRedis())
+    monkeypatch.setattr(replica, "pin_store", pins)
+    monitor = replica.replica_monitor
+    monkeypatch.setattr(monitor, "replay_lsn", parse_lsn("0/100"))
+    monkeypatch.setattr(monitor, "lag_seconds", 0.0)
+    monkeypatch.setattr(monitor, "checked_at", time.monotonic())
+
+    app = FastAPI()
+
+    @app.get("/read", dependencies=[Depends(replica_reads)])
+    async def read():
+        return {"target": _route.get()}
+
+    @app.post("/write")
+    async def write(lsn: str):
+        # What InstrumentedConnection.commit reports after a write
+        _write_position.get().lsn = parse_lsn(lsn)
+        return {"ok": True}
+
+    return TestClient(ReadYourWritesMiddleware(app, pins)), monitor
+
+
+def test_parse_lsn_orders_positions():
+    assert parse_lsn("0/FF") < parse_lsn("0/100") < parse_lsn("1/0")
+
+
+class TestReadRouting:
+    def test_reads_go_to_a_caught_up_replica(self, routing):
+        client, _ = routing
+
+        assert client.get("/read").json() == {"target": "replica"}
+
+    def test_writer_is_pinned_to_the_primary_until_replay_catches_up(self, routing):
+        client, monitor = routing
+
+        client.post("/write", params={"lsn": "0/200"})
+        assert client.get("/read").json() == {"target": "primary"}
+
+        monitor.replay_lsn = parse_lsn("0/200")
+        assert client.get("/read").json() == {"target": "replica"}
+
+    def test_lagging_replica_is_not_used(self, routing):
+        client, monitor = routing
+        monitor.lag_seconds = settings.replica_max_lag_seconds + 1
+
+        assert client.get("/read").json() == {"target": "primary"}
+
+
+def test_pins_survive_redis_outage_and_expire(monkeypatch):
+    monkeypatch.setattr(settings, "replica_pin_seconds", 0)
+    pins = PinStore(lambda: _UnavailableRedis())
+
+    async def scenario():
+        await pins.pin("user:1", 10)
+        return await pins.get("user:1")
+
+    assert asyncio.run(scenario()) is None
+    monkeypatch.setattr(settings, "replica_pin_seconds", 30)
+    assert asyncio.run(scenario()) == 10
@@ -0,0 +1,68 @@
+"""
+Tests for single-flight coalescing
+"""
+
+import asyncio
+
+import pytest
+
+from slices.shared.infrastructure.single_flight import SingleFlight
+
+
+class _UnavailableRedis:
+    def __getattr__(self, name):
+        raise ConnectionError("redis is down")
+
+
+def _counting_load(calls, result="rows", fail=False):
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        if fail:
+            raise RuntimeError("statement timeout")
+        return result
+    return load
+
+
+@pytest.mark.parametrize("redis_factory", [None, lambda: _UnavailableRedis()])
+def test_concurrent_identical_misses_run_one_load(redis_factory):
+    flights = SingleFlight("test", redis_factory=redis_factory)
+    calls = []
+
+    async def scenario():
+        return await asyncio.gather(*(flights.run("qr-1", _counting_load(calls)) for _ in range(20)))
+
+    assert asyncio.run(scenario()) == ["rows"] * 20
+    assert len(calls) == 1
+
+
+def test_failures_are_shared_and_the_next_miss_loads_again():
+    flights = SingleFlight("test")
+    calls = []
+
+    async def scenario():
+        results = await asyncio.gather(
+            *(flights.run("eps", _counting_load(calls, fail=True)) for _ in range(5)), return_exceptions=True
+        )
+        again = await flights.run("eps", _counting_load(calls))
+        return results, again
+
+    results, again = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results) and again == "rows"
+    assert len(calls) == 2
+
+
+def test_a_cancelled_leader_does_not_cancel_the_others():
+    flights = SingleFlight("test")
+    calls = []
+
+    async def scenario():
+        leader = asyncio.ensure_future(flights.run("qr-1", _counting_load(calls)))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flights.run("qr-1", _counting_load(calls)))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(scenario()) == "rows"
+    assert len(calls) == 1
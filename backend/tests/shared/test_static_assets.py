@@ -0,0 +1,64 @@
+"""
+Tests for prebuilt static pages
+"""
+
+import gzip
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from slices.shared.infrastructure.static_assets import IMMUTABLE, StaticBundle
+
+
+def _client(tmp_path):
+    (tmp_path / "page.html").write_text('<link rel="stylesheet" href="{{site.css}}">')
+    (tmp_path / "site.css").write_text("body { margin: 0; }")
+    bundle = StaticBundle(tmp_path, shell="page.html", url_prefix="/assets")
+    app = FastAPI()
+
+    @app.get("/page/{token}")
+    async def page(token: str, request: Request):
+        return bundle.shell(request)
+
+    @app.get("/assets/{name}")
+    async def asset(name: str, request: Request):
+        return bundle.asset(request, name)
+
+    return TestClient(app), bundle
+
+
+def test_shell_links_fingerprinted_assets_and_is_token_independent(tmp_path):
+    client, bundle = _client(tmp_path)
+    (name,) = bundle.asset_names
+
+    first = client.get("/page/token-a", headers={"Accept-Encoding": "gzip"})
+    second = client.get("/page/token-b", headers={"Accept-Encoding": "identity"})
+
+    assert name.startswith("site.") and name.endswith(".css")
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.text == second.text == f'<link rel="stylesheet" href="/assets/{name}">'
+    assert first.headers["etag"] == second.headers["etag"]
+
+
+def test_assets_are_immutable_and_revalidate_with_304(tmp_path):
+    client, bundle = _client(tmp_path)
+    url = f"/assets/{bundle.asset_names[0]}"
+
+    response = client.get(url, headers={"Accept-Encoding": "identity"})
+    again = client.get(url, headers={"If-None-Match": response.headers["etag"]})
+
+    assert response.headers["cache-control"] == IMMUTABLE
+    assert response.text == "body { margin: 0; }"
+    assert again.status_code == 304
+    assert client.get("/assets/site.css").status_code == 404
+
+
+def test_bundled_emergency_page_references_only_built_assets():
+    from slices.medical_management.api.routes.qr import emergency_page
+
+    emergency_page.load()
+    html = emergency_page._shell.encodings["identity"].decode()
+
+    assert "{{" not in html
+    assert gzip.decompress(emergency_page._shell.encodings["gzip"]).decode() == html
+    assert all(f"/api/v1/qr/assets/{name}" in html for name in emergency_page.asset_names)
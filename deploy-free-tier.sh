@@ -237,12 +237,16 @@ NEXT_PUBLIC_API_URL=http://${PUBLIC_IP}:8000
 CORS_ORIGINS=http://${PUBLIC_IP}:3000,http://${PUBLIC_IP}
 EOL
 
+# Start the database first so migrations have something to run against
+sudo /usr/local/bin/docker-compose -f docker-compose.prod.yml up -d postgres
+until sudo docker exec vitalgo-postgres-1 pg_isready -U vitalgo_user -d vitalgo_db; do sleep 2; done
+
+# Setup database: schema, EPS catalogue and admin user all come from Alembic
+sudo /usr/local/bin/docker-compose -f docker-compose.prod.yml run --rm backend alembic upgrade head
+
 # Build and run with Docker Compose
 sudo /usr/local/bin/docker-compose -f docker-compose.prod.yml up -d
 
-# Setup database
-sudo docker exec -i vitalgo-postgres-1 psql -U vitalgo_user -d vitalgo_db < backend/init.sql || true
-
 echo "Setup completed!"
 EOF
     
@@ -25,7 +25,6 @@ import {
   MapPin,
   AlertTriangle,
   History,
-  Eye,
   FileText,
   TrendingUp
 } from "lucide-react"
@@ -583,15 +582,6 @@ export default function DashboardPage() {
                                   </div>
                                 </div>
                               </div>
-                              
-                              <div className="ml-4">
-                                <Link href={`/emergency/${scan.qr_token}`}>
-                                  <Button size="sm" variant="outline" className="flex items-center space-x-1">
-                                    <Eye className="h-4 w-4" />
-                                    <span>Ver Detalle</span>
-                                  </Button>
-                                </Link>
-                              </div>
                             </div>
                           </CardContent>
                         </Card>
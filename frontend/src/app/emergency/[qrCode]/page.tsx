@@ -64,11 +64,31 @@ interface PatientData {
   }>
 }
 
+// Present when the API answered from a cached copy because the database was unavailable
+interface Staleness {
+  source: string
+  as_of: string
+  age_seconds: number
+}
+
+function StalenessNotice({ staleness }: { staleness: Staleness | null }) {
+  if (!staleness) return null
+  return (
+    <AlertWithIcon
+      variant="warning"
+      title="Datos posiblemente desactualizados"
+      description={`El sistema no está disponible en este momento. Se muestra la última copia guardada, del ${new Date(staleness.as_of).toLocaleString()}. Confirme la información crítica con el paciente o su contacto de emergencia.`}
+      className="max-w-4xl mx-auto mb-6"
+    />
+  )
+}
+
 export default function EmergencyPage() {
   const params = useParams()
   const qrCode = params?.qrCode as string
 
   const [patientData, setPatientData] = useState<PatientData | null>(null)
+  const [staleness, setStaleness] = useState<Staleness | null>(null)
   const [isLoading, setIsLoading] = useState(true)
   const [error, setError] = useState("")
   const [isAuthenticated, setIsAuthenticated] = useState(false)
@@ -218,6 +238,7 @@ export default function EmergencyPage() {
 
       const data = await response.json()
       setPatientData(data.patient)
+      setStaleness(data.staleness ?? null)
       
     } catch (error: any) {
       console.error('Error loading patient data:', error)
@@ -352,6 +373,8 @@ export default function EmergencyPage() {
               </p>
             </div>
 
+            <StalenessNotice staleness={staleness} />
+
             <div className="max-w-4xl mx-auto">
               {/* Basic Emergency Info - Always Visible */}
               <Card className="mb-6 border-red-200 bg-red-50">
@@ -543,6 +566,8 @@ export default function EmergencyPage() {
             </p>
           </div>
 
+          <StalenessNotice staleness={staleness} />
+
           <div className="max-w-6xl mx-auto grid grid-cols-1 lg:grid-cols-3 gap-8">
             {/* Patient Info */}
             <Card className="lg:col-span-1">